@@ -1,8 +1,14 @@
 # app.py
+from concurrent.futures import ThreadPoolExecutor
+import html
+import time
+
 import streamlit as st
 from chatbot import SimpleChatbot
-from sentiment_statement import analyze_statement
-from sentiment_conversation import analyze_conversation_with_gemini
+from sentiment_statement import analyze_statement, get_backend
+from end_pipeline import run_end_pipeline
+from sentiment_conversation import local_conversation_sentiment
+from sentiment_tracker import TREND_ARROWS
 
 st.set_page_config(page_title="LiaPlus Chatbot", layout="wide")
 
@@ -37,16 +43,40 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# ---------- SHARED RESOURCES (one per server process) ----------
+@st.cache_resource
+def load_statement_model():
+    # Loads tokenizer + weights once; every browser session shares them.
+    return get_backend()
+
+@st.cache_resource
+def tier1_executor():
+    # Gemini calls run here so a session's script run never blocks on the network.
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="tier1")
+
+load_statement_model()
+
 # ---------- SESSION STATE ----------
 if "bot" not in st.session_state:
-    st.session_state.bot = SimpleChatbot()
+    # Each user turn is scored when it arrives and stored with the turn,
+    # so /end and reruns only read memoized results.
+    st.session_state.bot = SimpleChatbot(scorer=analyze_statement)
 
-if "chat_log" not in st.session_state:
-    st.session_state.chat_log = []
+if "chat_html" not in st.session_state:
+    # Rendered bubbles, appended as messages arrive and drawn in one call.
+    st.session_state.chat_html = []
 
 if "input_text" not in st.session_state:
     st.session_state.input_text = ""
 
+if "end" not in st.session_state:
+    st.session_state.end = None  # {"per_results": [...], "tier1": Future}
+
+def _bubble(speaker: str, msg: str) -> str:
+    if speaker == "User":
+        return f'<div class="chat-bubble-user">🧑 <b>You:</b> {html.escape(msg)}</div>'
+    return f'<div class="chat-bubble-bot">🤖 <b>Bot:</b> {html.escape(msg)}</div>'
+
 
 st.title("💬 LiaPlus Chatbot")
 st.caption("Chat with the bot. Type `/end` to get full conversation sentiment.")
@@ -57,31 +87,54 @@ with st.form(key="chat_form", clear_on_submit=True):
     submitted = st.form_submit_button("Send")
 
 # ---------- PROCESS USER MESSAGE ----------
-if submitted and user_msg:
-    # /end command logic
+if submitted and user_msg and st.session_state.end is None:
+    bot = st.session_state.bot
     if user_msg.strip().lower() == "/end":
-        st.subheader("📝 Statement-level Sentiment (Tier 2)")
-
-        user_msgs = st.session_state.bot.get_user_messages()
-        for i, msg in enumerate(user_msgs, start=1):
-            res = analyze_statement(msg)
-            st.markdown(
-                f"""
-                <div class="tier-card">
-                    <b>{i:02}. {msg}</b><br>
-                    Sentiment: <b>{res['label']}</b><br>
-                    Score: {res['score']:.3f}
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-
-        st.write("---")
-
-        st.subheader("📌 Conversation-level Sentiment (Tier 1)")
-        conv_text = st.session_state.bot.as_text(include_bot=True)
-        summary = analyze_conversation_with_gemini(conv_text, use_gemini=True)
-
+        # Tier 2 is already memoized per turn, so its cards render at once while
+        # run_end_pipeline races Gemini against the local fallback in the background.
+        st.session_state.end = {
+            "per_results": bot.get_statement_results(),
+            "tier1": tier1_executor().submit(run_end_pipeline, bot, use_gemini=True),
+        }
+    else:
+        # Regular chatbot reply
+        reply = bot.handle_user(user_msg)
+        st.session_state.chat_html.append(_bubble("User", user_msg))
+        st.session_state.chat_html.append(_bubble("Bot", reply))
+
+# ---------- END-OF-CONVERSATION RESULTS ----------
+tier1_pending = False
+if st.session_state.end is not None:
+    st.subheader("📝 Statement-level Sentiment (Tier 2)")
+    st.markdown(
+        "".join(
+            f"""
+            <div class="tier-card">
+                <b>{i:02}. {html.escape(res['text'])}</b><br>
+                Sentiment: <b>{res['label']}</b><br>
+                Score: {res['score']:.3f}
+            </div>
+            """
+            for i, res in enumerate(st.session_state.end["per_results"], start=1)
+        ),
+        unsafe_allow_html=True
+    )
+
+    st.write("---")
+
+    st.subheader("📌 Conversation-level Sentiment (Tier 1)")
+    tier1 = st.session_state.end["tier1"]
+    if not tier1.done():
+        tier1_pending = True
+        st.info("⏳ Analyzing the whole conversation…")
+    else:
+        try:
+            summary = tier1.result()["conversation"]
+        except Exception as e:
+            st.error(f"Conversation analysis failed ({e}); "
+                     "showing the local aggregate of the statement results instead.")
+            summary = local_conversation_sentiment(st.session_state.bot.get_conversation_history(),
+                                                   per_results=st.session_state.end["per_results"])
         # Pretty summary card
         st.markdown(
             f"""
@@ -90,28 +143,31 @@ if submitted and user_msg:
                 <p><b>Average Score:</b> {summary['average_score']}</p>
                 <p><b>Trend:</b> {summary['trend']}</p>
                 <p><b>Confidence:</b> {summary['confidence']}</p>
-                <p><b>Reason:</b> {summary['reason']}</p>
+                <p><b>Reason:</b> {html.escape(str(summary['reason']))}</p>
+                <p><b>Source:</b> {summary['source']}</p>
             </div>
             """,
             unsafe_allow_html=True
         )
 
-        st.warning("Conversation ended. Refresh the page to start again.")
+    st.warning("Conversation ended. Refresh the page to start again.")
 
-    else:
-        # Regular chatbot reply
-        reply = st.session_state.bot.handle_user(user_msg)
-        st.session_state.chat_log.append(("User", user_msg))
-        st.session_state.chat_log.append(("Bot", reply))
 
+# ---------- LIVE MOOD ----------
+mood = st.session_state.bot.tracker.snapshot()
+if mood["count"]:
+    col_mood, col_trend, col_avg = st.columns(3)
+    col_mood.metric("Mood (recent)", f"{mood['ewma']:+.2f}", delta=f"{mood['slope']:+.2f} / turn")
+    col_trend.metric("Trend", f"{TREND_ARROWS[mood['trend']]} {mood['trend']}")
+    col_avg.metric("Average", f"{mood['mean']:+.2f}", help=f"{mood['count']} messages scored")
 
 # ---------- CHAT DISPLAY ----------
 st.subheader("💭 Conversation")
-
-for speaker, msg in st.session_state.chat_log:
-    if speaker == "User":
-        st.markdown(f'<div class="chat-bubble-user">🧑 <b>You:</b> {msg}</div>', unsafe_allow_html=True)
-    else:
-        st.markdown(f'<div class="chat-bubble-bot">🤖 <b>Bot:</b> {msg}</div>', unsafe_allow_html=True)
+st.markdown("".join(st.session_state.chat_html), unsafe_allow_html=True)
 
 st.write("")  # spacing
+
+# Poll the Tier 1 future after the page is drawn, so the user sees everything else meanwhile.
+if tier1_pending:
+    time.sleep(0.3)
+    st.rerun()
@@ -0,0 +1,235 @@
+# batch_analyze.py
+"""
+Offline bulk analysis of exported conversations: JSONL in -> JSONL out.
+
+Input: one conversation per line, either
+  {"id": "c1", "turns": [["User", "hi"], ["Bot", "Hello!"], ...]}
+  {"id": "c1", "turns": [{"speaker": "User", "text": "hi"}, ...]}
+  {"id": "c1", "messages": ["user message 1", "user message 2"]}   # user turns only
+Only "User" and "Bot" turns are loaded; turns from any other speaker ("Agent",
+"System", ...) are skipped with a warning, so they are never scored as user statements.
+
+Output: one line per input line, in input order:
+  {"id": ..., "statements": [Tier 2 results], "conversation": {Tier 1 result}}
+or {"id": ..., "line": n, "error": "..."} if the line could not be processed.
+
+The input is streamed in chunks, so memory stays constant regardless of file size.
+Per chunk, Tier 2 runs as one batched analyze_statements call over every user
+message and Tier 1 runs on a bounded thread pool (Gemini with the local
+fallback). After each chunk the output is flushed and a checkpoint is written;
+re-running with the same paths resumes after the last completed chunk.
+With --workers N (N > 1) Tier 2 runs on a pool of N model processes
+(see parallel_scoring.py) instead of in this process.
+With --store DIR every result is also appended to a columnar results store
+(see results_store.py; needs numpy), committed together with each chunk.
+
+Usage:
+    python batch_analyze.py conversations.jsonl results.jsonl --concurrency 8
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from chatbot import SimpleChatbot
+from sentiment_statement import analyze_statements, DEFAULT_BATCH_SIZE
+from sentiment_conversation import analyze_conversation_with_gemini
+from gemini_client import DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_CONCURRENCY = 4
+
+def load_conversation(record: Dict[str, Any]) -> SimpleChatbot:
+    """Rebuild a SimpleChatbot transcript from one input record."""
+    bot = SimpleChatbot()
+    if "turns" in record:
+        skipped: Dict[str, int] = {}
+        for turn in record["turns"]:
+            if isinstance(turn, dict):
+                speaker, text = turn.get("speaker", "User"), turn.get("text", "")
+            else:
+                speaker, text = turn
+            if speaker == "User":
+                bot.add_user_message(text)
+            elif speaker == "Bot":
+                bot.add_bot_message(text)
+            else:
+                skipped[speaker] = skipped.get(speaker, 0) + 1
+        if skipped:
+            logger.warning("Conversation %s: skipped turns from unknown speakers %s",
+                           record.get("id"), ", ".join(f"{s} x{n}" for s, n in skipped.items()))
+    else:
+        for text in record.get("messages", []):
+            bot.add_user_message(text)
+    return bot
+
+# ----------------------------
+# Checkpointing
+# ----------------------------
+def _read_checkpoint(path: str) -> Tuple[int, int]:
+    """Returns (input lines completed, output bytes written at that point)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return int(data["lines_done"]), int(data["output_bytes"])
+    except FileNotFoundError:
+        return 0, 0
+
+def _write_checkpoint(path: str, lines_done: int, output_bytes: int) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"lines_done": lines_done, "output_bytes": output_bytes}, f)
+    os.replace(tmp, path)  # atomic: a crash leaves either the old or the new checkpoint
+
+def _iter_chunks(f: TextIO, skip: int, chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    chunk: List[Tuple[int, str]] = []
+    for lineno, line in enumerate(f, 1):
+        if lineno <= skip:
+            continue
+        chunk.append((lineno, line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ----------------------------
+# Chunk processing
+# ----------------------------
+def _process_chunk(chunk: List[Tuple[int, str]], pool: ThreadPoolExecutor,
+                   score: Callable[[List[str]], List[Dict[str, Any]]],
+                   use_gemini: bool, model: str) -> Tuple[List[Dict[str, Any]], int]:
+    outputs: List[Optional[Dict[str, Any]]] = [None] * len(chunk)
+    parsed = []  # (slot, id, bot)
+    for slot, (lineno, line) in enumerate(chunk):
+        try:
+            record = json.loads(line)
+            parsed.append((slot, record.get("id", lineno), load_conversation(record)))
+        except Exception as e:
+            outputs[slot] = {"id": None, "line": lineno, "error": f"{type(e).__name__}: {e}"}
+
+    # Tier 2: one batched call for every user message in the chunk
+    user_msgs = [bot.get_user_messages() for _, _, bot in parsed]
+    flat = score([m for msgs in user_msgs for m in msgs])
+    per_results, pos = [], 0
+    for msgs in user_msgs:
+        per_results.append(flat[pos:pos + len(msgs)])
+        pos += len(msgs)
+
+    # Tier 1: bounded concurrency; the fallback reuses the Tier 2 results
+    tier1 = pool.map(
+        lambda args: analyze_conversation_with_gemini(args[0], model=model, use_gemini=use_gemini, per_results=args[1]),
+        [(bot.get_conversation_history(), per) for (_, _, bot), per in zip(parsed, per_results)],
+    )
+    for (slot, conv_id, _), per, conv in zip(parsed, per_results, tier1):
+        outputs[slot] = {"id": conv_id, "statements": per, "conversation": conv}
+
+    return outputs, len(flat)
+
+def run_batch(input_path: str, output_path: str, checkpoint_path: Optional[str] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+              concurrency: int = DEFAULT_CONCURRENCY, use_gemini: bool = True, model: str = DEFAULT_MODEL,
+              progress: Optional[TextIO] = sys.stderr, workers: int = 1,
+              store_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze every conversation in input_path, appending results to output_path.
+    workers > 1 scores statements on that many model processes.
+    store_path: also append results to a results_store.ResultsStore there.
+    Returns run statistics (conversations, messages, seconds, throughput).
+    """
+    checkpoint_path = checkpoint_path or output_path + ".ckpt"
+    lines_done, output_bytes = _read_checkpoint(checkpoint_path)
+
+    if not os.path.exists(output_path):
+        lines_done, output_bytes = 0, 0
+
+    # Drop anything written after the last checkpoint (an interrupted chunk).
+    out = open(output_path, "r+b" if lines_done else "wb")
+    out.truncate(output_bytes)
+    out.seek(output_bytes)
+
+    store = None
+    store_done = 0
+    if store_path:
+        from results_store import ResultsStore
+        store = ResultsStore(store_path)
+        # Lines already in the store (it is committed just before the checkpoint).
+        store_done = int(store.meta["user"].get("lines_done", 0)) if lines_done else 0
+
+    scorer = None
+    if workers > 1:
+        from parallel_scoring import ParallelScorer
+        # Started before any threads exist in this process, so the fork is clean.
+        scorer = ParallelScorer(workers=workers, batch_size=batch_size).start()
+        score = scorer.score
+    else:
+        score = lambda texts: analyze_statements(texts, batch_size=batch_size)
+
+    convs = msgs = 0
+    start = time.perf_counter()
+    try:
+        with open(input_path, "r", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for chunk in _iter_chunks(f, lines_done, max(1, chunk_size)):
+                outputs, n_msgs = _process_chunk(chunk, pool, score, use_gemini, model)
+                if store is not None:
+                    for (lineno, _), o in zip(chunk, outputs):
+                        if "error" not in o and lineno > store_done:
+                            store.add_conversation(o["statements"], o["conversation"], conv_id=o["id"])
+                    store.flush(lines_done=chunk[-1][0])
+                out.write("".join(json.dumps(o, ensure_ascii=False) + "\n" for o in outputs).encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+                lines_done = chunk[-1][0]
+                _write_checkpoint(checkpoint_path, lines_done, out.tell())
+
+                convs += len(chunk)
+                msgs += n_msgs
+                if progress is not None:
+                    elapsed = max(time.perf_counter() - start, 1e-9)
+                    progress.write(f"[batch] {lines_done} lines done | {convs / elapsed:.1f} conv/s | {msgs / elapsed:.1f} msg/s\n")
+                    progress.flush()
+    finally:
+        out.close()
+        if scorer is not None:
+            scorer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "conversations": convs,
+        "messages": msgs,
+        "lines_done": lines_done,
+        "seconds": elapsed,
+        "conversations_per_sec": convs / elapsed if elapsed > 0 else 0.0,
+        "messages_per_sec": msgs / elapsed if elapsed > 0 else 0.0,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Bulk conversation sentiment analysis (JSONL in -> JSONL out).")
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--checkpoint", default=None, help="checkpoint file (default: <output>.ckpt)")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="conversations per chunk")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="statement model batch size")
+    ap.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="concurrent Tier 1 requests")
+    ap.add_argument("--workers", type=int, default=1, help="statement-model worker processes (1 = in-process)")
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--local", action="store_true", help="skip Gemini, use the local aggregator only")
+    ap.add_argument("--store", default=None, help="also append results to a columnar results store directory")
+    args = ap.parse_args(argv)
+
+    stats = run_batch(args.input, args.output, checkpoint_path=args.checkpoint, chunk_size=args.chunk_size,
+                      batch_size=args.batch_size, concurrency=args.concurrency,
+                      use_gemini=not args.local, model=args.model, workers=args.workers,
+                      store_path=args.store)
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# benchmarks/bench_backends.py
+"""
+Latency/throughput and accuracy parity of the statement-model backends.
+
+Each backend scores the same messages; its logits are compared with the eager
+torch reference (label agreement, max probability difference). Exits non-zero
+if any backend falls outside --tolerance, so it can gate a backend switch.
+
+Usage:
+    python benchmarks/bench_backends.py --backends torch int8 onnx --messages 256
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import sentiment_statement
+from sentiment_backends import parity_report
+from bench_statement import make_messages
+
+def bench_backend(name, msgs, batch_size):
+    sentiment_statement.set_backend(name)
+    t0 = time.perf_counter()
+    sentiment_statement.get_backend()
+    load_s = time.perf_counter() - t0
+
+    sentiment_statement._run_model(msgs[:batch_size], batch_size)  # warm-up
+    t0 = time.perf_counter()
+    raw = sentiment_statement._run_model(msgs, batch_size)
+    batched_s = time.perf_counter() - t0
+
+    single = []
+    for m in msgs[:50]:
+        t0 = time.perf_counter()
+        sentiment_statement._run_model([m], 1)
+        single.append(time.perf_counter() - t0)
+    single.sort()
+    return [r["logits"] for r in raw], {
+        "load_s": load_s,
+        "msg_per_s": len(msgs) / batched_s,
+        "single_p50_ms": 1000 * single[len(single) // 2],
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    ap.add_argument("--messages", type=int, default=256)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--tolerance", type=float, default=0.05, help="max allowed probability difference vs torch")
+    args = ap.parse_args()
+
+    sentiment_statement.configure_cache(max_entries=0)
+    msgs = make_messages(args.messages, seed=1)
+    names = ["torch"] + [b for b in args.backends if b != "torch"]
+
+    reference, ok = None, True
+    print(f"{'backend':8} {'load s':>8} {'msg/s':>9} {'p50 ms':>8} {'agree':>7} {'max dp':>8}")
+    for name in names:
+        try:
+            logits, perf = bench_backend(name, msgs, args.batch_size)
+        except ImportError as e:
+            print(f"{name:8} skipped ({e})")
+            continue
+        if reference is None:
+            reference = logits
+        parity = parity_report(reference, logits)
+        within = parity["label_agreement"] == 1.0 and parity["max_prob_diff"] <= args.tolerance
+        ok = ok and within
+        print(f"{name:8} {perf['load_s']:8.2f} {perf['msg_per_s']:9.1f} {perf['single_p50_ms']:8.2f} "
+              f"{parity['label_agreement']:7.3f} {parity['max_prob_diff']:8.4f}{'' if within else '  OUT OF TOLERANCE'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold start and per-process memory: hub pipeline load vs memory-mapped model snapshot.
+
+Each measurement runs in a fresh interpreter (python bench_cold_start.py --child),
+which imports sentiment_statement, loads the backend and scores one message, and
+reports the time for each step and its RSS split into anonymous (private) and
+file-backed (page-cache, shareable) memory.
+
+Then --processes children per mode are started together and kept alive while
+their PSS (proportional set size: shared pages divided among the sharers) is read
+from /proc, so the memory total of N workers can be compared. Linux only for the
+RSS/PSS breakdown.
+
+The snapshot is exported to --snapshot first if it does not exist yet; the hub
+mode expects the model to already be in the local hub cache.
+
+Usage:
+    python benchmarks/bench_cold_start.py --snapshot /tmp/liabot-snapshot --runs 5 --processes 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def _proc_kb(path: str, fields) -> dict:
+    out = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    out[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return out
+
+def child(hold: bool) -> None:
+    t0 = time.perf_counter()
+    import sentiment_statement
+    t1 = time.perf_counter()
+    sentiment_statement.configure_cache(max_entries=0)
+    sentiment_statement.get_backend()
+    t2 = time.perf_counter()
+    sentiment_statement.analyze_statement("The service was quick and friendly.")
+    t3 = time.perf_counter()
+    mem = _proc_kb("/proc/self/status", ("VmRSS", "RssAnon", "RssFile"))
+    print(json.dumps({"pid": os.getpid(), "import_s": t1 - t0, "load_s": t2 - t1, "first_s": t3 - t2,
+                      "rss_mb": mem.get("VmRSS", 0) / 1024, "anon_mb": mem.get("RssAnon", 0) / 1024,
+                      "file_mb": mem.get("RssFile", 0) / 1024}), flush=True)
+    if hold:
+        sys.stdin.readline()
+
+def _env(snapshot):
+    env = dict(os.environ)
+    env.pop("SENTIMENT_SNAPSHOT_DIR", None)
+    if snapshot:
+        env["SENTIMENT_SNAPSHOT_DIR"] = snapshot
+    return env
+
+def spawn(snapshot, hold: bool = False) -> subprocess.Popen:
+    args = [sys.executable, os.path.abspath(__file__), "--child"] + (["--hold"] if hold else [])
+    return subprocess.Popen(args, env=_env(snapshot), stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+def mean(xs):
+    return sum(xs) / len(xs) if xs else 0.0
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--snapshot", default=os.path.join("/tmp", "liabot-snapshot"), help="snapshot directory")
+    ap.add_argument("--runs", type=int, default=5, help="sequential cold starts per mode")
+    ap.add_argument("--processes", type=int, default=4, help="concurrent processes for the shared-memory check")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--hold", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.hold)
+        return
+
+    import model_snapshot
+    if not os.path.exists(os.path.join(args.snapshot, model_snapshot.MANIFEST)):
+        print(f"exporting snapshot to {args.snapshot} ...")
+        model_snapshot.export_snapshot(args.snapshot)
+
+    modes = [("hub", None), ("snapshot", args.snapshot)]
+    print(f"{'mode':>9} {'import s':>9} {'load s':>8} {'first s':>8} {'RSS MB':>8} {'anon MB':>8} {'file MB':>8}")
+    for name, snapshot in modes:
+        rows = []
+        for _ in range(args.runs):
+            out, _ = spawn(snapshot).communicate()
+            rows.append(json.loads(out.strip().splitlines()[-1]))
+        print(f"{name:>9} {mean([r['import_s'] for r in rows]):9.2f} {mean([r['load_s'] for r in rows]):8.2f} "
+              f"{mean([r['first_s'] for r in rows]):8.2f} {mean([r['rss_mb'] for r in rows]):8.1f} "
+              f"{mean([r['anon_mb'] for r in rows]):8.1f} {mean([r['file_mb'] for r in rows]):8.1f}")
+
+    print(f"\n{args.processes} concurrent processes:")
+    print(f"{'mode':>9} {'sum RSS MB':>11} {'sum PSS MB':>11} {'PSS/proc MB':>12}")
+    for name, snapshot in modes:
+        procs = [spawn(snapshot, hold=True) for _ in range(args.processes)]
+        try:
+            pids = [json.loads(p.stdout.readline())["pid"] for p in procs]
+            mem = [_proc_kb(f"/proc/{pid}/smaps_rollup", ("Rss", "Pss")) for pid in pids]
+        finally:
+            for p in procs:
+                p.communicate("\n")
+        rss = sum(m.get("Rss", 0) for m in mem) / 1024
+        pss = sum(m.get("Pss", 0) for m in mem) / 1024
+        print(f"{name:>9} {rss:11.1f} {pss:11.1f} {pss / len(procs):12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_long_text.py
+"""
+Cost of sliding-window long-text scoring vs plain truncation at MAX_LENGTH tokens.
+
+Builds messages of several thousand tokens (a sentiment shift halfway through, so
+truncation and windowing can disagree) and times analyze_statements with and without
+long_policy. Caches are off; every mode is warmed up first.
+
+Usage:
+    python benchmarks/bench_long_text.py --tokens 1000 4000 8000 --messages 16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synthetic import make_messages
+
+import sentiment_statement
+from sentiment_statement import LONG_OVERLAP, MAX_LENGTH, window_spans
+
+def long_message(words: int, seed: int) -> str:
+    """Negative first half, positive second half, about `words` words."""
+    half = max(1, words // 2)
+    neg = " ".join(make_messages(half // 8 + 1, 8, 8, mix={"negative": 1.0}, seed=seed))
+    pos = " ".join(make_messages(half // 8 + 1, 8, 8, mix={"positive": 1.0}, seed=seed + 1))
+    return neg + ". " + pos
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--tokens", type=int, nargs="+", default=[1000, 4000, 8000], help="approximate words per message")
+    ap.add_argument("--messages", type=int, default=16)
+    ap.add_argument("--batch-size", type=int, default=32)
+    args = ap.parse_args()
+
+    sentiment_statement.configure_cache(max_entries=0)
+    backend = sentiment_statement.get_backend()
+    modes = [None] + list(sentiment_statement.LONG_POLICIES)
+
+    print(f"window={MAX_LENGTH} tokens, overlap={LONG_OVERLAP}")
+    print(f"{'words':>6} {'tokens':>7} {'windows':>7} {'mode':>9} {'ms/msg':>9} {'Ktok/s':>8}  labels")
+    for words in args.tokens:
+        msgs = [long_message(words, seed) for seed in range(args.messages)]
+        lengths = [len(ids) for ids in backend.tokenize(msgs)]
+        body = MAX_LENGTH - backend.num_special_tokens
+        n_tokens = sum(lengths)
+        n_windows = sum(len(window_spans(n, body)) for n in lengths)
+        for mode in modes:
+            sentiment_statement.analyze_statements(msgs[:2], batch_size=args.batch_size, long_policy=mode)  # warm-up
+            t0 = time.perf_counter()
+            results = sentiment_statement.analyze_statements(msgs, batch_size=args.batch_size, long_policy=mode)
+            elapsed = time.perf_counter() - t0
+            labels = {}
+            for r in results:
+                labels[r["label"]] = labels.get(r["label"], 0) + 1
+            scored = n_tokens if mode else sum(min(n, body) for n in lengths)
+            print(f"{words:6d} {n_tokens // len(msgs):7d} {n_windows // len(msgs):7d} {mode or 'truncate':>9} "
+                  f"{1000 * elapsed / len(msgs):9.1f} {scored / elapsed / 1000:8.1f}  {labels}")
+
+if __name__ == "__main__":
+    main()
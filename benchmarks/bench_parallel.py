@@ -0,0 +1,70 @@
+# benchmarks/bench_parallel.py
+"""
+Scaling of multi-process statement scoring (parallel_scoring.ParallelScorer) vs worker count.
+
+For each worker count the same messages are scored (caches off, pool started and
+warmed outside the timed region). A 1-worker run is always included as the
+baseline. Reports throughput, speed-up over that measured 1-worker rate and
+scaling efficiency (speed-up / workers), and checks every configuration against
+the serial per-message analyze_statement: labels must be identical and scores
+equal up to --tolerance (batch padding can move the last float bits).
+Exits non-zero if any configuration disagrees.
+
+Usage:
+    python benchmarks/bench_parallel.py --workers 1 2 4 8 --messages 4000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synthetic import make_messages
+
+import sentiment_statement
+from parallel_scoring import ParallelScorer, default_threads_per_worker
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    ap.add_argument("--messages", type=int, default=4000)
+    ap.add_argument("--chunk-size", type=int, default=256)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--tolerance", type=float, default=1e-5)
+    args = ap.parse_args()
+
+    msgs = make_messages(args.messages, min_words=3, max_words=40)
+    sentiment_statement.configure_cache(max_entries=0)
+    sentiment_statement.get_backend()  # load before forking; shared copy-on-write
+
+    t0 = time.perf_counter()
+    reference = [sentiment_statement.analyze_statement(m) for m in msgs]
+    serial_s = time.perf_counter() - t0
+    print(f"serial analyze_statement: {len(msgs) / serial_s:8.1f} msg/s")
+    print(f"{'workers':>7} {'threads':>7} {'msg/s':>9} {'speedup':>8} {'efficiency':>10} {'parity':>7}")
+
+    base = None
+    ok = True
+    for n in sorted(set(args.workers) | {1}):  # 1 first: the speed-up baseline
+        with ParallelScorer(workers=n, chunk_size=args.chunk_size, batch_size=args.batch_size) as scorer:
+            scorer.score(msgs[:n * args.chunk_size])  # warm every worker
+            t0 = time.perf_counter()
+            results = scorer.score(msgs)
+            elapsed = time.perf_counter() - t0
+
+        same = all(r["label"] == ref["label"] and abs(r["score"] - ref["score"]) <= args.tolerance
+                   for r, ref in zip(results, reference))
+        ok = ok and same
+        rate = len(msgs) / elapsed
+        base = base or rate  # measured 1-worker rate
+        speedup = rate / base
+        print(f"{n:7d} {default_threads_per_worker(n):7d} {rate:9.1f} {speedup:8.2f} {speedup / n:10.2f} "
+              f"{'ok' if same else 'DIFF':>7}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_rules.py
+"""
+Per-message latency of SimpleChatbot.simple_response as the rule table grows.
+
+Synthetic intents (each with a handful of keywords) are added on top of the
+default rules; messages mix default-rule hits, synthetic hits and misses.
+
+Usage:
+    python benchmarks/bench_rules.py --rules 0 10 100 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from chatbot import DEFAULT_RULES, Rule, SimpleChatbot
+
+def synthetic_rules(n, words_per_rule=5):
+    return [
+        Rule(f"intent{i}", (r"\b(" + "|".join(f"kw{i}x{j}" for j in range(words_per_rule)) + r")\b",),
+             "neutral_responses", 100 + i)
+        for i in range(n)
+    ]
+
+def make_messages(n_rules, count, seed=0):
+    rng = random.Random(seed)
+    base = ["hello there", "I feel sad about work", "what should I do?", "the meeting moved to friday afternoon"]
+    msgs = []
+    for _ in range(count):
+        msg = rng.choice(base)
+        if n_rules and rng.random() < 0.5:
+            msg += f" kw{rng.randrange(n_rules)}x{rng.randrange(5)}"
+        msgs.append(msg)
+    return msgs
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rules", type=int, nargs="+", default=[0, 10, 100, 500])
+    ap.add_argument("--messages", type=int, default=5000)
+    args = ap.parse_args()
+
+    print(f"{'rules':>6} {'us/msg':>8}")
+    for n in args.rules:
+        bot = SimpleChatbot(rules=list(DEFAULT_RULES) + synthetic_rules(n))
+        msgs = make_messages(n, args.messages)
+        t0 = time.perf_counter()
+        for m in msgs:
+            bot.simple_response(m)
+        elapsed = time.perf_counter() - t0
+        print(f"{len(DEFAULT_RULES) + n:6d} {1e6 * elapsed / len(msgs):8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_statement.py
+"""
+Throughput of Tier 2 scoring: per-message analyze_statement loop vs batched analyze_statements.
+
+Usage:
+    python benchmarks/bench_statement.py --messages 200 --batch-size 32
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sentiment_statement import analyze_statement, analyze_statements, configure_cache, get_pipeline
+
+SAMPLES = [
+    "ok",
+    "thanks",
+    "I'm fine",
+    "I am feeling really sad today, nothing went right at work.",
+    "My order arrived late and the box was damaged, I'm very upset about it.",
+    "That's great news, I'm so happy it worked out in the end!",
+    "Can you tell me when the store opens tomorrow?",
+    "I waited on hold for forty minutes and then the call dropped, which was incredibly frustrating "
+    "because I had already explained the whole problem twice to two different people.",
+]
+
+def make_messages(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [rng.choice(SAMPLES) for _ in range(n)]
+
+def run(n: int, batch_size: int, repeat: int):
+    msgs = make_messages(n)
+    configure_cache(max_entries=0)  # measure model time, not cache lookups
+    get_pipeline()  # load weights outside the timed region
+    analyze_statements(msgs[:batch_size], batch_size=batch_size)  # warm-up
+
+    loop_best = batched_best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in msgs:
+            analyze_statement(m)
+        loop_best = min(loop_best, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        analyze_statements(msgs, batch_size=batch_size)
+        batched_best = min(batched_best, time.perf_counter() - t0)
+
+    print(f"messages={n} batch_size={batch_size} repeat={repeat}")
+    print(f"per-message loop : {n / loop_best:8.1f} msg/s ({loop_best:.3f}s)")
+    print(f"batched          : {n / batched_best:8.1f} msg/s ({batched_best:.3f}s)")
+    print(f"speed-up         : {loop_best / batched_best:8.2f}x")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    run(args.messages, args.batch_size, args.repeat)
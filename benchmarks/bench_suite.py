@@ -0,0 +1,285 @@
+# benchmarks/bench_suite.py
+"""
+Benchmark suite over the hot paths, with JSON output and baseline comparison.
+
+Benchmarks (per-call latency percentiles + throughput):
+  simple_response      SimpleChatbot.simple_response on synthetic messages
+  append_as_text       append one exchange, then render the transcript with as_text()
+  statement_single     analyze_statement, one message per call       (needs the model)
+  statement_batched    analyze_statements, one batch per call        (needs the model)
+  fallback_text        _fallback_aggregate_from_text on a transcript (needs the model)
+  fallback_aggregate   _aggregate_statement_results on precomputed scores
+  tier1_stub           analyze_conversation_with_gemini against a stub Gemini client
+                       with --gemini-latency-ms of simulated latency per request
+
+Model-backed benchmarks are reported as skipped when transformers/torch or the
+weights are unavailable. Caches are disabled so repeated inputs are measured too.
+
+Usage:
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --baseline bench.json --tolerance 0.25   # exit 1 on regression
+"""
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from synthetic import make_conversation, make_messages, make_turns
+
+import gemini_client
+import sentiment_conversation
+import sentiment_statement
+
+STUB_RESPONSE = json.dumps({
+    "overall_label": "Positive",
+    "average_score": 0.3,
+    "trend": "Stable",
+    "reason": "stub",
+    "confidence": 0.7,
+})
+
+class StubGeminiClient:
+    """Quacks like google.genai.Client; every request sleeps `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.models = SimpleNamespace(generate_content=self._generate)
+
+    def _generate(self, model, contents, config):
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(text=STUB_RESPONSE)
+
+# ----------------------------
+# Timing
+# ----------------------------
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+def summarize(latencies: List[float], items_per_call: int = 1) -> Dict[str, Any]:
+    lat = sorted(latencies)
+    total = sum(lat)
+    return {
+        "calls": len(lat),
+        "items_per_call": items_per_call,
+        "p50_us": 1e6 * percentile(lat, 50),
+        "p95_us": 1e6 * percentile(lat, 95),
+        "p99_us": 1e6 * percentile(lat, 99),
+        "mean_us": 1e6 * total / len(lat) if lat else 0.0,
+        "throughput_per_sec": len(lat) * items_per_call / total if total > 0 else 0.0,
+    }
+
+def time_calls(fn: Callable[[Any], Any], inputs: Sequence[Any], warmup: int = 3, number: int = 1) -> List[float]:
+    """Per-call seconds for each input; number > 1 averages that many back-to-back calls (for µs-scale paths)."""
+    for x in inputs[:warmup]:
+        fn(x)
+    out = []
+    clock = time.perf_counter
+    loops = range(number)
+    for x in inputs:
+        t0 = clock()
+        for _ in loops:
+            fn(x)
+        out.append((clock() - t0) / number)
+    return out
+
+# ----------------------------
+# Benchmarks
+# ----------------------------
+def bench_simple_response(cfg) -> Dict[str, Any]:
+    bot = make_conversation(0)
+    msgs = make_messages(cfg.messages, cfg.min_words, cfg.max_words, seed=cfg.seed)
+    return summarize(time_calls(bot.simple_response, msgs, number=10))
+
+def bench_append_as_text(cfg) -> Dict[str, Any]:
+    bot = make_conversation(0)
+    msgs = make_messages(cfg.messages, cfg.min_words, cfg.max_words, seed=cfg.seed)
+
+    def step(text):
+        bot.add_user_message(text)
+        bot.add_bot_message("Thanks for sharing.")
+        bot.as_text(include_bot=True)
+
+    return summarize(time_calls(step, msgs, warmup=0))
+
+def model_available() -> Optional[str]:
+    """None if the statement model can be used, else the reason it can't."""
+    for mod in ("torch", "transformers"):
+        if importlib.util.find_spec(mod) is None:
+            return f"{mod} not installed"
+    try:
+        sentiment_statement.get_backend()
+    except Exception as e:  # e.g. weights not downloaded and no network
+        return f"model unavailable: {type(e).__name__}: {e}"
+    return None
+
+def bench_statement_single(cfg) -> Dict[str, Any]:
+    msgs = make_messages(cfg.messages, cfg.min_words, cfg.max_words, seed=cfg.seed)
+    return summarize(time_calls(sentiment_statement.analyze_statement, msgs))
+
+def bench_statement_batched(cfg) -> Dict[str, Any]:
+    msgs = make_messages(cfg.messages, cfg.min_words, cfg.max_words, seed=cfg.seed)
+    batches = [msgs[i:i + cfg.batch_size] for i in range(0, len(msgs), cfg.batch_size)]
+    batches = [b for b in batches if len(b) == cfg.batch_size] or batches
+    return summarize(time_calls(lambda b: sentiment_statement.analyze_statements(b, batch_size=cfg.batch_size),
+                                batches, warmup=1), items_per_call=len(batches[0]))
+
+def bench_fallback_text(cfg) -> Dict[str, Any]:
+    texts = [make_conversation(cfg.turns, cfg.min_words, cfg.max_words, seed=cfg.seed + i).as_text()
+             for i in range(cfg.conversations)]
+    return summarize(time_calls(sentiment_conversation._fallback_aggregate_from_text, texts, warmup=1))
+
+def bench_fallback_aggregate(cfg) -> Dict[str, Any]:
+    per = [{"label": "Positive" if i % 3 else "Negative", "score": 0.8 if i % 3 else -0.7}
+           for i in range(cfg.turns)]
+    return summarize(time_calls(sentiment_conversation._aggregate_statement_results, [per] * cfg.messages,
+                                number=10))
+
+def bench_tier1_stub(cfg) -> Dict[str, Any]:
+    convs = [make_turns(cfg.turns, min_words=cfg.min_words, max_words=cfg.max_words, seed=cfg.seed + i)
+             for i in range(cfg.conversations)]
+    gemini_client.set_client(StubGeminiClient(cfg.gemini_latency_ms / 1000.0))
+    try:
+        return summarize(time_calls(lambda t: sentiment_conversation.analyze_conversation_with_gemini(t), convs,
+                                    warmup=1))
+    finally:
+        gemini_client.reset_client()
+
+BENCHMARKS = {
+    "simple_response": (bench_simple_response, False),
+    "append_as_text": (bench_append_as_text, False),
+    "statement_single": (bench_statement_single, True),
+    "statement_batched": (bench_statement_batched, True),
+    "fallback_text": (bench_fallback_text, True),
+    "fallback_aggregate": (bench_fallback_aggregate, False),
+    "tier1_stub": (bench_tier1_stub, False),
+}
+
+CONFIG_KEYS = ("messages", "turns", "conversations", "min_words", "max_words", "batch_size",
+               "gemini_latency_ms", "seed", "repeat")
+
+@contextmanager
+def caches_disabled():
+    """
+    Turn both result caches off for the duration, then put the caller's caches back.
+    The cache objects are set aside rather than closed, so they resume as they were.
+    """
+    saved = (sentiment_statement._CACHE, sentiment_statement._CACHE_DISABLED,
+             sentiment_conversation._CONV_CACHE, sentiment_conversation._CONV_CACHE_DISABLED)
+    sentiment_statement._CACHE, sentiment_statement._CACHE_DISABLED = None, True
+    sentiment_conversation._CONV_CACHE, sentiment_conversation._CONV_CACHE_DISABLED = None, True
+    try:
+        yield
+    finally:
+        (sentiment_statement._CACHE, sentiment_statement._CACHE_DISABLED,
+         sentiment_conversation._CONV_CACHE, sentiment_conversation._CONV_CACHE_DISABLED) = saved
+
+def run_suite(cfg, only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    with caches_disabled():
+        results = _run_benchmarks(cfg, only)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": sentiment_statement._BACKEND_NAME,
+            "config": {k: getattr(cfg, k) for k in CONFIG_KEYS},
+        },
+        "results": results,
+    }
+
+def _run_benchmarks(cfg, only: Optional[Sequence[str]]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    skip_reason: Optional[str] = None
+    model_checked = False
+    for name, (fn, needs_model) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        if needs_model:
+            if not model_checked:
+                skip_reason = "disabled with --no-model" if cfg.no_model else model_available()
+                model_checked = True
+            if skip_reason:
+                results[name] = {"skipped": skip_reason}
+                continue
+        # Best-of-N by median: filters out runs disturbed by unrelated load.
+        results[name] = min((fn(cfg) for _ in range(max(1, cfg.repeat))), key=lambda r: r["p50_us"])
+    return results
+
+# ----------------------------
+# Baseline comparison
+# ----------------------------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[Dict[str, Any]]:
+    """
+    One row per benchmark present in both runs. A benchmark regresses when its p50 or
+    p95 latency grew by more than `tolerance` (a fraction) over the baseline.
+    """
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "skipped" in cur or "skipped" in base:
+            continue
+        row = {"name": name}
+        regressed = False
+        for key in ("p50_us", "p95_us"):
+            ratio = cur[key] / base[key] if base[key] > 0 else 1.0
+            row[key.replace("_us", "_ratio")] = ratio
+            regressed = regressed or ratio > 1.0 + tolerance
+        row["regression"] = regressed
+        rows.append(row)
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--messages", type=int, default=2000, help="messages for per-message benchmarks")
+    ap.add_argument("--turns", type=int, default=40, help="user turns per synthetic conversation")
+    ap.add_argument("--conversations", type=int, default=20, help="conversations for per-conversation benchmarks")
+    ap.add_argument("--min-words", type=int, default=3)
+    ap.add_argument("--max-words", type=int, default=20)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--gemini-latency-ms", type=float, default=5.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the one with the lowest p50 is kept")
+    ap.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    ap.add_argument("--no-model", action="store_true", help="skip benchmarks that load the statement model")
+    ap.add_argument("--output", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="JSON report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/p95 slowdown, as a fraction")
+    cfg = ap.parse_args(argv)
+
+    report = run_suite(cfg, cfg.only)
+    exit_code = 0
+    if cfg.baseline:
+        with open(cfg.baseline, "r", encoding="utf-8") as f:
+            rows = compare(report, json.load(f), cfg.tolerance)
+        report["comparison"] = {"baseline": cfg.baseline, "tolerance": cfg.tolerance, "rows": rows}
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else "ok"
+            print(f"{row['name']:<20} p50 x{row['p50_ratio']:.2f}  p95 x{row['p95_ratio']:.2f}  {flag}", file=sys.stderr)
+        exit_code = 1 if any(r["regression"] for r in rows) else 0
+
+    text = json.dumps(report, indent=2)
+    if cfg.output:
+        with open(cfg.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
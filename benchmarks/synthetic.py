@@ -0,0 +1,71 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic conversations for benchmarks.
+
+Messages are assembled from positive / negative / neutral phrase banks and padded
+with filler words to the requested length; bot turns are real SimpleChatbot replies,
+so transcripts look like what the app produces.
+"""
+
+import os
+import random
+import sys
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from chatbot import SimpleChatbot
+
+PHRASES = {
+    "positive": [
+        "thanks, that really helped",
+        "I'm happy with how this turned out",
+        "great, the new version works perfectly",
+        "I love the quick answers",
+    ],
+    "negative": [
+        "my order arrived late and damaged",
+        "I'm really frustrated with this service",
+        "this is terrible, nothing works",
+        "I feel sad and disappointed today",
+    ],
+    "neutral": [
+        "what time does the store open",
+        "the meeting moved to friday",
+        "can you check my account",
+        "hello there",
+    ],
+}
+
+FILLER = ("today", "again", "honestly", "with the delivery", "for my account", "this week", "at work", "as well")
+
+DEFAULT_MIX = {"positive": 0.35, "negative": 0.35, "neutral": 0.3}
+
+def make_message(rng: random.Random, kind: str, words: int) -> str:
+    parts = rng.choice(PHRASES[kind]).split()
+    while len(parts) < words:
+        parts.extend(rng.choice(FILLER).split())
+    return " ".join(parts[:max(words, 1)])
+
+def make_messages(count: int, min_words: int = 3, max_words: int = 20,
+                  mix: Optional[Dict[str, float]] = None, seed: int = 0) -> List[str]:
+    """`count` user messages with lengths in [min_words, max_words] and the given sentiment mix."""
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds, weights = list(mix), [mix[k] for k in mix]
+    return [make_message(rng, rng.choices(kinds, weights)[0], rng.randint(min_words, max_words))
+            for _ in range(count)]
+
+def make_conversation(user_turns: int = 20, min_words: int = 3, max_words: int = 20,
+                      mix: Optional[Dict[str, float]] = None, seed: int = 0) -> SimpleChatbot:
+    """A SimpleChatbot (no scorer) holding `user_turns` exchanges."""
+    random.seed(seed)  # SimpleChatbot picks replies with the module-level random
+    bot = SimpleChatbot()
+    for text in make_messages(user_turns, min_words, max_words, mix, seed):
+        bot.handle_user(text)
+    return bot
+
+def make_turns(user_turns: int = 20, **kwargs) -> List[Tuple[str, str]]:
+    return list(make_conversation(user_turns, **kwargs).get_conversation_history())
@@ -2,17 +2,133 @@
 """
 Advanced rule-based chatbot. No AI.
 Provides varied, context-aware responses.
-Stores full conversation history.
+Stores full conversation history in an append-only ConversationStore.
+Optionally scores each user turn as it arrives (see `scorer`), so the
+end-of-conversation analysis can reuse the results instead of rescoring.
+Scores are also fed to a SentimentTracker (`tracker`) for a live mood / trend.
+
+Replies are driven by a rule table (intent -> patterns -> response pool -> priority),
+compiled once (see RuleMatcher) so the highest-priority intent is found in one pass
+over the message.
 """
 
-from typing import List, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 import re
 import random
 
+from conversation_store import ConversationStore
+from sentiment_tracker import SentimentTracker
+
+class Rule(NamedTuple):
+    intent: str
+    patterns: Tuple[str, ...]  # regexes, matched against the lowercased message
+    pool: str                  # name of the SimpleChatbot attribute holding the replies
+    priority: int              # lower wins when several intents match
+
+DEFAULT_RULES: Tuple[Rule, ...] = (
+    Rule("greeting", (r"\b(hi|hello|hey|good morning|good evening)\b",), "greeting_responses", 1),
+    Rule("thanks", (r"\b(thank|thanks|thank you|thx|ty)\b",), "thanks_responses", 2),
+    Rule("goodbye", (r"\b(bye|goodbye|see you|farewell)\b",), "goodbye_responses", 3),
+    Rule("positive", (r"\b(happy|excited|great|awesome|good|glad|amazing)\b",), "positive_responses", 4),
+    Rule("negative", (r"\b(sad|upset|angry|hurt|frustrat|bad|terrible|depress)\b",), "negative_responses", 5),
+    Rule("question", (r"\?", r"\b(how|what|why|when|where|can you|could you|should I)\b"), "question_responses", 6),
+)
+
+# r"\b(alt|alt|...)\b" / r"\bphrase\b" where every alternative is plain text
+_LITERAL_PATTERN = re.compile(r"^\\b\((?:\?:)?([\w' -]+(?:\|[\w' -]+)*)\)\\b$|^\\b([\w' -]+)\\b$")
+_WORD_RE = re.compile(r"\w+")
+
+class RuleMatcher:
+    """
+    Compiles a rule table once and finds the highest-priority matching rule.
+
+    Whole-word keyword patterns (r"\b(a|b c|...)\b") go into one phrase -> rule index;
+    a message is matched by a single pass over its word spans, looking up every
+    substring that starts and ends on a word boundary (at most as many words as the
+    longest phrase). Cost depends on message length, not on the number of rules.
+
+    Any other pattern is folded into one combined regex (?=(?P<r0>...)|(?P<r1>...)|...),
+    alternatives in priority order, scanned once; the lookahead keeps overlapping
+    matches visible and the first alternative matching at a position is the best there.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules: List[Rule] = sorted(rules, key=lambda r: r.priority)
+        self._phrases: Dict[str, int] = {}
+        self._max_words = 0
+        residual = []
+        for i, rule in enumerate(self.rules):
+            regexes = []
+            for pattern in rule.patterns:
+                literals = self._literal_alternatives(pattern)
+                if literals is None:
+                    regexes.append(pattern)
+                    continue
+                for phrase in literals:
+                    self._phrases.setdefault(phrase, i)  # rules are sorted: first one wins
+                    self._max_words = max(self._max_words, len(_WORD_RE.findall(phrase)))
+            if regexes:
+                residual.append(f"(?P<r{i}>{'|'.join(f'(?:{p})' for p in regexes)})")
+        self._regex = re.compile(f"(?=(?:{'|'.join(residual)}))") if residual else None
+
+    @staticmethod
+    def _literal_alternatives(pattern: str) -> Optional[List[str]]:
+        m = _LITERAL_PATTERN.match(pattern)
+        if m is None:
+            return None
+        alts = (m.group(1) or m.group(2)).split("|")
+        # \b on both sides only lines up with word spans if the phrase starts/ends with a word char
+        if not all(a and _WORD_RE.match(a[0]) and _WORD_RE.match(a[-1]) for a in alts):
+            return None
+        return alts
+
+    def match(self, text: str) -> Optional[Rule]:
+        best = None
+        if self._phrases:
+            spans = [m.span() for m in _WORD_RE.finditer(text)]
+            for i, (start, _) in enumerate(spans):
+                for _, end in spans[i:i + self._max_words]:
+                    hit = self._phrases.get(text[start:end])
+                    if hit is not None and (best is None or hit < best):
+                        best = hit
+                if best == 0:
+                    return self.rules[0]
+        if self._regex is not None:
+            for m in self._regex.finditer(text):
+                # lastgroup is the outermost group that closed, i.e. the rN wrapper
+                i = int(m.lastgroup[1:])
+                if best is None or i < best:
+                    best = i
+                    if best == 0:
+                        break
+        return self.rules[best] if best is not None else None
+
+_DEFAULT_MATCHER = RuleMatcher(DEFAULT_RULES)
+
 class SimpleChatbot:
-    def __init__(self, name: str = "LiaBot"):
+    def __init__(self, name: str = "LiaBot", scorer: Optional[Callable[[str], Dict]] = None,
+                 background: bool = False, rules: Optional[Sequence[Rule]] = None,
+                 max_turns_in_memory: Optional[int] = None, spill_path: Optional[str] = None):
+        """
+        scorer: optional statement-sentiment function (e.g. sentiment_statement.analyze_statement)
+                applied to every user message when it is added.
+        background: run the scorer on a single worker thread so replies aren't blocked.
+        rules: custom rule table (defaults to DEFAULT_RULES); each rule's `pool` must name
+               an attribute of the bot holding its replies.
+        max_turns_in_memory / spill_path: cap the in-memory history; older turns are
+               spilled to disk (see ConversationStore).
+        """
         self.name = name
-        self.conversation: List[Tuple[str, str]] = []
+        self.matcher = _DEFAULT_MATCHER if rules is None else RuleMatcher(rules)
+        self.conversation = ConversationStore(max_in_memory=max_turns_in_memory, spill_path=spill_path)
+        self.scorer = scorer
+        self.tracker = SentimentTracker()
+        # Background scoring still in flight, by turn index.
+        self._pending: Dict[int, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if scorer is not None and background:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-sentiment")
 
         # Predefined response sets (variety to avoid repetition)
         self.greeting_responses = [
@@ -39,6 +155,15 @@ class SimpleChatbot:
             "Okay, I’m listening. What else happened?",
         ]
 
+        self.thanks_responses = ["You're welcome! I’m glad I could help."]
+
+        self.goodbye_responses = ["Goodbye! If you'd like to talk again, I’ll be here."]
+
+        self.question_responses = [
+            "That's an interesting question. "
+            "Could you tell me more so I can understand the situation better?"
+        ]
+
         self.followup_questions = [
             "What happened next?",
             "How did that make you feel overall?",
@@ -50,64 +175,69 @@ class SimpleChatbot:
     # Conversation storage helpers
     # ----------------------------
     def add_user_message(self, text: str):
-        self.conversation.append(("User", text.strip()))
+        text = text.strip()
+        index = self.conversation.append("User", text)
+        if self.scorer is not None:
+            if self._executor is not None:
+                self._pending[index] = self._executor.submit(self._score_turn, index, text)
+            else:
+                self._score_turn(index, text)
+
+    def _score_turn(self, index: int, text: str):
+        self.record_sentiment(index, self.scorer(text))
+
+    def record_sentiment(self, index: int, result: Dict):
+        """Attach a statement result to user turn `index` and update the live tracker (first result only)."""
+        if self.conversation.set_sentiment(index, result):
+            self.tracker.update(result)
 
     def add_bot_message(self, text: str):
-        self.conversation.append(("Bot", text.strip()))
+        self.conversation.append("Bot", text.strip())
+
+    def get_conversation_history(self) -> Sequence[Tuple[str, str]]:
+        """Read-only view of the turns so far (not a copy)."""
+        return self.conversation.view()
 
-    def get_conversation_history(self) -> List[Tuple[str, str]]:
-        return list(self.conversation)
+    def get_user_messages(self) -> Sequence[str]:
+        return self.conversation.user_messages()
 
-    def get_user_messages(self) -> List[str]:
-        return [t for s, t in self.conversation if s == "User"]
+    def get_statement_results(self, timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """
+        Per-user-message sentiment computed as the turns arrived, in user-message order.
+        Waits for any pending background work. Returns None if no scorer was configured.
+        """
+        if self.scorer is None:
+            return None
+        for index in list(self._pending):
+            self._pending[index].result(timeout=timeout)  # re-raises scorer errors
+            del self._pending[index]
+        return [self.conversation.sentiment(i) for i in self.conversation.user_turn_indices()]
+
+    def close(self):
+        """Stop the background scoring worker (pending work is finished first)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending.clear()
 
     def as_text(self, include_bot: bool = True) -> str:
-        lines = []
-        for speaker, text in self.conversation:
-            if not include_bot and speaker == "Bot":
-                continue
-            lines.append(f"{speaker}: {text}")
-        return "\n".join(lines)
+        return self.conversation.as_text(include_bot)
 
     def last_user_message(self) -> str:
-        for s, t in reversed(self.conversation):
-            if s == "User":
-                return t
-        return ""
+        return self.conversation.last_user_message()
 
     # ----------------------------
     # Core rule-based logic
     # ----------------------------
     def simple_response(self, user_text: str) -> str:
         txt = user_text.strip()
-        l = txt.lower()
-
-        # 1. Greetings
-        if re.search(r"\b(hi|hello|hey|good morning|good evening)\b", l):
-            return random.choice(self.greeting_responses)
-
-        # 2. Thanks
-        if re.search(r"\b(thank(s| you)?|thx|ty)\b", l):
-            return "You're welcome! I’m glad I could help."
-
-        # 3. Goodbyes
-        if re.search(r"\b(bye|goodbye|see you|farewell)\b", l):
-            return "Goodbye! If you'd like to talk again, I’ll be here."
-
-        # 4. Strong positive emotions
-        if re.search(r"\b(happy|excited|great|awesome|good|glad|amazing)\b", l):
-            return random.choice(self.positive_responses)
-
-        # 5. Strong negative emotions
-        if re.search(r"\b(sad|upset|angry|hurt|frustrat|bad|terrible|depress)\b", l):
-            return random.choice(self.negative_responses)
-
-        # 6. Direct questions
-        if "?" in txt or re.search(r"\b(how|what|why|when|where|can you|could you|should I)\b", l):
-            return (
-                "That's an interesting question. "
-                "Could you tell me more so I can understand the situation better?"
-            )
+
+        # 1-6. Greetings, thanks, goodbyes, emotions, questions: highest-priority rule wins
+        rule = self.matcher.match(txt.lower())
+        if rule is not None:
+            pool = getattr(self, rule.pool)
+            # Fixed replies don't draw from the RNG, so seeded sequences stay reproducible.
+            return pool[0] if len(pool) == 1 else random.choice(pool)
 
         # 7. Very short messages
         if len(txt.split()) <= 2:
@@ -0,0 +1,186 @@
+# circuit_breaker.py
+"""
+Circuit breaker for a flaky remote dependency (used around the Tier 1 Gemini call).
+
+States:
+- closed:    calls go through; the outcome of the last `window` calls is kept.
+             A call is "bad" if it raised or took longer than slow_call_seconds.
+             Once at least min_calls are recorded and the bad fraction reaches
+             failure_rate, the circuit opens.
+- open:      calls are rejected at once with CircuitOpenError (callers fall back
+             locally) until open_seconds have passed.
+- half_open: the next call is let through as a probe (one at a time; others are
+             still rejected). A good probe closes the circuit, a bad one re-opens it
+             for another open_seconds. While the dependency stays down, a probe
+             therefore goes out once every open_seconds.
+
+allow() hands out a Permit that is passed back to record(); it remembers whether
+the call is the half-open probe and which open/close cycle it started in, so a
+slow call that began before the circuit opened can neither close the circuit nor
+count against it after the fact.
+
+State and recent transitions are available from stats(); transitions are logged
+and counted in liabot_circuit_transitions_total{breaker,state}, rejected calls in
+liabot_circuit_rejected_total{breaker}. clock is injectable for tests.
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the dependency while the circuit is open."""
+
+class Permit:
+    """Returned by allow() for a call that may go out; pass it to record()."""
+    __slots__ = ("probe", "epoch")
+
+    def __init__(self, probe: bool, epoch: int):
+        self.probe = probe
+        self.epoch = epoch
+
+class CircuitBreaker:
+    def __init__(self, name: str = "gemini", failure_rate: float = 0.5, slow_call_seconds: Optional[float] = 10.0,
+                 min_calls: int = 5, window: int = 20, open_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, max_transitions: int = 20):
+        """
+        failure_rate: bad fraction of the window that opens the circuit.
+        slow_call_seconds: calls at least this slow count as bad (None = latency ignored).
+        min_calls: outcomes needed in the window before the rate is trusted.
+        open_seconds: how long the circuit stays open before a probe is allowed.
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = max(1, int(min_calls))
+        self.open_seconds = open_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = CLOSED
+        self._outcomes: deque = deque(maxlen=max(self.min_calls, int(window)))  # True = bad
+        self._bad = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._epoch = 0  # bumped whenever the circuit opens
+        self.trips = 0
+        self.rejected = 0
+        self.transitions: deque = deque(maxlen=max_transitions)
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> Optional[Permit]:
+        """A Permit if a call may go out now (in half_open, the single probe slot), else None."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return Permit(False, self._epoch)
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return Permit(True, self._epoch)
+            self.rejected += 1
+        metrics.inc("liabot_circuit_rejected_total", breaker=self.name)
+        return None
+
+    def record(self, permit: Permit, ok: bool, duration: float = 0.0) -> None:
+        """Report the outcome of a call that allow() let through."""
+        slow = self.slow_call_seconds is not None and duration >= self.slow_call_seconds
+        bad = not ok or slow
+        with self._lock:
+            if permit.probe:
+                if self._state == HALF_OPEN and permit.epoch == self._epoch:
+                    self._probe_in_flight = False
+                    if bad:
+                        self._open("probe was too slow" if ok else "probe failed")
+                    else:
+                        self._close("probe succeeded")
+                return
+            if self._state != CLOSED or permit.epoch != self._epoch:
+                return  # started before the circuit opened: its outcome is stale
+            if len(self._outcomes) == self._outcomes.maxlen:
+                self._bad -= self._outcomes[0]
+            self._outcomes.append(bad)
+            self._bad += bad
+            n = len(self._outcomes)
+            if n >= self.min_calls and self._bad / n >= self.failure_rate:
+                self._open(f"{self._bad}/{n} recent calls failed or were slow")
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn through the breaker; raises CircuitOpenError without calling it while open."""
+        permit = self.allow()
+        if permit is None:
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        t0 = self._clock()
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            self.record(permit, ok, self._clock() - t0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._close("reset")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            n = len(self._outcomes)
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = max(0.0, self._opened_at + self.open_seconds - self._clock())
+            return {
+                "name": self.name,
+                "state": self._state,
+                "recent_calls": n,
+                "failure_rate": (self._bad / n) if n else 0.0,
+                "retry_in": retry_in,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "transitions": list(self.transitions),
+            }
+
+    # ----------------------------
+    # Internals (called with the lock held)
+    # ----------------------------
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN, "cool-down elapsed")
+
+    def _open(self, reason: str) -> None:
+        self._opened_at = self._clock()
+        self._epoch += 1
+        self.trips += 1
+        self._transition(OPEN, reason)
+
+    def _close(self, reason: str) -> None:
+        self._outcomes.clear()
+        self._bad = 0
+        self._probe_in_flight = False
+        if self._state != CLOSED:
+            self._transition(CLOSED, reason)
+
+    def _transition(self, state: str, reason: str) -> None:
+        old, self._state = self._state, state
+        self.transitions.append({"at": self._clock(), "from": old, "to": state, "reason": reason})
+        log = logger.warning if state == OPEN else logger.info
+        log("%s circuit %s -> %s (%s)", self.name, old, state, reason)
+        metrics.inc("liabot_circuit_transitions_total", breaker=self.name, state=state)
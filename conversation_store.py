@@ -0,0 +1,300 @@
+# conversation_store.py
+"""
+Append-only conversation store used by SimpleChatbot.
+
+- Turns are kept as a compact speaker-code bytearray plus a list of texts.
+- The rendered transcript ("Speaker: text" lines, with and without Bot turns) is
+  maintained incrementally as turns are appended, so as_text() doesn't rebuild it.
+- The last user turn and the positions of all user turns are tracked, so
+  last_user_message() is O(1) and user-message views need no scan.
+- view() / user_messages() return read-only views over the store instead of copies.
+- With max_in_memory set, the oldest turns are spilled to an append-only segment file
+  once the cap is exceeded. Spilled turns stay readable (views, as_text) from disk,
+  while aggregate sentiment statistics are always kept in memory. The spilled
+  turns are also rendered once into transcript files as they spill, so as_text()
+  reads them back sequentially instead of re-parsing the segment.
+- Each turn takes one sentiment result; set_sentiment() ignores later ones.
+
+The store behaves like a read-only sequence of (speaker, text) tuples.
+"""
+
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import io
+import json
+import tempfile
+import threading
+
+Turn = Tuple[str, str]
+
+class ConversationStore(Sequence):
+    def __init__(self, max_in_memory: Optional[int] = None, spill_path: Optional[str] = None):
+        """
+        max_in_memory: keep at most this many turns in memory (None = unbounded).
+        spill_path: file for spilled turns (default: an anonymous temporary file).
+        """
+        self.max_in_memory = max_in_memory if max_in_memory is None else max(2, int(max_in_memory))
+        self.spill_path = spill_path
+        self._lock = threading.RLock()
+
+        self._speaker_names: List[str] = ["User", "Bot"]
+        self._speaker_codes: Dict[str, int] = {"User": 0, "Bot": 1}
+
+        # In-memory turns; global index of the first one is self._base.
+        self._speakers = bytearray()
+        self._texts: List[str] = []
+        self._sentiments: List[Optional[Dict[str, Any]]] = []
+        self._base = 0
+
+        self._user_indices = array("Q")
+        self._last_user = -1
+
+        # Spill segment: JSON lines, with the byte offset of every spilled turn.
+        self._segment = None
+        self._offsets = array("Q")
+        self._late_sentiments: Dict[int, Dict[str, Any]] = {}
+        # Rendered spilled turns, UTF-8 on disk: {include_bot: file}
+        self._transcripts: Dict[bool, Any] = {}
+
+        # Rendered transcript of the in-memory turns: {include_bot: buffer}
+        self._buffers = {True: io.StringIO(), False: io.StringIO()}
+        self._rendered: Dict[bool, Optional[str]] = {True: None, False: None}
+
+        # Aggregate sentiment over every turn that has been scored, spilled or not.
+        self.scored = 0
+        self.score_sum = 0.0
+        self.label_counts: Dict[str, int] = {}
+
+    # ----------------------------
+    # Appending
+    # ----------------------------
+    def append(self, speaker: str, text: str, sentiment: Optional[Dict[str, Any]] = None) -> int:
+        """Add a turn; returns its index."""
+        with self._lock:
+            code = self._speaker_codes.get(speaker)
+            if code is None:
+                code = self._speaker_codes[speaker] = len(self._speaker_names)
+                self._speaker_names.append(speaker)
+            index = self._base + len(self._texts)
+            self._speakers.append(code)
+            self._texts.append(text)
+            self._sentiments.append(None)
+            if speaker == "User":
+                self._user_indices.append(index)
+                self._last_user = index
+            self._render(speaker, text)
+            if sentiment is not None:
+                self.set_sentiment(index, sentiment)
+            if self.max_in_memory is not None and len(self._texts) > self.max_in_memory:
+                self._spill(len(self._texts) - self.max_in_memory // 2)
+            return index
+
+    def set_sentiment(self, index: int, sentiment: Dict[str, Any]) -> bool:
+        """
+        Attach a statement-sentiment result to turn `index` and fold it into the aggregates.
+        Returns False (and changes nothing) if the turn already has a result.
+        """
+        with self._lock:
+            if self.sentiment(index) is not None:
+                return False
+            if index >= self._base:
+                self._sentiments[index - self._base] = sentiment
+            else:
+                self._late_sentiments[index] = sentiment  # already spilled; keep the late result here
+            self.scored += 1
+            self.score_sum += float(sentiment.get("score", 0.0))
+            label = sentiment.get("label", "Neutral")
+            self.label_counts[label] = self.label_counts.get(label, 0) + 1
+            return True
+
+    # ----------------------------
+    # Reading
+    # ----------------------------
+    def __len__(self) -> int:
+        return self._base + len(self._texts)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("conversation index out of range")
+        with self._lock:
+            if index >= self._base:
+                k = index - self._base
+                return (self._speaker_names[self._speakers[k]], self._texts[k])
+            rec = self._read_spilled(index)
+            return (rec["s"], rec["t"])
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self.view())
+
+    def sentiment(self, index: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if index >= self._base:
+                return self._sentiments[index - self._base]
+            if index in self._late_sentiments:
+                return self._late_sentiments[index]
+            return self._read_spilled(index).get("r")
+
+    def user_turn_indices(self) -> Sequence[int]:
+        return self._user_indices
+
+    def last_user_message(self) -> str:
+        with self._lock:
+            return self[self._last_user][1] if self._last_user >= 0 else ""
+
+    def view(self, start: int = 0, stop: Optional[int] = None) -> "ConversationView":
+        """Read-only view of turns [start, stop) as of now; appends after this call aren't included."""
+        return ConversationView(self, start, len(self) if stop is None else stop)
+
+    def user_messages(self) -> "UserMessagesView":
+        return UserMessagesView(self, len(self._user_indices))
+
+    def as_text(self, include_bot: bool = True) -> str:
+        with self._lock:
+            rendered = self._rendered[include_bot]
+            if rendered is None:
+                rendered = self._rendered[include_bot] = self._buffers[include_bot].getvalue()
+            spilled = self._read_transcript(include_bot)
+            return spilled + ("\n" + rendered if rendered and spilled else rendered)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": len(self),
+                "in_memory": len(self._texts),
+                "spilled": self._base,
+                "user_turns": len(self._user_indices),
+                "scored": self.scored,
+                "average_score": self.score_sum / self.scored if self.scored else 0.0,
+                "label_counts": dict(self.label_counts),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            for f in self._transcripts.values():
+                f.close()
+            self._transcripts = {}
+
+    # ----------------------------
+    # Internals (caller holds the lock)
+    # ----------------------------
+    def _render(self, speaker: str, text: str) -> None:
+        line = f"{speaker}: {text}"
+        for include_bot in (True, False):
+            if include_bot or speaker != "Bot":
+                buf = self._buffers[include_bot]
+                if buf.tell():
+                    buf.write("\n")
+                buf.write(line)
+                self._rendered[include_bot] = None
+
+    def _spill(self, count: int) -> None:
+        if self._segment is None:
+            self._segment = open(self.spill_path, "w+b") if self.spill_path else tempfile.TemporaryFile()
+            self._transcripts = {True: tempfile.TemporaryFile(), False: tempfile.TemporaryFile()}
+        self._segment.seek(0, io.SEEK_END)
+        for f in self._transcripts.values():
+            f.seek(0, io.SEEK_END)
+        for k in range(count):
+            self._offsets.append(self._segment.tell())
+            speaker = self._speaker_names[self._speakers[k]]
+            rec = {"s": speaker, "t": self._texts[k], "r": self._sentiments[k]}
+            self._segment.write(json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n")
+            line = f"{speaker}: {self._texts[k]}".encode("utf-8")
+            for include_bot, f in self._transcripts.items():
+                if include_bot or speaker != "Bot":
+                    f.write(b"\n" + line if f.tell() else line)
+        self._segment.flush()
+
+        del self._speakers[:count]
+        del self._texts[:count]
+        del self._sentiments[:count]
+        self._base += count
+
+        # Re-render the (bounded) in-memory tail.
+        self._buffers = {True: io.StringIO(), False: io.StringIO()}
+        self._rendered = {True: None, False: None}
+        for k, text in enumerate(self._texts):
+            self._render(self._speaker_names[self._speakers[k]], text)
+
+    def _read_transcript(self, include_bot: bool) -> str:
+        f = self._transcripts.get(include_bot)
+        if f is None:
+            return ""
+        f.seek(0)
+        return f.read().decode("utf-8")
+
+    def _read_spilled(self, index: int) -> Dict[str, Any]:
+        self._segment.seek(self._offsets[index])
+        return json.loads(self._segment.readline())
+
+    def _iter_spilled(self, start: int, stop: int) -> Iterator[Turn]:
+        with self._lock:
+            if start >= stop:
+                return
+            self._segment.seek(self._offsets[start])
+            lines = [self._segment.readline() for _ in range(stop - start)]
+        for line in lines:
+            rec = json.loads(line)
+            yield (rec["s"], rec["t"])
+
+class ConversationView(Sequence):
+    """Read-only window [start, stop) over a ConversationStore; no turns are copied."""
+
+    def __init__(self, store: ConversationStore, start: int, stop: int):
+        self._store = store
+        self._start = start
+        self._stop = max(start, stop)
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return ConversationView(self._store, self._start + start, self._start + stop)
+            return [self[i] for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("conversation index out of range")
+        return self._store[self._start + index]
+
+    def __iter__(self) -> Iterator[Turn]:
+        store = self._store
+        spilled_stop = min(self._stop, store._base)
+        yield from store._iter_spilled(self._start, spilled_stop)
+        for i in range(max(self._start, spilled_stop), self._stop):
+            yield store[i]
+
+    def as_text(self, include_bot: bool = True) -> str:
+        if self._start == 0 and self._stop == len(self._store):
+            return self._store.as_text(include_bot)
+        return "\n".join(f"{s}: {t}" for s, t in self if include_bot or s != "Bot")
+
+class UserMessagesView(Sequence):
+    """Read-only view of the first `count` user messages of a ConversationStore."""
+
+    def __init__(self, store: ConversationStore, count: int):
+        self._store = store
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("user message index out of range")
+        return self._store[self._store.user_turn_indices()[index]][1]
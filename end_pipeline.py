@@ -0,0 +1,128 @@
+# end_pipeline.py
+"""
+End-of-conversation (/end) orchestration shared by main.py and app.py.
+
+Instead of Tier 2, then Gemini, then (on failure) the fallback one after another:
+1. the Gemini request starts immediately on a background thread,
+2. meanwhile Tier 2 results are collected (usually already computed per turn),
+3. the Gemini result is used if it arrives before the deadline; otherwise the
+   local fallback is computed from the Tier 2 results (or the bot's tracker,
+   which is O(1)) and returned at once.
+
+Only the result that is returned is counted in liabot_tier1_total, and the
+fallback (and its stage timer) only runs when it is used.
+
+The result says which source won ("gemini", "cache" or "fallback") and why the
+fallback was used ("disabled", "circuit_open", "error" or "deadline"). While the
+Gemini circuit breaker is open the background call returns at once, so /end does
+not wait for the deadline during an outage. A Gemini call that misses
+the deadline keeps running in the background and still fills the Tier 1 cache.
+"""
+
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+import contextvars
+import logging
+import os
+import threading
+import time
+
+import metrics
+from chatbot import SimpleChatbot
+from gemini_client import DEFAULT_MODEL
+from circuit_breaker import CircuitOpenError
+from sentiment_conversation import gemini_conversation_sentiment, local_conversation_sentiment
+from sentiment_statement import analyze_statements
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEADLINE = float(os.environ.get("LIABOT_END_DEADLINE", "8"))
+
+def _start_background(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """
+    Run fn on a daemon thread (so a slow Gemini call never holds up interpreter exit),
+    in a copy of the caller's context so it shows up in an active metrics trace.
+    """
+    fut: Future = Future()
+    ctx = contextvars.copy_context()
+
+    def _run():
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(ctx.run(fn, *args, **kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=_run, name="end-gemini", daemon=True).start()
+    return fut
+
+def _statement_results(bot: SimpleChatbot) -> List[Dict[str, Any]]:
+    per_results = bot.get_statement_results()
+    if per_results is None:  # bot without a scorer: score everything now
+        per_results = analyze_statements(list(bot.get_user_messages()))
+    return per_results
+
+def run_end_pipeline(bot: SimpleChatbot, use_gemini: bool = True, deadline: Optional[float] = DEFAULT_DEADLINE,
+                     model: str = DEFAULT_MODEL) -> Dict[str, Any]:
+    """
+    Returns {
+      "statements":      Tier 2 results, in user-message order,
+      "conversation":    the Tier 1 dict (with "source"),
+      "source":          "gemini" | "cache" | "fallback",
+      "fallback_reason": None | "disabled" | "circuit_open" | "error" | "deadline",
+      "timings":         seconds for tier2, gemini (None if not finished in time), total
+    }
+    deadline: seconds from the call to wait for Gemini (None = wait for it, however long).
+    """
+    start = time.perf_counter()
+    turns = bot.get_conversation_history()
+
+    gemini: Optional[Future] = None
+    gemini_elapsed: List[float] = []
+    if use_gemini:
+        def _call_gemini():
+            t0 = time.perf_counter()
+            try:
+                return gemini_conversation_sentiment(turns, model=model)
+            finally:
+                gemini_elapsed.append(time.perf_counter() - t0)
+        gemini = _start_background(_call_gemini)
+
+    with metrics.timer("tier2_wait"):
+        per_results = _statement_results(bot)
+    tier2_s = time.perf_counter() - start
+
+    conversation: Optional[Dict[str, Any]] = None
+    reason: Optional[str] = "disabled"
+    if gemini is not None:
+        remaining = None if deadline is None else max(0.0, deadline - (time.perf_counter() - start))
+        try:
+            conversation = gemini.result(timeout=remaining)
+            reason = None
+        except FutureTimeout:
+            reason = "deadline"
+            metrics.inc("liabot_end_deadline_missed_total")
+            logger.warning("Gemini missed the %.1fs /end deadline; using the local result", deadline)
+        except CircuitOpenError:
+            reason = "circuit_open"
+        except Exception as e:
+            reason = "error"
+            logger.warning("Gemini call failed, using the local result: %s", e)
+
+    if conversation is None:
+        conversation = local_conversation_sentiment(turns, per_results=per_results, tracker=bot.tracker)
+    source = conversation["source"]
+    metrics.inc("liabot_tier1_total", source=source)
+
+    return {
+        "statements": per_results,
+        "conversation": conversation,
+        "source": source,
+        "fallback_reason": reason,
+        "timings": {
+            "tier2": tier2_s,
+            "gemini": gemini_elapsed[0] if gemini_elapsed else None,
+            "total": time.perf_counter() - start,
+        },
+    }
@@ -2,22 +2,60 @@
 """
 Gemini client wrapper using the NEW google-genai SDK (v1.50+).
 Uses the Client() class, not genai.configure().
+
+One Client is created per process and reused, so connections (and TLS sessions)
+are pooled across calls. Both a sync and an async entry point are provided; they
+share the prompt, JSON extraction, per-request timeout and retry-with-jittered-
+backoff logic. The async variant is additionally bounded by a concurrency limit.
+
+Tests can inject any object shaped like a Client via set_client(), or point the
+real SDK at a local fake endpoint with GEMINI_BASE_URL.
+
+The google-genai SDK is imported when the first client is created, not at import time.
+
+Long conversations (over MAX_PROMPT_CHARS) are not truncated: the transcript is
+split on turn boundaries into token-budgeted chunks, the chunks are analyzed
+concurrently and the partial results are merged locally (map-reduce).
+
+Request round trips, JSON extraction and retries are recorded through metrics.py.
 """
 
-from typing import Dict, Any
-import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import hashlib
 import json
+import os
+import random
+import sys
 import textwrap
+import threading
+import time
+import weakref
+
+import metrics
 
-try:
-    from google.genai import Client
-    _HAS_GENAI = True
-except Exception:
-    Client = None
-    _HAS_GENAI = False
+_TRANSIENT_EXC = (TimeoutError, ConnectionError, asyncio.TimeoutError)
 
 DEFAULT_MODEL = "gemini-2.0-flash"
 MAX_PROMPT_CHARS = 20000
+DEFAULT_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", "30"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "3"))
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8"))
+# Per-chunk budget for long conversations, in (estimated) tokens.
+CHUNK_TOKEN_BUDGET = int(os.environ.get("GEMINI_CHUNK_TOKENS", "4000"))
+CHARS_PER_TOKEN = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# HTTP status codes worth retrying (rate limits, overload, gateway errors).
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+_MAX_CONCURRENCY = DEFAULT_MAX_CONCURRENCY
+# asyncio primitives belong to one event loop, so keep one semaphore per loop.
+_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
 def _build_instruction():
     return textwrap.dedent("""\
@@ -31,30 +69,110 @@ def _build_instruction():
     Do NOT output anything except valid JSON.
     """)
 
-def generate_json_from_conversation(conversation_text: str, model: str = DEFAULT_MODEL) -> Dict[str, Any]:
-    if not _HAS_GENAI:
-        raise RuntimeError("google-genai SDK not available.")
+def _build_chunk_instruction(index: int, total: int):
+    return _build_instruction() + textwrap.dedent(f"""\
+    This is segment {index} of {total} of a longer conversation.
+    Analyze only this segment; "trend" is the direction within the segment.
+    """)
+
+def prompt_version() -> str:
+    """Short hash of the prompt templates; changes whenever the instruction text does."""
+    template = _build_prompt("", truncate=False) + _build_chunk_prompt("", 1, 2)
+    return hashlib.sha1(template.encode("utf-8")).hexdigest()[:12]
 
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY is not set.")
+# ----------------------------
+# Client management
+# ----------------------------
+def get_client(timeout: float = DEFAULT_TIMEOUT):
+    """
+    Return the shared Client, creating it on first use.
+    The API key (GOOGLE_API_KEY) and optional GEMINI_BASE_URL are read only then.
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            try:
+                from google.genai import Client
+            except Exception:
+                raise RuntimeError("google-genai SDK not available.")
+            api_key = os.environ.get("GOOGLE_API_KEY")
+            if not api_key:
+                raise RuntimeError("GOOGLE_API_KEY is not set.")
+            http_options: Dict[str, Any] = {"timeout": int(timeout * 1000)}  # milliseconds
+            base_url = os.environ.get("GEMINI_BASE_URL")
+            if base_url:
+                http_options["base_url"] = base_url
+            _CLIENT = Client(api_key=api_key, http_options=http_options)
+    return _CLIENT
 
-    client = Client(api_key=api_key)
+def set_client(client) -> None:
+    """Install a client (real or fake) to be used by all subsequent calls."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        _CLIENT = client
 
+def reset_client() -> None:
+    """Drop the shared client, e.g. after rotating GOOGLE_API_KEY."""
+    set_client(None)
+
+def set_max_concurrency(limit: int) -> None:
+    """Cap the number of in-flight async requests per event loop."""
+    global _MAX_CONCURRENCY
+    _MAX_CONCURRENCY = max(1, int(limit))
+    _SEMAPHORES.clear()
+
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _SEMAPHORES.get(loop)
+    if sem is None:
+        sem = _SEMAPHORES[loop] = asyncio.Semaphore(_MAX_CONCURRENCY)
+    return sem
+
+# ----------------------------
+# Prompt / response handling
+# ----------------------------
+def _build_prompt(conversation_text: str, truncate: bool = True) -> str:
     instr = _build_instruction()
-    if len(conversation_text) > MAX_PROMPT_CHARS:
+    if truncate and len(conversation_text) > MAX_PROMPT_CHARS:
         conversation_text = conversation_text[:MAX_PROMPT_CHARS] + "\n... [truncated]"
+    return f"{instr}\n\nconversation:\n{conversation_text}\n\nReturn ONLY the JSON."
+
+def _build_chunk_prompt(chunk_text: str, index: int, total: int) -> str:
+    instr = _build_chunk_instruction(index, total)
+    return f"{instr}\n\nconversation segment:\n{chunk_text}\n\nReturn ONLY the JSON."
 
-    prompt = f"{instr}\n\nconversation:\n{conversation_text}\n\nReturn ONLY the JSON."
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // CHARS_PER_TOKEN + 1
 
-    response = client.models.generate_content(
-        model=model,
-        contents=prompt,
-        config={"temperature": 0.0, "max_output_tokens": 512}
-    )
+def split_transcript(conversation_text: str, max_tokens: int = CHUNK_TOKEN_BUDGET) -> List[str]:
+    """
+    Split a transcript into chunks of at most ~max_tokens, breaking between lines
+    (turns) where possible; a single line over budget is split by characters.
+    """
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in conversation_text.splitlines():
+        pieces = [line[i:i + max_chars] for i in range(0, len(line), max_chars)] or [""]
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
 
-    output_text = response.text
+def _generation_config() -> Dict[str, Any]:
+    return {"temperature": 0.0, "max_output_tokens": 512}
 
+def _parse_json_output(output_text: str) -> Dict[str, Any]:
+    output_text = output_text or ""
     # Extract JSON
     start = output_text.find("{")
     end = output_text.rfind("}")
@@ -71,3 +189,163 @@ def generate_json_from_conversation(conversation_text: str, model: str = DEFAULT
             raise RuntimeError(f"Missing key '{r}' in Gemini JSON: {parsed}")
 
     return parsed
+
+def _label_for(score: float) -> str:
+    if score >= 0.05:
+        return "Positive"
+    if score <= -0.05:
+        return "Negative"
+    return "Neutral"
+
+def _reduce_chunk_results(parts: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """
+    Merge per-chunk results into one Tier 1 result:
+    - average_score / confidence: chunk values weighted by chunk length
+    - trend: first vs last half of the chunks (same +-0.05 rule as the local fallback);
+      if that is flat, the majority of the chunks' own trends
+    - reason: the first and last segments' reasons
+    """
+    total = float(sum(weights)) or 1.0
+    scores = [float(p["average_score"]) for p in parts]
+    avg = sum(s * w for s, w in zip(scores, weights)) / total
+    confidence = sum(float(p["confidence"]) * w for p, w in zip(parts, weights)) / total
+
+    half = max(1, len(parts) // 2)
+    delta = sum(scores[-half:]) / half - sum(scores[:half]) / half
+    if delta >= 0.05:
+        trend = "Improving"
+    elif delta <= -0.05:
+        trend = "Worsening"
+    else:
+        votes: Dict[str, int] = {}
+        for p in parts:
+            votes[p["trend"]] = votes.get(p["trend"], 0) + 1
+        trend = max(votes, key=lambda t: (votes[t], t == "Stable"))
+
+    reason = f"Analyzed in {len(parts)} segments. Start: {parts[0]['reason']}"
+    if len(parts) > 1:
+        reason += f" End: {parts[-1]['reason']}"
+    return {
+        "overall_label": _label_for(avg),
+        "average_score": avg,
+        "trend": trend,
+        "reason": reason,
+        "confidence": confidence,
+        "segments": len(parts),
+    }
+
+# ----------------------------
+# Retry policy
+# ----------------------------
+def is_transient_error(exc: BaseException) -> bool:
+    if isinstance(exc, _TRANSIENT_EXC):
+        return True
+    # httpx is only loaded by the SDK; if it raised, it is already imported.
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS
+
+def _backoff_delay(attempt: int) -> float:
+    # "Full jitter": uniform in [0, min(cap, base * 2^attempt)]
+    return random.uniform(0.0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+def _call_with_retries(call: Callable[[], Any], max_retries: int) -> Any:
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Exception as e:
+            if attempt >= max_retries or not is_transient_error(e):
+                raise
+            metrics.inc("liabot_gemini_retries_total")
+            time.sleep(_backoff_delay(attempt))
+            attempt += 1
+
+async def _acall_with_retries(call: Callable[[], Awaitable[Any]], max_retries: int, timeout: Optional[float]) -> Any:
+    attempt = 0
+    while True:
+        try:
+            return await asyncio.wait_for(call(), timeout)
+        except Exception as e:
+            if attempt >= max_retries or not is_transient_error(e):
+                raise
+            metrics.inc("liabot_gemini_retries_total")
+            await asyncio.sleep(_backoff_delay(attempt))
+            attempt += 1
+
+# ----------------------------
+# Public API
+# ----------------------------
+def _generate(client, prompt: str, model: str, max_retries: int) -> Dict[str, Any]:
+    with metrics.timer("gemini_request"):
+        response = _call_with_retries(
+            lambda: client.models.generate_content(model=model, contents=prompt, config=_generation_config()),
+            max_retries,
+        )
+    with metrics.timer("gemini_parse"):
+        return _parse_json_output(response.text)
+
+async def _agenerate(client, prompt: str, model: str, max_retries: int, timeout: Optional[float]) -> Dict[str, Any]:
+    async with _get_semaphore():
+        with metrics.timer("gemini_request"):
+            response = await _acall_with_retries(
+                lambda: client.aio.models.generate_content(model=model, contents=prompt, config=_generation_config()),
+                max_retries,
+                timeout,
+            )
+    with metrics.timer("gemini_parse"):
+        return _parse_json_output(response.text)
+
+def generate_json_from_conversation(conversation_text: str, model: str = DEFAULT_MODEL,
+                                    max_retries: int = DEFAULT_MAX_RETRIES,
+                                    long_mode: bool = True) -> Dict[str, Any]:
+    """
+    Analyze a conversation with Gemini and return the Tier 1 JSON.
+    Transcripts over MAX_PROMPT_CHARS go through generate_json_from_long_conversation
+    unless long_mode is False, in which case they are truncated.
+    """
+    client = get_client()
+    if long_mode and len(conversation_text) > MAX_PROMPT_CHARS:
+        return generate_json_from_long_conversation(conversation_text, model=model, max_retries=max_retries)
+    return _generate(client, _build_prompt(conversation_text), model, max_retries)
+
+def generate_json_from_long_conversation(conversation_text: str, model: str = DEFAULT_MODEL,
+                                         max_retries: int = DEFAULT_MAX_RETRIES,
+                                         chunk_tokens: int = CHUNK_TOKEN_BUDGET) -> Dict[str, Any]:
+    """
+    Map-reduce over token-budgeted chunks: every chunk is analyzed (up to the
+    concurrency limit at once) and the results are merged by _reduce_chunk_results.
+    """
+    client = get_client()
+    chunks = split_transcript(conversation_text, chunk_tokens)
+    if len(chunks) == 1:
+        return _generate(client, _build_prompt(chunks[0], truncate=False), model, max_retries)
+
+    prompts = [_build_chunk_prompt(c, i, len(chunks)) for i, c in enumerate(chunks, 1)]
+    with ThreadPoolExecutor(max_workers=min(len(prompts), _MAX_CONCURRENCY)) as pool:
+        parts = list(pool.map(lambda p: _generate(client, p, model, max_retries), prompts))
+    return _reduce_chunk_results(parts, [len(c) for c in chunks])
+
+async def agenerate_json_from_conversation(conversation_text: str, model: str = DEFAULT_MODEL,
+                                           timeout: Optional[float] = DEFAULT_TIMEOUT,
+                                           max_retries: int = DEFAULT_MAX_RETRIES) -> Dict[str, Any]:
+    """
+    Async variant of generate_json_from_conversation.
+    At most set_max_concurrency() requests are in flight per event loop; each
+    attempt is bounded by `timeout` seconds and transient failures are retried.
+    Long transcripts are chunked and their segments analyzed concurrently.
+    """
+    client = get_client()
+    if len(conversation_text) <= MAX_PROMPT_CHARS:
+        return await _agenerate(client, _build_prompt(conversation_text), model, max_retries, timeout)
+
+    chunks = split_transcript(conversation_text, CHUNK_TOKEN_BUDGET)
+    if len(chunks) == 1:
+        return await _agenerate(client, _build_prompt(chunks[0], truncate=False), model, max_retries, timeout)
+    parts = await asyncio.gather(*[
+        _agenerate(client, _build_chunk_prompt(c, i, len(chunks)), model, max_retries, timeout)
+        for i, c in enumerate(chunks, 1)
+    ])
+    return _reduce_chunk_results(list(parts), [len(c) for c in chunks])
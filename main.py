@@ -2,13 +2,19 @@
 """
 CLI entrypoint for the final system flow:
 - rule-based chatbot handles conversation
-- /end triggers Tier 2 (statement-level) and Tier 1 (Gemini) analyses
+- /end triggers Tier 2 (statement-level) and Tier 1 (Gemini) analyses, run
+  concurrently with a deadline (end_pipeline.run_end_pipeline, LIABOT_END_DEADLINE)
+- after each reply, a live mood / trend line from the bot's SentimentTracker
+- LIABOT_TRACE=1 prints a per-stage timing trace of the /end analysis
+- LIABOT_RESULTS_STORE=<dir> appends the /end results to a columnar results store
 """
 
 from chatbot import SimpleChatbot
-from utils import extract_user_messages
-from sentiment_statement import analyze_statement
-from sentiment_conversation import analyze_conversation_with_gemini
+from sentiment_statement import analyze_statement, warm_up
+from end_pipeline import run_end_pipeline
+from sentiment_tracker import mood_line
+import contextlib
+import metrics
 import os
 import sys
 
@@ -17,8 +23,77 @@ LABEL_EMOJI = {"Positive": "🙂", "Negative": "😞", "Neutral": "😐"}
 def print_separator():
     print("-" * 70)
 
+def open_results_store():
+    """The LIABOT_RESULTS_STORE results store, opened once per process (None if unset or unavailable)."""
+    store_path = os.environ.get("LIABOT_RESULTS_STORE")
+    if not store_path:
+        return None
+    try:
+        from results_store import ResultsStore
+        return ResultsStore(store_path)
+    except Exception as e:
+        print("Could not open results store", store_path, "-", e)
+        return None
+
+def end_conversation(bot: SimpleChatbot, store=None) -> bool:
+    """
+    Print the Tier 2 and Tier 1 analyses. Gemini, Tier 2 and the local fallback run
+    concurrently (see end_pipeline). Returns False if the analysis failed outright.
+    store: an open ResultsStore to append the results to (see open_results_store).
+    """
+    # Allow override by env var to force local fallback
+    use_gemini = os.environ.get("FORCE_LOCAL_SENTIMENT", "").lower() not in ("1", "true", "yes")
+
+    try:
+        result = run_end_pipeline(bot, use_gemini=use_gemini)
+    except Exception as e:
+        print_separator()
+        print("Conversation-level sentiment: Failed to analyze with Gemini and fallback. Error:", e)
+        return False
+
+    # Tier 2 — Statement-level sentiment
+    print_separator()
+    print("Statement-level sentiment (Tier 2):")
+    for i, r in enumerate(result["statements"], 1):
+        emoji = LABEL_EMOJI.get(r["label"], "")
+        print(f"{i:02d}. \"{r['text']}\" -> {r['label']} (score={r['score']:.3f}) {emoji}")
+
+    # Tier 1 — Conversation-level sentiment (Gemini, or the local fallback)
+    llm_res = result["conversation"]
+    source = result["source"] + (f" ({result['fallback_reason']})" if result["fallback_reason"] else "")
+    print_separator()
+    print("Conversation-level sentiment (Tier 1):")
+    print(f"Overall label: {llm_res['overall_label']} {LABEL_EMOJI.get(llm_res['overall_label'],'')}")
+    print(f"Average score: {llm_res['average_score']:.3f}")
+    print(f"Trend: {llm_res['trend']}")
+    print(f"Confidence: {llm_res['confidence']:.2f}")
+    print(f"Reason: {llm_res['reason']}")
+    print(f"Source: {source}")
+    print_separator()
+
+    if store is not None:
+        try:
+            store.add_conversation(result["statements"], llm_res)
+            store.flush()
+        except Exception as e:
+            print("Could not save results to", store.path, "-", e)
+    return True
+
 def run_cli():
-    bot = SimpleChatbot(name="LiaBot")
+    # Load the statement model while the user is typing; set LIABOT_NO_WARMUP=1 to skip.
+    if os.environ.get("LIABOT_NO_WARMUP", "").lower() not in ("1", "true", "yes"):
+        warm_up(background=True)
+
+    # Each user turn is scored in the background while the chat goes on.
+    bot = SimpleChatbot(name="LiaBot", scorer=analyze_statement, background=True)
+    store = open_results_store()
+    try:
+        _chat_loop(bot, store)
+    finally:
+        if store is not None:
+            store.close()
+
+def _chat_loop(bot: SimpleChatbot, store) -> None:
     print("LiaBot — Rule-based chatbot with sentiment analysis")
     print("Type messages. Commands: /end -> finish & analyze, /quit -> exit\n")
 
@@ -37,48 +112,22 @@ def run_cli():
             return
 
         if user.lower() == "/end":
-            conv = bot.get_conversation_history()
-            user_msgs = extract_user_messages(conv)
-
-            # Tier 2 — Statement-level sentiment
-            print_separator()
-            print("Statement-level sentiment (Tier 2):")
-            per_results = []
-            for i, m in enumerate(user_msgs, 1):
-                r = analyze_statement(m)
-                per_results.append(r)
-                emoji = LABEL_EMOJI.get(r["label"], "")
-                print(f"{i:02d}. \"{r['text']}\" -> {r['label']} (score={r['score']:.3f}) {emoji}")
-
-            # Build conversation text for Gemini (includes Bot messages to give context)
-            conv_text = bot.as_text(include_bot=True)
-
-            # Tier 1 — Conversation-level sentiment (Gemini)
-            use_gemini = True
-            # Allow override by env var to force local fallback
-            if os.environ.get("FORCE_LOCAL_SENTIMENT", "").lower() in ("1", "true", "yes"):
-                use_gemini = False
-
-            try:
-                llm_res = analyze_conversation_with_gemini(conv_text, use_gemini=use_gemini)
-            except Exception as e:
+            trace_enabled = os.environ.get("LIABOT_TRACE", "").lower() in ("1", "true", "yes")
+            with (metrics.trace("/end") if trace_enabled else contextlib.nullcontext()) as trace:
+                finished = end_conversation(bot, store)
+            if trace is not None:
+                print(trace.format())
                 print_separator()
-                print("Conversation-level sentiment: Failed to analyze with Gemini and fallback. Error:", e)
-                return
-
-            print_separator()
-            print("Conversation-level sentiment (Tier 1):")
-            print(f"Overall label: {llm_res['overall_label']} {LABEL_EMOJI.get(llm_res['overall_label'],'')}")
-            print(f"Average score: {llm_res['average_score']:.3f}")
-            print(f"Trend: {llm_res['trend']}")
-            print(f"Confidence: {llm_res['confidence']:.2f}")
-            print(f"Reason: {llm_res['reason']}")
-            print_separator()
+            if finished:
+                bot.close()
             return
 
         # normal message: bot handles it (rule-based)
         bot_reply = bot.handle_user(user)
         print(f"Bot: {bot_reply}")
+        mood = bot.tracker.snapshot()
+        if mood["count"]:  # scores arrive from the background worker
+            print(f"     [{mood_line(mood)}]")
 
 if __name__ == "__main__":
     run_cli()
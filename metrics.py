@@ -0,0 +1,264 @@
+# metrics.py
+"""
+Lightweight timing and counter layer for both sentiment tiers.
+
+- Counters and histograms live in one process-wide registry, exported as
+  Prometheus text (prometheus_text()) or a JSON-able dict (snapshot()).
+- Recording is off unless LIABOT_METRICS=1 (or enable() is called). When off,
+  inc()/observe() return after one flag check and timer() hands back a shared
+  no-op context manager, so instrumented hot paths cost next to nothing.
+- trace() starts a per-request trace (a ContextVar): while it is active, timed
+  stages and counters in the same context are also recorded on the Trace, whose
+  format() output the CLI prints. Tracing works whether or not metrics are enabled.
+  Work on other threads is recorded on the caller's trace only when the context is
+  propagated, as end_pipeline does for its Gemini thread (contextvars.copy_context());
+  plain executor submits start from an empty context and are not traced.
+
+Metric names:
+  liabot_stage_seconds{stage}                 histogram: model_load, tokenize, forward,
+                                              gemini_request, gemini_parse, tier1, fallback,
+                                              tier2_wait (CLI)
+  liabot_statement_batch_size                 histogram: rows per forward pass
+  liabot_cache_requests_total{cache,result}   counter: statement / conversation, hit / miss
+  liabot_gemini_retries_total                 counter
+  liabot_gemini_failures_total                counter: Tier 1 calls that fell back after an error
+  liabot_tier1_total{source}                  counter: gemini / cache / fallback
+  liabot_end_deadline_missed_total            counter: /end fell back because Gemini was too slow
+  liabot_circuit_transitions_total{breaker,state}  counter: circuit breaker state changes
+  liabot_circuit_rejected_total{breaker}      counter: calls short-circuited while open
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+HELP = {
+    "liabot_stage_seconds": "Latency of pipeline stages in seconds.",
+    "liabot_statement_batch_size": "Rows per statement-model forward pass.",
+    "liabot_cache_requests_total": "Cache lookups by cache and result.",
+    "liabot_gemini_retries_total": "Gemini requests retried after a transient error.",
+    "liabot_gemini_failures_total": "Tier 1 Gemini calls that failed and fell back.",
+    "liabot_tier1_total": "Tier 1 results by source.",
+    "liabot_end_deadline_missed_total": "/end requests where Gemini missed the deadline.",
+    "liabot_circuit_transitions_total": "Circuit breaker transitions by new state.",
+    "liabot_circuit_rejected_total": "Calls rejected while a circuit breaker was open.",
+}
+
+BUCKETS = {"liabot_statement_batch_size": SIZE_BUCKETS}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_ENABLED = os.environ.get("LIABOT_METRICS", "").lower() in ("1", "true", "yes")
+_LOCK = threading.Lock()
+_COUNTERS: Dict[str, Dict[LabelKey, float]] = {}
+_HISTOGRAMS: Dict[str, Dict[LabelKey, "Histogram"]] = {}
+_TRACE: ContextVar[Optional["Trace"]] = ContextVar("liabot_trace", default=None)
+
+def enable(on: bool = True) -> None:
+    global _ENABLED
+    _ENABLED = bool(on)
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+def reset() -> None:
+    with _LOCK:
+        _COUNTERS.clear()
+        _HISTOGRAMS.clear()
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)  # non-cumulative; +Inf is count - sum(counts)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+# ----------------------------
+# Recording
+# ----------------------------
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    trace = _TRACE.get()
+    if trace is not None:
+        trace.count(name, value, labels)
+    if not _ENABLED:
+        return
+    key = tuple(sorted(labels.items()))
+    with _LOCK:
+        series = _COUNTERS.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+def observe(name: str, value: float, **labels: str) -> None:
+    if not _ENABLED:
+        return
+    key = tuple(sorted(labels.items()))
+    with _LOCK:
+        series = _HISTOGRAMS.setdefault(name, {})
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+        hist.observe(value)
+
+def record_cache(cache: str, hits: int, misses: int) -> None:
+    """Count cache hits / misses for one lookup pass (zero counts are skipped)."""
+    if hits:
+        inc("liabot_cache_requests_total", hits, cache=cache, result="hit")
+    if misses:
+        inc("liabot_cache_requests_total", misses, cache=cache, result="miss")
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+class _StageTimer:
+    __slots__ = ("stage", "trace", "start")
+
+    def __init__(self, stage: str, trace: Optional["Trace"]):
+        self.stage = stage
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        observe("liabot_stage_seconds", elapsed, stage=self.stage)
+        if self.trace is not None:
+            self.trace.span(self.stage, self.start, elapsed, error=exc_type is not None)
+        return False
+
+def timer(stage: str):
+    """Context manager timing one pipeline stage into liabot_stage_seconds (and the active trace)."""
+    trace = _TRACE.get()
+    if not _ENABLED and trace is None:
+        return _NOOP_TIMER
+    return _StageTimer(stage, trace)
+
+# ----------------------------
+# Per-request traces
+# ----------------------------
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.elapsed: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage: str, start: float, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.spans.append({"stage": stage, "offset": start - self.start, "seconds": seconds, "error": error})
+
+    def count(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        key = name + ("{" + ",".join(f"{k}={v}" for k, v in sorted(labels.items())) + "}" if labels else "")
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "seconds": self.elapsed, "spans": list(self.spans), "counters": dict(self.counters)}
+
+    def format(self) -> str:
+        total = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start
+        lines = [f"trace {self.name}: {1000 * total:.1f} ms"]
+        for s in sorted(self.spans, key=lambda s: s["offset"]):
+            flag = "  (error)" if s["error"] else ""
+            lines.append(f"  +{1000 * s['offset']:8.1f} ms  {s['stage']:<15} {1000 * s['seconds']:8.1f} ms{flag}")
+        for key, value in sorted(self.counters.items()):
+            lines.append(f"  {key} = {value:g}")
+        return "\n".join(lines)
+
+@contextmanager
+def trace(name: str = "request") -> Iterator[Trace]:
+    """Record stages and counters of the enclosed work (in this context) on a new Trace."""
+    t = Trace(name)
+    token = _TRACE.set(t)
+    try:
+        yield t
+    finally:
+        t.elapsed = time.perf_counter() - t.start
+        _TRACE.reset(token)
+
+def current_trace() -> Optional[Trace]:
+    return _TRACE.get()
+
+# ----------------------------
+# Export
+# ----------------------------
+def _label_str(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+def _fmt(value: float) -> str:
+    return "+Inf" if value == float("inf") else f"{value:g}"
+
+def prometheus_text() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    out: List[str] = []
+    with _LOCK:
+        for name, series in sorted(_COUNTERS.items()):
+            out.append(f"# HELP {name} {HELP.get(name, name)}")
+            out.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                out.append(f"{name}{_label_str(key)} {_fmt(value)}")
+        for name, series in sorted(_HISTOGRAMS.items()):
+            out.append(f"# HELP {name} {HELP.get(name, name)}")
+            out.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    out.append(f"{name}_bucket{_label_str(key, (('le', _fmt(bound)),))} {cumulative}")
+                out.append(f"{name}_bucket{_label_str(key, (('le', '+Inf'),))} {hist.count}")
+                out.append(f"{name}_sum{_label_str(key)} {_fmt(hist.sum)}")
+                out.append(f"{name}_count{_label_str(key)} {hist.count}")
+    return "\n".join(out) + "\n"
+
+def snapshot() -> Dict[str, Any]:
+    """All metrics as plain data: counters as values, histograms as count/sum/mean/buckets."""
+    def labels(key: LabelKey) -> Dict[str, str]:
+        return dict(key)
+
+    with _LOCK:
+        counters = {name: [{"labels": labels(k), "value": v} for k, v in sorted(series.items())]
+                    for name, series in sorted(_COUNTERS.items())}
+        histograms = {
+            name: [{
+                "labels": labels(k),
+                "count": h.count,
+                "sum": h.sum,
+                "mean": h.sum / h.count if h.count else 0.0,
+                "buckets": {_fmt(b): n for b, n in zip(h.buckets, h.counts)},
+            } for k, h in sorted(series.items())]
+            for name, series in sorted(_HISTOGRAMS.items())
+        }
+    return {"enabled": _ENABLED, "counters": counters, "histograms": histograms}
+
+def to_json(**kwargs) -> str:
+    return json.dumps(snapshot(), **kwargs)
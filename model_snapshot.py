@@ -0,0 +1,150 @@
+# model_snapshot.py
+"""
+Local, memory-mapped snapshot of the statement-sentiment model for fast, offline cold starts.
+
+Loading through pipeline("sentiment-analysis", model=MODEL_NAME) resolves hub metadata
+and deserializes every weight into fresh process memory. A snapshot is exported once:
+
+  <dir>/snapshot.json    manifest (model name, library versions)
+  <dir>/config.json      model config
+  <dir>/tokenizer*       tokenizer files (save_pretrained)
+  <dir>/weights.pt       torch.save'd state dict plus non-persistent buffers
+
+and loaded with no network access: the model skeleton is built on the meta device
+(no random init), weights.pt is opened with torch.load(mmap=True) and the mapped
+tensors become the parameters (load_state_dict(assign=True)). Pages are read
+lazily from the page cache, so every process loading the same snapshot shares
+one physical copy of the weights (until a process writes to them).
+
+get_pipeline() in sentiment_statement uses the snapshot when SENTIMENT_SNAPSHOT_DIR
+is set. The int8 backend still makes a private quantized copy, and the onnx
+backend reads its own model file, so the sharing applies to the torch backend.
+
+Usage:
+    python model_snapshot.py export ~/.cache/liabot/snapshot
+    SENTIMENT_SNAPSHOT_DIR=~/.cache/liabot/snapshot python main.py
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "snapshot.json"
+WEIGHTS = "weights.pt"
+FORMAT_VERSION = 1
+
+def snapshot_dir() -> Optional[str]:
+    """The configured snapshot directory (SENTIMENT_SNAPSHOT_DIR), or None."""
+    path = os.environ.get("SENTIMENT_SNAPSHOT_DIR")
+    return os.path.expanduser(path) if path else None
+
+def save_snapshot(tokenizer, model, path: str, model_name: str) -> str:
+    """Write an already-loaded tokenizer and model to `path` in the snapshot layout."""
+    import torch
+    import transformers
+
+    os.makedirs(path, exist_ok=True)
+    model = model.cpu().eval()
+    state = {k: v.contiguous() for k, v in model.state_dict().items()}
+    # Non-persistent buffers (e.g. position_ids) are not in the state dict but must
+    # be real tensors after a meta-device build, so they are stored alongside it.
+    buffers = {name: buf.contiguous() for name, buf in model.named_buffers() if name not in state}
+
+    tokenizer.save_pretrained(path)
+    model.config.save_pretrained(path)
+    tmp = os.path.join(path, WEIGHTS + ".tmp")
+    torch.save({"state_dict": state, "buffers": buffers}, tmp)
+    os.replace(tmp, os.path.join(path, WEIGHTS))
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "model_name": model_name,
+            "architecture": type(model).__name__,
+            "torch": torch.__version__,
+            "transformers": transformers.__version__,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+    logger.info("Saved model snapshot of %s to %s", model_name, path)
+    return path
+
+def export_snapshot(path: str, model_name: Optional[str] = None) -> str:
+    """Download (or read from the hub cache) model_name and save it as a snapshot."""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    from sentiment_statement import MODEL_NAME
+
+    model_name = model_name or MODEL_NAME
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    return save_snapshot(tokenizer, model, path, model_name)
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No model snapshot at {path} (missing {MANIFEST}); "
+                                f"create one with: python model_snapshot.py export {path}")
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_snapshot(path: str, expected_model: Optional[str] = None) -> Tuple[Any, Any]:
+    """
+    (tokenizer, model) from a snapshot, without network access. The model's weights
+    are memory-mapped from weights.pt rather than copied.
+    expected_model: raise ValueError if the snapshot holds a different model
+    (cached results are keyed by model name).
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+    manifest = read_manifest(path)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')!r} in {path}")
+    if expected_model and manifest.get("model_name") != expected_model:
+        raise ValueError(f"Snapshot at {path} holds {manifest.get('model_name')!r}, expected {expected_model!r}")
+
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+    config = AutoConfig.from_pretrained(path, local_files_only=True)
+    with torch.device("meta"):
+        model = AutoModelForSequenceClassification.from_config(config)
+
+    checkpoint = torch.load(os.path.join(path, WEIGHTS), map_location="cpu", mmap=True, weights_only=True)
+    model.load_state_dict(checkpoint["state_dict"], assign=True)
+    for name, buf in checkpoint["buffers"].items():
+        module_name, _, attr = name.rpartition(".")
+        model.get_submodule(module_name).register_buffer(attr, buf, persistent=False)
+    model.tie_weights()
+    model.eval()
+    return tokenizer, model
+
+def load_pipeline(path: str, expected_model: Optional[str] = None):
+    """A sentiment-analysis pipeline backed by a snapshot (see load_snapshot)."""
+    from transformers import pipeline
+
+    tokenizer, model = load_snapshot(path, expected_model=expected_model)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Export or inspect a local statement-model snapshot.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="save the model and tokenizer to a directory")
+    exp.add_argument("path", nargs="?", default=snapshot_dir(), help="target directory (default: $SENTIMENT_SNAPSHOT_DIR)")
+    exp.add_argument("--model", default=None, help="model name (default: sentiment_statement.MODEL_NAME)")
+    info = sub.add_parser("info", help="print a snapshot's manifest")
+    info.add_argument("path", nargs="?", default=snapshot_dir())
+    args = ap.parse_args(argv)
+
+    if not args.path:
+        ap.error("no snapshot directory given and SENTIMENT_SNAPSHOT_DIR is not set")
+    path = os.path.expanduser(args.path)
+    if args.command == "export":
+        export_snapshot(path, model_name=args.model)
+    print(json.dumps(dict(read_manifest(path), path=os.path.abspath(path)), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# parallel_scoring.py
+"""
+Multi-process statement scoring for bulk / offline jobs.
+
+One Python process running the model leaves most cores of a large CPU node idle
+(a single forward pass does not scale linearly with intra-op threads). ParallelScorer
+spreads the work over a pool of worker processes instead:
+
+- With the "fork" start method (default where available) the model is loaded in
+  the parent *before* the pool is created, so every worker shares the weights
+  copy-on-write instead of loading its own copy. With "spawn" each worker loads
+  the model once in its initializer.
+- Each worker limits torch to threads_per_worker intra-op threads
+  (default: cpu_count // workers), so workers don't oversubscribe the cores.
+- Texts are sorted by length, cut into chunks and distributed with an ordered
+  imap; results are put back in input order.
+- Cache lookups, de-duplication and the label / neutral-threshold mapping stay in
+  the parent and are shared with analyze_statements, so results match the serial path.
+
+Usage:
+    with ParallelScorer(workers=8) as scorer:
+        results = scorer.score(texts)
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+import multiprocessing as mp
+import os
+
+import sentiment_statement
+from sentiment_statement import DEFAULT_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 256
+
+# Set in each worker by _init_worker.
+_WORKER_RUN_MODEL: Optional[Callable[[List[str], int], List[Dict]]] = None
+_WORKER_BATCH_SIZE = DEFAULT_BATCH_SIZE
+
+def default_threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+def _set_torch_threads(threads: int) -> None:
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already fixed in this process (inherited from a parent that used torch)
+
+def _init_worker(run_model, batch_size: int, threads: int, load_model: bool) -> None:
+    global _WORKER_RUN_MODEL, _WORKER_BATCH_SIZE
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    _set_torch_threads(threads)
+    _WORKER_RUN_MODEL = run_model
+    _WORKER_BATCH_SIZE = batch_size
+    if load_model:
+        sentiment_statement.get_backend()
+
+def _score_chunk(texts: List[str]) -> List[Dict]:
+    return _WORKER_RUN_MODEL(texts, _WORKER_BATCH_SIZE)
+
+class ParallelScorer:
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, threads_per_worker: Optional[int] = None,
+                 start_method: Optional[str] = None, run_model: Optional[Callable[[List[str], int], List[Dict]]] = None):
+        """
+        workers: process count (default: os.cpu_count()).
+        chunk_size: texts per task sent to a worker.
+        batch_size: forward-pass batch size inside a worker.
+        run_model: (texts, batch_size) -> raw {"labels", "logits"} per text; must be picklable
+                   under "spawn". Defaults to the statement model (sentiment_statement._run_model).
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = max(1, int(chunk_size))
+        self.batch_size = max(1, int(batch_size))
+        self.threads_per_worker = threads_per_worker or default_threads_per_worker(self.workers)
+        if start_method is None:
+            start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self.start_method = start_method
+        self.uses_model = run_model is None
+        self.run_model = run_model or sentiment_statement._run_model
+        self._pool = None
+
+    def start(self) -> "ParallelScorer":
+        if self._pool is not None:
+            return self
+        preloaded = False
+        if self.start_method == "fork" and self.uses_model:
+            # Load once here; forked workers share the weights copy-on-write.
+            sentiment_statement.get_backend()
+            preloaded = True
+        ctx = mp.get_context(self.start_method)
+        self._pool = ctx.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.run_model, self.batch_size, self.threads_per_worker, self.uses_model and not preloaded),
+        )
+        logger.info("Started %d scoring workers (%s, %d threads each)",
+                    self.workers, self.start_method, self.threads_per_worker)
+        return self
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self) -> "ParallelScorer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run_parallel(self, texts: List[str]) -> List[Dict]:
+        self.start()
+        # Length-sorted chunks keep padding small inside each worker's batches.
+        order = sorted(range(len(texts)), key=lambda k: len(texts[k]))
+        chunks = [order[i:i + self.chunk_size] for i in range(0, len(order), self.chunk_size)]
+        out: List[Optional[Dict]] = [None] * len(texts)
+        for idx, raws in zip(chunks, self._pool.imap(_score_chunk, [[texts[k] for k in c] for c in chunks])):
+            for k, raw in zip(idx, raws):
+                out[k] = raw
+        return out
+
+    def score(self, texts: Sequence[str], neutral_threshold: float = 0.55) -> List[Dict]:
+        """Same contract and results as sentiment_statement.analyze_statements."""
+        return sentiment_statement._score_texts(texts, neutral_threshold, self._run_parallel)
+
+def analyze_statements_parallel(texts: Sequence[str], workers: Optional[int] = None,
+                                neutral_threshold: float = 0.55, **kwargs) -> List[Dict]:
+    """One-shot helper: start a pool, score texts, shut the pool down."""
+    with ParallelScorer(workers=workers, **kwargs) as scorer:
+        return scorer.score(texts, neutral_threshold=neutral_threshold)
@@ -0,0 +1,112 @@
+# prompt_compaction.py
+"""
+Compact serialization of a conversation for the Tier 1 (Gemini) prompt.
+
+Every bot line comes from SimpleChatbot's canned response pools, so it carries no
+information beyond "which kind of reply was this". The compact form:
+- replaces templated bot replies with a short intent tag, e.g. "Bot: [greeting]"
+- collapses runs of identical consecutive exchanges into one, marked "(xN)"
+- optionally drops exchanges whose user message scored Neutral (needs per_results)
+
+User messages are always kept verbatim, so the sentiment signal is unchanged.
+
+Opt-in library API: nothing in the app, CLI, server or batch runner turns it on;
+call analyze_conversation_with_gemini(..., compact=True) to use it.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import re
+
+from chatbot import SimpleChatbot
+from gemini_client import estimate_tokens
+from utils import render_turns
+
+LEGEND = "(Bot replies are canned; [tag] names the reply type. (xN) = exchange repeated N times in a row.)"
+
+_CLARIFY_RE = re.compile(r"^I hear you: '.*'\. Could you explain a bit more\?$", re.S)
+
+def build_bot_tags(bot: Optional[SimpleChatbot] = None) -> Dict[str, str]:
+    """Map every canned reply of `bot` (default: a stock SimpleChatbot) to its intent tag."""
+    bot = bot or SimpleChatbot()
+    tags: Dict[str, str] = {}
+    for rule in bot.matcher.rules:
+        for reply in getattr(bot, rule.pool, []):
+            tags.setdefault(reply, rule.intent)
+    for neutral in bot.neutral_responses:
+        for followup in bot.followup_questions:
+            tags.setdefault(f"{neutral} {followup}", "neutral")
+    return tags
+
+_DEFAULT_TAGS: Optional[Dict[str, str]] = None
+
+def _default_tags() -> Dict[str, str]:
+    global _DEFAULT_TAGS
+    if _DEFAULT_TAGS is None:
+        _DEFAULT_TAGS = build_bot_tags()
+    return _DEFAULT_TAGS
+
+def _bot_line(text: str, tags: Dict[str, str]) -> str:
+    tag = tags.get(text)
+    if tag is None and _CLARIFY_RE.match(text):
+        tag = "clarify"
+    return f"Bot: [{tag}]" if tag is not None else f"Bot: {text}"
+
+def compact_conversation(turns: Sequence[Tuple[str, str]], per_results: Optional[List[Dict[str, Any]]] = None,
+                         drop_neutral: bool = False,
+                         bot_tags: Optional[Dict[str, str]] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns (compact transcript, savings stats).
+    per_results must be in user-message order when drop_neutral is used.
+    """
+    tags = bot_tags if bot_tags is not None else _default_tags()
+
+    # Group into exchanges: a user turn and the bot lines that follow it.
+    exchanges: List[Tuple[Optional[str], List[str]]] = []
+    user_idx = -1
+    for speaker, text in turns:
+        if speaker == "User":
+            user_idx += 1
+            neutral = False
+            if drop_neutral and per_results is not None and user_idx < len(per_results):
+                neutral = per_results[user_idx].get("label") == "Neutral"
+            exchanges.append((None if neutral else f"User: {text}", []))
+        elif speaker == "Bot":
+            line = _bot_line(text, tags)
+            if exchanges:
+                exchanges[-1][1].append(line)
+            else:
+                exchanges.append(("", [line]))  # bot spoke first
+        else:
+            exchanges.append((f"{speaker}: {text}", []))
+
+    kept = [e for e in exchanges if e[0] is not None]
+    if not kept:  # everything was neutral; send it all rather than nothing
+        return compact_conversation(turns, bot_tags=tags)
+
+    lines: List[str] = []
+    marked = False
+    i = 0
+    while i < len(kept):
+        user_line, bot_lines = kept[i]
+        run = 1
+        while i + run < len(kept) and kept[i + run] == kept[i]:
+            run += 1
+        if user_line:
+            lines.append(user_line + (f" (x{run})" if run > 1 else ""))
+        lines.extend(bot_lines)
+        marked = marked or run > 1 or any(l.endswith("]") and l.startswith("Bot: [") for l in bot_lines)
+        i += run
+
+    # The legend only pays for itself when tags or repeat marks were used.
+    compact = "\n".join([LEGEND] + lines if marked else lines)
+    original = render_turns(turns, include_bot=True)
+    stats = {
+        "original_chars": len(original),
+        "compact_chars": len(compact),
+        "saved_chars": len(original) - len(compact),
+        "original_tokens_est": estimate_tokens(original),
+        "compact_tokens_est": estimate_tokens(compact),
+        "saved_ratio": (1.0 - len(compact) / len(original)) if original else 0.0,
+        "dropped_exchanges": len(exchanges) - len(kept),
+    }
+    return compact, stats
@@ -0,0 +1,159 @@
+# result_cache.py
+"""
+Two-level result cache: a bounded in-process LRU in front of an optional
+persistent sqlite store that survives restarts.
+
+Values must be JSON-serializable. Both levels have a size cap; the least
+recently used entries are evicted first. Entries can optionally expire after
+`ttl` seconds. Hit/miss/eviction counters are kept for observability (see stats()).
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+class ResultCache:
+    def __init__(self, max_entries: int = 4096, path: Optional[str] = None, max_disk_entries: int = 100_000,
+                 ttl: Optional[float] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.max_disk_entries = max(1, int(max_disk_entries))
+        self.path = path
+        self.ttl = ttl
+        # key -> (value, expires_at or None)
+        self._mem: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.expirations = 0
+
+        self._db = None
+        self._disk_count = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(entries)")}
+            if "expires_at" not in columns:
+                self._db.execute("ALTER TABLE entries ADD COLUMN expires_at REAL")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            now = time.time()
+            entry = self._mem.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._mem[key]
+                self.expirations += 1
+
+            value, expires_at = self._disk_get(key, now)
+            if value is not _MISSING:
+                self.hits += 1
+                self.disk_hits += 1
+                self._mem_put(key, value, expires_at)
+                return value
+
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = (time.time() + self.ttl) if self.ttl else None
+        with self._lock:
+            self._mem_put(key, value, expires_at)
+            self._disk_put(key, value, expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+                self._disk_count = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "expirations": self.expirations,
+                "size": len(self._mem),
+                "disk_size": self._disk_count,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+    # ----------------------------
+    # Internals (caller holds the lock)
+    # ----------------------------
+    def _mem_put(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        self._mem[key] = (value, expires_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Tuple[Any, Optional[float]]:
+        if self._db is None:
+            return _MISSING, None
+        row = self._db.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISSING, None
+        if row[1] is not None and row[1] <= now:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+            self._disk_count -= 1
+            self.expirations += 1
+            return _MISSING, None
+        self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return json.loads(row[0]), row[1]
+
+    def _disk_put(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        if self._db is None:
+            return
+        exists = self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries (key, value, last_used, expires_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), time.time(), expires_at),
+        )
+        if not exists:
+            self._disk_count += 1
+        overflow = self._disk_count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._disk_count -= overflow
+            self.disk_evictions += overflow
+        self._db.commit()
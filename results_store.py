@@ -0,0 +1,402 @@
+# results_store.py
+"""
+Columnar, append-only store for scored messages (Tier 2) and conversations (Tier 1).
+
+A store is a directory of flat little-endian column files plus a manifest:
+
+  messages       msg_score.f4   statement score
+                 msg_label.u1   label code (LABELS)
+                 msg_conv.u4    conversation row
+                 msg_turn.u4    turn index within the conversation
+                 msg_text.u4    text id in the text pool
+  conversations  conv_start.i8  first message row (messages of row i: start[i] .. start[i+1])
+                 conv_time.f8   unix time the conversation was written
+                 conv_key.u4    text id of the caller's conversation id (NONE if absent)
+                 conv_label.u1, conv_trend.u1, conv_source.u1   Tier 1 codes (NONE if absent)
+                 conv_score.f4, conv_conf.f4                    Tier 1 average score / confidence (NaN if absent)
+  text pool      text.bin (UTF-8), text_end.i8 (end byte of each text),
+                 text_hash.u8 (64-bit BLAKE2b of each text); every distinct text
+                 is stored once (interned)
+  meta.json      committed row counts
+
+Rows are buffered and appended a chunk at a time (flush(), automatic every
+chunk_size messages); meta.json is replaced atomically after the column files are
+synced, so readers see whole chunks only and reopening for append drops any
+partially written tail. Interning looks texts up by hash in a sorted copy of
+text_hash (plus a dict of the texts added since opening), so opening a large store
+for append never decodes the pool. Columns are read back as read-only numpy memmaps, and the
+queries below are vectorized over them: nothing is turned into Python objects
+except the rows you ask for.
+
+Usage:
+    python results_store.py summary results/
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+LABELS = ("Negative", "Neutral", "Positive")
+TRENDS = ("Worsening", "Stable", "Improving")
+SOURCES = ("gemini", "cache", "fallback")
+NONE = 255          # missing code in uint8 columns
+NO_TEXT = 2**32 - 1  # missing text id
+
+MESSAGE_COLUMNS = {
+    "msg_score": "<f4",
+    "msg_label": "u1",
+    "msg_conv": "<u4",
+    "msg_turn": "<u4",
+    "msg_text": "<u4",
+}
+CONVERSATION_COLUMNS = {
+    "conv_start": "<i8",
+    "conv_time": "<f8",
+    "conv_key": "<u4",
+    "conv_label": "u1",
+    "conv_trend": "u1",
+    "conv_source": "u1",
+    "conv_score": "<f4",
+    "conv_conf": "<f4",
+}
+TEXT_END = ("text_end", "<i8")
+TEXT_HASH = ("text_hash", "<u8")
+META = "meta.json"
+DEFAULT_CHUNK_SIZE = 4096
+
+def _code(names: Sequence[str], value: Optional[str]) -> int:
+    try:
+        return names.index(value)
+    except ValueError:
+        return NONE
+
+def _text_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+class ResultsStore:
+    def __init__(self, path: str, mode: str = "a", chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        path: store directory (created in "a" mode).
+        mode: "a" to append (and read), "r" read-only.
+        chunk_size: buffered messages that trigger a flush.
+        """
+        if mode not in ("a", "r"):
+            raise ValueError(f"mode must be 'a' or 'r', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.chunk_size = max(1, int(chunk_size))
+        self._lock = threading.RLock()
+        if mode == "a":
+            os.makedirs(path, exist_ok=True)
+        elif not os.path.exists(os.path.join(path, META)):
+            raise FileNotFoundError(f"No results store at {path}")
+
+        self.meta = self._read_meta()
+        self._views: Dict[str, np.ndarray] = {}
+        self._pending: Dict[str, list] = {name: [] for name in list(MESSAGE_COLUMNS) + list(CONVERSATION_COLUMNS)}
+        self._pending_text: List[bytes] = []
+        self._hash_index: Optional[Tuple[np.ndarray, np.ndarray]] = None  # (sorted hashes, text ids)
+        self._new_ids: Dict[int, int] = {}  # hash -> id of texts added since opening
+        if mode == "a":
+            self._truncate_to_meta()
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+    def add_conversation(self, statements: Sequence[Dict[str, Any]], conversation: Optional[Dict[str, Any]] = None,
+                         conv_id: Any = None, turns: Optional[Sequence[int]] = None,
+                         timestamp: Optional[float] = None) -> int:
+        """
+        Append one conversation: its Tier 2 statement results (in turn order) and,
+        optionally, its Tier 1 result. turns: turn index of each statement
+        (default 0, 1, 2, ...). Returns the conversation's row number.
+        """
+        if self.mode != "a":
+            raise ValueError("store is open read-only")
+        with self._lock:
+            p = self._pending
+            row = self.meta["conversations"] + len(p["conv_start"])
+            p["conv_start"].append(self.meta["messages"] + len(p["msg_score"]))
+            p["conv_time"].append(time.time() if timestamp is None else timestamp)
+            p["conv_key"].append(NO_TEXT if conv_id is None else self._intern(str(conv_id)))
+            conv = conversation or {}
+            p["conv_label"].append(_code(LABELS, conv.get("overall_label")))
+            p["conv_trend"].append(_code(TRENDS, conv.get("trend")))
+            p["conv_source"].append(_code(SOURCES, conv.get("source")))
+            p["conv_score"].append(conv.get("average_score", np.nan))
+            p["conv_conf"].append(conv.get("confidence", np.nan))
+
+            for i, r in enumerate(statements):
+                p["msg_score"].append(r.get("score", 0.0))
+                p["msg_label"].append(_code(LABELS, r.get("label")))
+                p["msg_conv"].append(row)
+                p["msg_turn"].append(turns[i] if turns is not None else i)
+                p["msg_text"].append(self._intern(r.get("text", "")))
+
+            if len(p["msg_score"]) >= self.chunk_size:
+                self.flush()
+            return row
+
+    def flush(self, **extra: Any) -> None:
+        """
+        Append the buffered rows to the column files and commit them. Keyword
+        arguments are saved in the manifest (e.g. a batch job's progress).
+        """
+        if self.mode != "a":
+            return
+        with self._lock:
+            p = self._pending
+            for name, dtype in list(MESSAGE_COLUMNS.items()) + list(CONVERSATION_COLUMNS.items()):
+                if p[name]:
+                    self._append(name, np.asarray(p[name], dtype=dtype).tobytes())
+            if self._pending_text:
+                ends = self.meta["text_bytes"] + np.cumsum([len(b) for b in self._pending_text], dtype=np.int64)
+                self._append("text.bin", b"".join(self._pending_text))
+                self._append(TEXT_END[0], ends.astype(TEXT_END[1]).tobytes())
+                hashes = np.asarray([_text_hash(b) for b in self._pending_text], dtype=TEXT_HASH[1])
+                self._append(TEXT_HASH[0], hashes.tobytes())
+
+            meta = dict(self.meta)
+            meta["messages"] += len(p["msg_score"])
+            meta["conversations"] += len(p["conv_start"])
+            meta["texts"] += len(self._pending_text)
+            meta["text_bytes"] += sum(len(b) for b in self._pending_text)
+            meta["user"] = dict(meta.get("user", {}), **extra)
+            tmp = os.path.join(self.path, META + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(self.path, META))  # commit point
+
+            self.meta = meta
+            for rows in p.values():
+                rows.clear()
+            self._pending_text.clear()
+            self._views.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._views.clear()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ----------------------------
+    # Reading
+    # ----------------------------
+    @property
+    def n_messages(self) -> int:
+        return self.meta["messages"]
+
+    @property
+    def n_conversations(self) -> int:
+        return self.meta["conversations"]
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memmap of a committed column (see MESSAGE_COLUMNS / CONVERSATION_COLUMNS)."""
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                if name in MESSAGE_COLUMNS:
+                    dtype, n = MESSAGE_COLUMNS[name], self.meta["messages"]
+                elif name in CONVERSATION_COLUMNS:
+                    dtype, n = CONVERSATION_COLUMNS[name], self.meta["conversations"]
+                elif name in (TEXT_END[0], TEXT_HASH[0]):
+                    dtype, n = dict((TEXT_END, TEXT_HASH))[name], self.meta["texts"]
+                else:
+                    raise KeyError(name)
+                view = self._map(name, dtype, n)
+                self._views[name] = view
+            return view
+
+    def refresh(self) -> None:
+        """Pick up chunks committed by a writer since this store was opened (read mode)."""
+        with self._lock:
+            self.meta = self._read_meta()
+            self._views.clear()
+
+    def text(self, text_id: int) -> str:
+        return self._text_bytes(text_id).decode("utf-8")
+
+    def statements(self, conv_row: int) -> List[Dict[str, Any]]:
+        """One conversation's statements as {"text", "label", "score"} dicts."""
+        lo, hi = self._message_range(conv_row)
+        scores, labels, texts = (self.column(c)[lo:hi] for c in ("msg_score", "msg_label", "msg_text"))
+        return [{"text": self.text(int(t)), "label": LABELS[int(l)] if l != NONE else None, "score": float(s)}
+                for s, l, t in zip(scores, labels, texts)]
+
+    # ----------------------------
+    # Vectorized queries
+    # ----------------------------
+    def conversation_means(self) -> np.ndarray:
+        """Mean statement score per conversation (NaN for conversations without statements)."""
+        counts = np.bincount(self.column("msg_conv"), minlength=self.n_conversations)
+        sums = np.bincount(self.column("msg_conv"), weights=self.column("msg_score"), minlength=self.n_conversations)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    def label_histogram(self, per_conversation: bool = False) -> np.ndarray:
+        """
+        Statement counts per label (indexed like LABELS); with per_conversation,
+        an (n_conversations, len(LABELS)) array.
+        """
+        labels = self.column("msg_label").astype(np.int64)
+        known = labels < len(LABELS)
+        if not per_conversation:
+            return np.bincount(labels[known], minlength=len(LABELS))
+        flat = self.column("msg_conv")[known].astype(np.int64) * len(LABELS) + labels[known]
+        return np.bincount(flat, minlength=self.n_conversations * len(LABELS)).reshape(-1, len(LABELS))
+
+    def trend_over_time(self, bucket_seconds: float = 86400.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Statement scores bucketed by when their conversation was written.
+        Returns (bucket start times, mean score, statement count) for non-empty buckets.
+        """
+        if not self.n_messages:
+            return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+        times = self.column("conv_time")[self.column("msg_conv")]
+        buckets = np.floor(times / bucket_seconds).astype(np.int64)
+        keys, inverse = np.unique(buckets, return_inverse=True)
+        counts = np.bincount(inverse)
+        means = np.bincount(inverse, weights=self.column("msg_score")) / counts
+        return keys * bucket_seconds, means, counts
+
+    def mean_by_turn(self, max_turn: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(mean score, statement count) by turn index across all conversations."""
+        turns = self.column("msg_turn")
+        scores = self.column("msg_score")
+        if max_turn is not None:
+            keep = turns <= max_turn
+            turns, scores = turns[keep], scores[keep]
+        counts = np.bincount(turns)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.bincount(turns, weights=scores) / counts, counts
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self._file(META), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"messages": 0, "conversations": 0, "texts": 0, "text_bytes": 0, "user": {}}
+
+    def _truncate_to_meta(self) -> None:
+        """
+        Drop anything written after the last commit (an interrupted flush).
+        Raises ValueError if a column holds less than was committed.
+        """
+        sizes = {name: self.meta["messages"] * np.dtype(dtype).itemsize for name, dtype in MESSAGE_COLUMNS.items()}
+        sizes.update({name: self.meta["conversations"] * np.dtype(dtype).itemsize
+                      for name, dtype in CONVERSATION_COLUMNS.items()})
+        sizes[TEXT_END[0]] = self.meta["texts"] * np.dtype(TEXT_END[1]).itemsize
+        sizes[TEXT_HASH[0]] = self.meta["texts"] * np.dtype(TEXT_HASH[1]).itemsize
+        sizes["text.bin"] = self.meta["text_bytes"]
+        for name, size in sizes.items():
+            path = self._file(name)
+            have = os.path.getsize(path) if os.path.exists(path) else 0
+            if have < size:
+                raise ValueError(f"results store {self.path} is missing committed data: {name} has "
+                                 f"{have} of {size} bytes")
+            if have > size:
+                os.truncate(path, size)
+
+    def _append(self, name: str, data: bytes) -> None:
+        with open(self._file(name), "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _map(self, name: str, dtype: str, n: int) -> np.ndarray:
+        if n == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=(n,))
+
+    def _pool(self) -> np.ndarray:
+        with self._lock:
+            view = self._views.get("text.bin")
+            if view is None:
+                view = self._views["text.bin"] = self._map("text.bin", "u1", self.meta["text_bytes"])
+            return view
+
+    def _intern(self, text: str) -> int:
+        data = text.encode("utf-8")
+        h = _text_hash(data)
+        text_id = self._new_ids.get(h)
+        if text_id is None:
+            if self._hash_index is None:
+                # Texts committed before this store was opened, sorted by hash (built once).
+                hashes = np.asarray(self.column(TEXT_HASH[0]))
+                order = np.argsort(hashes, kind="stable")
+                self._hash_index = (hashes[order], order)
+            sorted_hashes, order = self._hash_index
+            i = int(np.searchsorted(sorted_hashes, np.uint64(h)))
+            if i < len(sorted_hashes) and int(sorted_hashes[i]) == h:
+                text_id = int(order[i])
+        if text_id is not None and self._text_bytes(text_id) == data:
+            return text_id
+        # New text (or a hash collision, which is then simply stored again).
+        text_id = self.meta["texts"] + len(self._pending_text)
+        self._new_ids.setdefault(h, text_id)
+        self._pending_text.append(data)
+        return text_id
+
+    def _text_bytes(self, text_id: int) -> bytes:
+        committed = self.meta["texts"]
+        if text_id >= committed:
+            return self._pending_text[text_id - committed]
+        ends = self.column(TEXT_END[0])
+        start = int(ends[text_id - 1]) if text_id else 0
+        return bytes(self._pool()[start:int(ends[text_id])])
+
+    def _message_range(self, conv_row: int) -> Tuple[int, int]:
+        starts = self.column("conv_start")
+        hi = int(starts[conv_row + 1]) if conv_row + 1 < len(starts) else self.n_messages
+        return int(starts[conv_row]), hi
+
+def summary(store: ResultsStore, top: int = 5) -> Dict[str, Any]:
+    means = store.conversation_means()
+    order = np.argsort(np.nan_to_num(means, nan=0.0))
+    keys = store.column("conv_key")
+
+    def _name(row: int) -> str:
+        return store.text(int(keys[row])) if keys[row] != NO_TEXT else f"#{row}"
+
+    times, trend, counts = store.trend_over_time()
+    return {
+        "conversations": store.n_conversations,
+        "messages": store.n_messages,
+        "labels": dict(zip(LABELS, store.label_histogram().tolist())),
+        "mean_score": float(np.mean(store.column("msg_score"))) if store.n_messages else None,
+        "most_negative": [(_name(int(r)), float(means[r])) for r in order[:top]],
+        "most_positive": [(_name(int(r)), float(means[r])) for r in order[::-1][:top]],
+        "by_day": [(time.strftime("%Y-%m-%d", time.gmtime(t)), float(m), int(c)) for t, m, c in zip(times, trend, counts)],
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Query a columnar sentiment results store.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("summary", help="counts, label histogram, extremes and daily trend")
+    s.add_argument("path")
+    s.add_argument("--top", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    store = ResultsStore(args.path, mode="r")
+    print(json.dumps(summary(store, top=args.top), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
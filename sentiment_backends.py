@@ -0,0 +1,172 @@
+# sentiment_backends.py
+"""
+CPU inference backends for the statement-sentiment model.
+
+Every backend wraps the same tokenizer and exposes:
+  encode(texts, max_length) -> token id lists (no padding)
+  forward(batch_ids)        -> raw logits per row, for one padded batch
+  labels                    -> class names indexed like the logits
+and, for sliding-window scoring of long texts:
+  tokenize(texts)           -> full token id lists without special tokens (no truncation)
+  num_special_tokens        -> special tokens added around each window
+  with_special_tokens(ids)  -> one window's ids wrapped as a model input
+
+so sentiment_statement applies the same label/threshold mapping whichever is used.
+
+Available backends (select with SENTIMENT_BACKEND or sentiment_statement.set_backend):
+  torch  - eager fp32 model from the transformers pipeline (default)
+  int8   - the same model with nn.Linear layers dynamically quantized to int8
+  onnx   - model exported once per model name to ONNX and run with onnxruntime
+"""
+
+from typing import Dict, List, Optional, Sequence
+import copy
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+ONNX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "liabot", "onnx")
+
+def onnx_path(model_name: str) -> str:
+    """SENTIMENT_ONNX_PATH if set, else one export per model under ONNX_DIR."""
+    return os.environ.get("SENTIMENT_ONNX_PATH") or os.path.join(ONNX_DIR, model_name.replace("/", "--") + ".onnx")
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, tokenizer, model, model_name: str = ""):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.model_name = model_name
+        self.labels = [model.config.id2label[i] for i in range(model.config.num_labels)]
+
+    def encode(self, texts: Sequence[str], max_length: int) -> List[List[int]]:
+        return self.tokenizer(list(texts), truncation=True, max_length=max_length)["input_ids"]
+
+    def tokenize(self, texts: Sequence[str]) -> List[List[int]]:
+        return self.tokenizer(list(texts), add_special_tokens=False, truncation=False, verbose=False)["input_ids"]
+
+    @property
+    def num_special_tokens(self) -> int:
+        return self.tokenizer.num_special_tokens_to_add()
+
+    def with_special_tokens(self, ids: List[int]) -> List[int]:
+        return self.tokenizer.build_inputs_with_special_tokens(ids)
+
+    def forward(self, batch_ids: List[List[int]]) -> List[List[float]]:
+        import torch
+
+        batch = self.tokenizer.pad({"input_ids": batch_ids}, return_tensors="pt")
+        batch = {k: v.to(self.model.device) for k, v in batch.items()}
+        with torch.inference_mode():
+            return self.model(**batch).logits.float().tolist()
+
+class Int8Backend(TorchBackend):
+    name = "int8"
+
+    def __init__(self, tokenizer, model, model_name: str = ""):
+        import torch
+
+        # Copy so the fp32 model held by the pipeline is left untouched.
+        quantized = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(model).cpu().eval(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        super().__init__(tokenizer, quantized, model_name)
+
+class OnnxBackend(TorchBackend):
+    name = "onnx"
+
+    def __init__(self, tokenizer, model, model_name: str = "", path: Optional[str] = None):
+        import onnxruntime as ort
+
+        super().__init__(tokenizer, model, model_name)
+        path = path or onnx_path(model_name or model.config.name_or_path)
+        if not os.path.exists(path):
+            export_onnx(model, tokenizer, path)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.model = None  # the session replaces the torch model
+
+    def forward(self, batch_ids: List[List[int]]) -> List[List[float]]:
+        batch = self.tokenizer.pad({"input_ids": batch_ids}, return_tensors="np")
+        feeds = {
+            "input_ids": batch["input_ids"].astype("int64"),
+            "attention_mask": batch["attention_mask"].astype("int64"),
+        }
+        return self.session.run(["logits"], feeds)[0].astype("float32").tolist()
+
+def export_onnx(model, tokenizer, path: str) -> str:
+    """Export the classifier to ONNX with dynamic batch and sequence axes."""
+    import torch
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    logger.info("Exporting statement model to ONNX at %s", path)
+    torch.onnx.export(
+        _LogitsOnly(model.cpu().eval()),
+        (sample["input_ids"], sample["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=17,
+    )
+    return path
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    Int8Backend.name: Int8Backend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def create_backend(name: str, tokenizer, model, model_name: str = ""):
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown sentiment backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return cls(tokenizer, model, model_name)
+
+# ----------------------------
+# Accuracy parity
+# ----------------------------
+def _probs(logits: Sequence[float]) -> List[float]:
+    m = max(logits)
+    exps = [math.exp(l - m) for l in logits]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+def parity_report(reference: List[List[float]], candidate: List[List[float]]) -> Dict[str, float]:
+    """
+    Compare two backends' logits for the same inputs.
+    Returns label agreement (fraction of equal argmax) and the max / mean absolute
+    difference of class probabilities.
+    """
+    agree, max_diff, total_diff, n = 0, 0.0, 0.0, 0
+    for ref, cand in zip(reference, candidate):
+        p_ref, p_cand = _probs(ref), _probs(cand)
+        agree += int(p_ref.index(max(p_ref)) == p_cand.index(max(p_cand)))
+        diff = max(abs(a - b) for a, b in zip(p_ref, p_cand))
+        max_diff = max(max_diff, diff)
+        total_diff += diff
+        n += 1
+    return {
+        "n": n,
+        "label_agreement": agree / n if n else 1.0,
+        "max_prob_diff": max_diff,
+        "mean_prob_diff": total_diff / n if n else 0.0,
+    }
@@ -3,17 +3,117 @@
 Wrapper for conversation-level sentiment.
 - Primary flow: call gemini_client.generate_json_from_conversation
 - Fallback: simple aggregator (averaging statement-level scores) if Gemini not available or forced offline.
+  Statement results already computed by the caller (per_results) are reused instead of rescoring.
+- The conversation can be passed as the (speaker, text) turn list from SimpleChatbot;
+  it is only rendered to text for the Gemini prompt, never parsed back.
+- Gemini results are cached by a hash of (conversation text, model, prompt version),
+  so repeat analyses of the same conversation skip the LLM call. Every result carries
+  "cached": True/False.
+- compact=True sends a compacted transcript (see prompt_compaction.py) and adds the
+  character/token savings to the result as "prompt_stats". Opt-in only: no entry
+  point (main, app, server, batch_analyze, end_pipeline) passes it.
+- A SentimentTracker that followed the conversation (tracker=...) produces the
+  fallback directly from its running state.
+- The Gemini call goes through a CircuitBreaker (see circuit_breaker.py): after
+  repeated failures or slow responses the circuit opens and requests go straight
+  to the local aggregator, with a probe call every GEMINI_BREAKER_OPEN_SECONDS.
+- Cache hits, Gemini failures, the result source (gemini / cache / fallback) and
+  stage latencies are recorded through metrics.py.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+import hashlib
 import logging
+import os
 
-from gemini_client import generate_json_from_conversation, DEFAULT_MODEL
-from sentiment_statement import analyze_statement
+import metrics
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from gemini_client import generate_json_from_conversation, prompt_version, DEFAULT_MODEL
+from result_cache import ResultCache
+from sentiment_tracker import SentimentTracker
+from sentiment_statement import analyze_statements
+from utils import extract_user_messages, render_turns
+
+Turns = Sequence[Tuple[str, str]]
 
 logger = logging.getLogger(__name__)
 
-def analyze_conversation_with_gemini(conversation_text: str, model: str = DEFAULT_MODEL, use_gemini: bool = True) -> Dict[str, Any]:
+_CONV_CACHE: Optional[ResultCache] = None
+_CONV_CACHE_DISABLED = False
+
+def get_conversation_cache() -> Optional[ResultCache]:
+    """
+    Tier 1 result cache, configured from the environment on first use:
+      CONVERSATION_CACHE_SIZE  in-memory entries (default 256, 0 disables caching)
+      CONVERSATION_CACHE_TTL   seconds before an entry expires (default 3600)
+      CONVERSATION_CACHE_PATH  sqlite file for a persistent level (default: memory only)
+    """
+    global _CONV_CACHE, _CONV_CACHE_DISABLED
+    if _CONV_CACHE is None and not _CONV_CACHE_DISABLED:
+        size = int(os.environ.get("CONVERSATION_CACHE_SIZE", "256"))
+        if size <= 0:
+            _CONV_CACHE_DISABLED = True
+        else:
+            _CONV_CACHE = ResultCache(
+                max_entries=size,
+                path=os.environ.get("CONVERSATION_CACHE_PATH") or None,
+                ttl=float(os.environ.get("CONVERSATION_CACHE_TTL", "3600")) or None,
+            )
+    return _CONV_CACHE
+
+def configure_conversation_cache(max_entries: int = 256, ttl: Optional[float] = 3600.0, path: Optional[str] = None,
+                                 max_disk_entries: int = 10_000) -> Optional[ResultCache]:
+    """Replace the Tier 1 cache. max_entries <= 0 disables caching."""
+    global _CONV_CACHE, _CONV_CACHE_DISABLED
+    if _CONV_CACHE is not None:
+        _CONV_CACHE.close()
+    if max_entries <= 0:
+        _CONV_CACHE, _CONV_CACHE_DISABLED = None, True
+    else:
+        _CONV_CACHE = ResultCache(max_entries=max_entries, path=path, max_disk_entries=max_disk_entries, ttl=ttl)
+        _CONV_CACHE_DISABLED = False
+    return _CONV_CACHE
+
+_BREAKER: Optional[CircuitBreaker] = None
+_BREAKER_DISABLED = False
+
+def get_gemini_breaker() -> Optional[CircuitBreaker]:
+    """
+    Circuit breaker around the Tier 1 Gemini call, configured from the environment on first use:
+      GEMINI_BREAKER_FAILURE_RATE  fraction of failed or slow recent calls that opens it (default 0.5, 0 disables)
+      GEMINI_BREAKER_MIN_CALLS     calls needed before the rate counts (default 5)
+      GEMINI_BREAKER_SLOW_SECONDS  calls at least this slow count as failures (default 10)
+      GEMINI_BREAKER_OPEN_SECONDS  seconds the circuit stays open before a probe (default 30)
+    """
+    global _BREAKER, _BREAKER_DISABLED
+    if _BREAKER is None and not _BREAKER_DISABLED:
+        rate = float(os.environ.get("GEMINI_BREAKER_FAILURE_RATE", "0.5"))
+        if rate <= 0:
+            _BREAKER_DISABLED = True
+        else:
+            _BREAKER = CircuitBreaker(
+                name="gemini",
+                failure_rate=rate,
+                min_calls=int(os.environ.get("GEMINI_BREAKER_MIN_CALLS", "5")),
+                slow_call_seconds=float(os.environ.get("GEMINI_BREAKER_SLOW_SECONDS", "10")) or None,
+                open_seconds=float(os.environ.get("GEMINI_BREAKER_OPEN_SECONDS", "30")),
+            )
+    return _BREAKER
+
+def configure_gemini_breaker(breaker: Optional[CircuitBreaker]) -> Optional[CircuitBreaker]:
+    """Replace the Tier 1 circuit breaker. None disables it (every call goes to Gemini)."""
+    global _BREAKER, _BREAKER_DISABLED
+    _BREAKER, _BREAKER_DISABLED = breaker, breaker is None
+    return _BREAKER
+
+def _conversation_cache_key(conversation_text: str, model: str) -> str:
+    payload = f"{model}\x00{prompt_version()}\x00{conversation_text}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def analyze_conversation_with_gemini(conversation: Union[str, Turns], model: str = DEFAULT_MODEL, use_gemini: bool = True,
+                                     per_results: Optional[List[Dict[str, Any]]] = None,
+                                     compact: bool = False, drop_neutral: bool = False,
+                                     tracker: Optional[SentimentTracker] = None) -> Dict[str, Any]:
     """
     Returns dict with keys:
     - overall_label
@@ -21,16 +121,104 @@ def analyze_conversation_with_gemini(conversation_text: str, model: str = DEFAUL
     - trend
     - reason
     - confidence
+    - cached (True if served from the Tier 1 cache)
+    - source ("gemini", "cache" or "fallback")
     If use_gemini is False or gemini fails, falls back to _fallback_aggregate.
+    conversation: rendered transcript ("User: ..." lines) or a list of (speaker, text) turns.
+    per_results: statement-level results for the user messages, if already computed;
+    the fallback then aggregates them without running the model again.
+    compact / drop_neutral: send the compact transcript for turn-list input
+    (drop_neutral also needs per_results).
+    tracker: a SentimentTracker fed every user turn; if it has seen any, the fallback
+    is its summary() (no second pass over the scores).
     """
     if use_gemini:
         try:
-            return generate_json_from_conversation(conversation_text, model=model)
+            res = gemini_conversation_sentiment(conversation, model=model, per_results=per_results,
+                                                compact=compact, drop_neutral=drop_neutral)
+            metrics.inc("liabot_tier1_total", source=res["source"])
+            return res
+        except CircuitOpenError:
+            logger.debug("Gemini circuit is open, using local aggregation")
         except Exception as e:
             logger.warning("Gemini call failed, falling back to local aggregation: %s", e)
+    metrics.inc("liabot_tier1_total", source="fallback")
+    return local_conversation_sentiment(conversation, per_results=per_results, tracker=tracker)
 
-    # fallback
-    return _fallback_aggregate_from_text(conversation_text)
+def gemini_conversation_sentiment(conversation: Union[str, Turns], model: str = DEFAULT_MODEL,
+                                  per_results: Optional[List[Dict[str, Any]]] = None,
+                                  compact: bool = False, drop_neutral: bool = False) -> Dict[str, Any]:
+    """
+    Tier 1 from Gemini (or the Tier 1 cache) only; raises if the Gemini call fails,
+    or CircuitOpenError without calling Gemini while the breaker is open.
+    Same arguments and result keys as analyze_conversation_with_gemini. Does not count
+    liabot_tier1_total: the caller does, for the result it actually uses.
+    """
+    is_text = isinstance(conversation, str)
+    prompt_stats = None
+    if compact and not is_text:
+        from prompt_compaction import compact_conversation
+        conversation_text, prompt_stats = compact_conversation(conversation, per_results, drop_neutral=drop_neutral)
+        logger.debug("Compact Tier 1 prompt: %s", prompt_stats)
+    elif is_text:
+        conversation_text = conversation
+    elif hasattr(conversation, "as_text"):
+        conversation_text = conversation.as_text(include_bot=True)  # pre-rendered by the store
+    else:
+        conversation_text = render_turns(conversation, include_bot=True)
+    cache = get_conversation_cache()
+    key = _conversation_cache_key(conversation_text, model) if cache is not None else None
+    hit = cache.get(key) if cache is not None else None
+    if cache is not None:
+        metrics.record_cache("conversation", int(hit is not None), int(hit is None))
+    if hit is not None:
+        return _with_prompt_stats(dict(hit, cached=True, source="cache"), prompt_stats)
+    breaker = get_gemini_breaker()
+    try:
+        with metrics.timer("tier1"):
+            if breaker is not None:
+                res = breaker.call(generate_json_from_conversation, conversation_text, model=model)
+            else:
+                res = generate_json_from_conversation(conversation_text, model=model)
+    except CircuitOpenError:
+        raise
+    except Exception:
+        metrics.inc("liabot_gemini_failures_total")
+        raise
+    if cache is not None:
+        cache.put(key, res)
+    return _with_prompt_stats(dict(res, cached=False, source="gemini"), prompt_stats)
+
+def local_conversation_sentiment(conversation: Union[str, Turns],
+                                 per_results: Optional[List[Dict[str, Any]]] = None,
+                                 tracker: Optional[SentimentTracker] = None) -> Dict[str, Any]:
+    """
+    The local Tier 1 fallback: the tracker's summary if it has seen any turns, else an
+    aggregate of per_results, else the user messages are scored first.
+    Never cached: it is cheap, and Gemini should be retried next time.
+    """
+    with metrics.timer("fallback"):
+        if tracker is not None and tracker.count:
+            res = tracker.summary()
+        elif per_results is not None:
+            res = _aggregate_statement_results(per_results)
+        elif isinstance(conversation, str):
+            res = _fallback_aggregate_from_text(conversation)
+        else:
+            res = _fallback_aggregate_from_turns(conversation)
+    return dict(res, cached=False, source="fallback")
+
+def _with_prompt_stats(res: Dict[str, Any], prompt_stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if prompt_stats is not None:
+        res["prompt_stats"] = prompt_stats
+    return res
+
+def _fallback_aggregate_from_turns(turns: Turns) -> Dict[str, Any]:
+    """
+    Fallback over a structured turn list: user messages are taken as-is (multi-line
+    messages stay whole).
+    """
+    return _aggregate_statement_results(analyze_statements(extract_user_messages(turns)))
 
 def _fallback_aggregate_from_text(conv_text: str) -> Dict[str, Any]:
     """
@@ -42,7 +230,13 @@ def _fallback_aggregate_from_text(conv_text: str) -> Dict[str, Any]:
     for l in lines:
         if l.startswith("User:"):
             user_texts.append(l[len("User:"):].strip())
-    if not user_texts:
+    return _aggregate_statement_results(analyze_statements(user_texts))
+
+def _aggregate_statement_results(per: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Average statement-level scores and compare the first vs last half for the trend.
+    """
+    if not per:
         return {
             "overall_label": "Neutral",
             "average_score": 0.0,
@@ -50,7 +244,6 @@ def _fallback_aggregate_from_text(conv_text: str) -> Dict[str, Any]:
             "reason": "No user messages found in conversation.",
             "confidence": 0.25
         }
-    per = [analyze_statement(t) for t in user_texts]
     scores = [p["score"] for p in per]
     avg = sum(scores) / len(scores)
     # label mapping
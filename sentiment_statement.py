@@ -13,42 +13,158 @@ Outputs a dict:
 Implementation notes:
 - Uses transformers pipeline("sentiment-analysis", model=...) with distilbert sst-2.
 - Because SST-2 only returns POSITIVE/NEGATIVE, we convert low-confidence to NEUTRAL.
+- analyze_statements() scores many messages at once: inputs are sorted by token
+  length and padded per batch, so short messages don't pay for long ones.
+- Raw logits are cached (in-memory LRU + optional sqlite file, see result_cache.py)
+  keyed by model id and normalized text; the neutral threshold is applied afterwards.
+- transformers/torch are imported on first use, not at module import, so callers that
+  never score anything (or only hit the cache) don't pay their import cost.
+  warm_up() loads them and the model on a background thread.
+- The forward pass goes through a backend from sentiment_backends.py (eager torch,
+  dynamic int8, ONNX Runtime), chosen with SENTIMENT_BACKEND or set_backend().
+- Long messages: with long_policy set, text past MAX_LENGTH tokens is not truncated.
+  Each message is tokenized once, cut into overlapping windows, all windows are
+  scored in the same length-bucketed batches, and the window probabilities are
+  combined by the policy ("mean", "max" or "last", see aggregate_windows).
+- With SENTIMENT_SNAPSHOT_DIR set, the model is loaded offline from a local,
+  memory-mapped snapshot (see model_snapshot.py) instead of through the hub.
+- Model load, tokenization, forward passes, batch sizes and cache hits are
+  recorded through metrics.py (a no-op unless metrics or a trace are active).
 """
 
-from typing import Dict
-from transformers import pipeline
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
 import math
+import os
+import re
+import threading
+import unicodedata
+
+import metrics
+import model_snapshot
+from result_cache import ResultCache
+from sentiment_backends import BACKENDS, create_backend
 
 # Model choice: distilbert-base-uncased-finetuned-sst-2-english (small, accurate for sentences)
-# The pipeline will download weight files on first run.
+# The pipeline will download weight files on first run (unless a snapshot is configured).
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+MAX_LENGTH = 256
+DEFAULT_BATCH_SIZE = 32
+LONG_POLICIES = ("mean", "max", "last")
+LONG_OVERLAP = 64       # tokens shared by consecutive windows
+LONG_LAST_BIAS = 2.0    # "last" policy: weight of the final window relative to the first
+
+logger = logging.getLogger(__name__)
+
 _PIPELINE = None
+_PIPELINE_LOCK = threading.Lock()
+_BACKEND = None
+_BACKEND_NAME = os.environ.get("SENTIMENT_BACKEND", "torch").lower()
+_CACHE: Optional[ResultCache] = None
+_CACHE_DISABLED = False
 
 def get_pipeline():
     global _PIPELINE
     if _PIPELINE is None:
-        _PIPELINE = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+        # Serialized so a warm-up thread and a scoring thread don't both load the model.
+        with _PIPELINE_LOCK:
+            if _PIPELINE is None:
+                with metrics.timer("model_load"):
+                    snapshot = model_snapshot.snapshot_dir()
+                    if snapshot:
+                        _PIPELINE = model_snapshot.load_pipeline(snapshot, expected_model=MODEL_NAME)
+                    else:
+                        from transformers import pipeline
+                        _PIPELINE = pipeline("sentiment-analysis", model=MODEL_NAME)
     return _PIPELINE
 
-def analyze_statement(text: str, neutral_threshold: float = 0.55) -> Dict:
+def get_backend():
+    """The inference backend in use, built from the shared pipeline on first call."""
+    global _BACKEND
+    if _BACKEND is None:
+        pipe = get_pipeline()
+        with _PIPELINE_LOCK:
+            if _BACKEND is None:
+                _BACKEND = create_backend(_BACKEND_NAME, pipe.tokenizer, pipe.model, MODEL_NAME)
+    return _BACKEND
+
+def set_backend(name: str) -> None:
+    """Switch backend ("torch", "int8", "onnx"). Takes effect on the next analyze_* call."""
+    global _BACKEND, _BACKEND_NAME
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    with _PIPELINE_LOCK:
+        _BACKEND_NAME, _BACKEND = name, None
+
+def warm_up(background: bool = True) -> Optional[threading.Thread]:
     """
-    Analyze single user statement.
-    neutral_threshold: if classifier score < neutral_threshold -> treat as 'Neutral'
-    Returns:
-      {
-        "text": text,
-        "label": "Positive"/"Negative"/"Neutral",
-        "score": float  # classifier confidence (0..1) for predicted class; if Neutral, score near 0
-      }
+    Import transformers and load the model ahead of the first analyze_* call.
+    With background=True this runs on a daemon thread, which is returned.
     """
-    text = (text or "").strip()
-    if not text:
-        return {"text": text, "label": "Neutral", "score": 0.0}
+    def _load():
+        try:
+            get_backend()
+        except Exception as e:
+            logger.warning("Statement model warm-up failed: %s", e)
 
-    pipe = get_pipeline()
-    out = pipe(text, truncation=True, max_length=256)[0]  # {'label': 'POSITIVE', 'score': 0.999...}
-    raw_label = out.get("label", "").upper()
-    score = float(out.get("score", 0.0))
+    if not background:
+        _load()
+        return None
+    t = threading.Thread(target=_load, name="sentiment-warm-up", daemon=True)
+    t.start()
+    return t
 
+# ----------------------------
+# Result cache
+# ----------------------------
+def get_cache() -> Optional[ResultCache]:
+    """
+    Cache of raw model logits keyed by (model, normalized text).
+    Configured from the environment on first use:
+      SENTIMENT_CACHE_SIZE  in-memory LRU entries (default 4096, 0 disables caching)
+      SENTIMENT_CACHE_PATH  sqlite file for the persistent level (default: memory only)
+    """
+    global _CACHE, _CACHE_DISABLED
+    if _CACHE is None and not _CACHE_DISABLED:
+        size = int(os.environ.get("SENTIMENT_CACHE_SIZE", "4096"))
+        if size <= 0:
+            _CACHE_DISABLED = True
+        else:
+            _CACHE = ResultCache(max_entries=size, path=os.environ.get("SENTIMENT_CACHE_PATH") or None)
+    return _CACHE
+
+def configure_cache(max_entries: int = 4096, path: Optional[str] = None, max_disk_entries: int = 100_000) -> Optional[ResultCache]:
+    """Replace the statement cache. max_entries <= 0 disables caching."""
+    global _CACHE, _CACHE_DISABLED
+    if _CACHE is not None:
+        _CACHE.close()
+    if max_entries <= 0:
+        _CACHE, _CACHE_DISABLED = None, True
+    else:
+        _CACHE = ResultCache(max_entries=max_entries, path=path, max_disk_entries=max_disk_entries)
+        _CACHE_DISABLED = False
+    return _CACHE
+
+def cache_stats() -> Dict:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
+
+_WS_RE = re.compile(r"\s+")
+
+def _normalize(text: str) -> str:
+    # The model is uncased, so case and whitespace differences produce identical logits.
+    return _WS_RE.sub(" ", unicodedata.normalize("NFC", text)).strip().lower()
+
+def _cache_key(text: str, variant: str = "") -> str:
+    # Backends may differ slightly in their logits, so each gets its own entries.
+    # variant separates results computed differently (e.g. windowed long-text scoring).
+    return hashlib.sha1(f"{MODEL_NAME}:{_BACKEND_NAME}{variant}\x00{_normalize(text)}".encode("utf-8")).hexdigest()
+
+def _map_result(text: str, raw_label: str, score: float, neutral_threshold: float) -> Dict:
+    """Convert a raw SST-2 (label, confidence) pair into the Tier 2 result dict."""
+    raw_label = raw_label.upper()
     if score < neutral_threshold:
         label = "Neutral"
         # Map score toward 0 for neutrality (signed mapping not necessary)
@@ -59,3 +175,190 @@ def analyze_statement(text: str, neutral_threshold: float = 0.55) -> Dict:
         mapped_score = score if label == "Positive" else -score
 
     return {"text": text, "label": label, "score": mapped_score}
+
+def analyze_statement(text: str, neutral_threshold: float = 0.55, long_policy: Optional[str] = None,
+                      overlap: int = LONG_OVERLAP) -> Dict:
+    """
+    Analyze single user statement.
+    neutral_threshold: if classifier score < neutral_threshold -> treat as 'Neutral'
+    long_policy: score text beyond MAX_LENGTH tokens with sliding windows ("mean", "max", "last")
+                 instead of truncating it
+    overlap: tokens shared by consecutive windows (see analyze_statements)
+    Returns:
+      {
+        "text": text,
+        "label": "Positive"/"Negative"/"Neutral",
+        "score": float  # classifier confidence (0..1) for predicted class; if Neutral, score near 0
+      }
+    """
+    return analyze_statements([text], neutral_threshold=neutral_threshold, long_policy=long_policy,
+                              overlap=overlap)[0]
+
+def _result_from_logits(text: str, raw: Dict, neutral_threshold: float) -> Dict:
+    logits = raw["logits"]
+    top = max(range(len(logits)), key=logits.__getitem__)
+    # softmax probability of the winning class == pipeline "score"
+    denom = sum(math.exp(l - logits[top]) for l in logits)
+    return _map_result(text, raw["labels"][top], 1.0 / denom, neutral_threshold)
+
+def _forward(backend, encoded: List[List[int]], batch_size: int) -> List[List[float]]:
+    """Logits for every encoded row, in order, computed in length-bucketed batches."""
+    batch_size = max(1, int(batch_size))
+    # Length-bucketing: neighbours in this order have similar lengths, so padding stays small.
+    order = sorted(range(len(encoded)), key=lambda k: len(encoded[k]))
+
+    out: List[List[float]] = [None] * len(encoded)
+    for start in range(0, len(order), batch_size):
+        chunk = order[start:start + batch_size]
+        metrics.observe("liabot_statement_batch_size", len(chunk))
+        with metrics.timer("forward"):
+            logits = backend.forward([encoded[k] for k in chunk])
+        for k, row in zip(chunk, logits):
+            out[k] = row
+    return out
+
+def _run_model(texts: List[str], batch_size: int) -> List[Dict]:
+    """Forward pass over texts, length-bucketed. Returns {"labels", "logits"} per text, in order."""
+    backend = get_backend()
+    with metrics.timer("tokenize"):
+        encoded = backend.encode(texts, MAX_LENGTH)
+    return [{"labels": backend.labels, "logits": row} for row in _forward(backend, encoded, batch_size)]
+
+# ----------------------------
+# Long texts: sliding windows
+# ----------------------------
+def window_spans(n_tokens: int, body: int, overlap: int = LONG_OVERLAP) -> List[Tuple[int, int]]:
+    """[start, stop) token spans of at most `body` tokens, consecutive spans sharing `overlap` tokens."""
+    body = max(1, body)
+    _check_overlap(overlap, body)
+    step = body - overlap
+    spans, start = [], 0
+    while True:
+        stop = min(start + body, n_tokens)
+        spans.append((start, stop))
+        if stop >= n_tokens:
+            return spans
+        start += step
+
+def _check_overlap(overlap: int, body: int) -> None:
+    """Windows must advance by at least one token: 0 <= overlap < body."""
+    if not 0 <= overlap < body:
+        raise ValueError(f"overlap must be between 0 and {body - 1} tokens for windows of {body}, got {overlap}")
+
+def _softmax(logits: Sequence[float]) -> List[float]:
+    m = max(logits)
+    exps = [math.exp(l - m) for l in logits]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+def aggregate_windows(probs: List[List[float]], sizes: List[int], policy: str = "mean",
+                      last_bias: float = LONG_LAST_BIAS) -> List[float]:
+    """
+    Combine per-window class probabilities into one distribution.
+      mean: average weighted by window length (tokens)
+      max:  the single most confident window (largest winning-class probability)
+      last: length-weighted average with weights ramping linearly up to last_bias
+            for the final window, so where a message ends up counts more
+    """
+    if policy not in LONG_POLICIES:
+        raise ValueError(f"Unknown long-text policy '{policy}'. Choose from: {', '.join(LONG_POLICIES)}")
+    if len(probs) == 1:
+        return list(probs[0])
+    if policy == "max":
+        return list(max(probs, key=max))
+    n = len(probs)
+    weights = [float(size) for size in sizes]
+    if policy == "last":
+        weights = [w * (1.0 + (last_bias - 1.0) * i / (n - 1)) for i, w in enumerate(weights)]
+    total = sum(weights) or 1.0
+    return [sum(w * p[c] for w, p in zip(weights, probs)) / total for c in range(len(probs[0]))]
+
+def _run_model_windowed(texts: List[str], batch_size: int, policy: str, overlap: int) -> List[Dict]:
+    """Like _run_model, but every text is scored over all of its tokens in overlapping windows."""
+    backend = get_backend()
+    with metrics.timer("tokenize"):
+        tokens = backend.tokenize(texts)  # once per text, not per window
+    body = MAX_LENGTH - backend.num_special_tokens
+
+    windows: List[List[int]] = []
+    owners: List[int] = []
+    sizes: List[int] = []
+    for i, ids in enumerate(tokens):
+        for start, stop in window_spans(len(ids), body, overlap):
+            windows.append(backend.with_special_tokens(ids[start:stop]))
+            owners.append(i)
+            sizes.append(stop - start)
+
+    per_text: List[List[int]] = [[] for _ in texts]
+    for w, owner in enumerate(owners):
+        per_text[owner].append(w)
+
+    # Windows of all texts share the length-bucketed batches.
+    logits = _forward(backend, windows, batch_size)
+    out = []
+    for idx in per_text:
+        probs = aggregate_windows([_softmax(logits[w]) for w in idx], [sizes[w] for w in idx], policy)
+        # Stored as log-probabilities so _result_from_logits (softmax) recovers probs exactly.
+        out.append({"labels": backend.labels, "logits": [math.log(max(p, 1e-12)) for p in probs],
+                    "windows": len(idx)})
+    return out
+
+def analyze_statements(texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                       neutral_threshold: float = 0.55, long_policy: Optional[str] = None,
+                       overlap: int = LONG_OVERLAP) -> List[Dict]:
+    """
+    Batched version of analyze_statement.
+    Texts are tokenized once, sorted by token length and run through the model
+    in batches of `batch_size`, each padded only to its own longest member.
+    Raw logits are cached per normalized text, so repeated messages cost no
+    model time regardless of neutral_threshold.
+    Results come back in the original order with the same schema as analyze_statement.
+    long_policy ("mean", "max", "last"): score every token of long texts in windows of
+    MAX_LENGTH tokens overlapping by `overlap`, combined by aggregate_windows.
+    Raises ValueError unless 0 <= overlap < the window body (MAX_LENGTH minus special tokens).
+    """
+    if long_policy is None:
+        return _score_texts(texts, neutral_threshold, lambda pending: _run_model(pending, batch_size))
+    if long_policy not in LONG_POLICIES:
+        raise ValueError(f"Unknown long-text policy '{long_policy}'. Choose from: {', '.join(LONG_POLICIES)}")
+    _check_overlap(overlap, MAX_LENGTH - get_backend().num_special_tokens)
+    return _score_texts(texts, neutral_threshold,
+                        lambda pending: _run_model_windowed(pending, batch_size, long_policy, overlap),
+                        variant=f":long:{long_policy}:{overlap}:{MAX_LENGTH}")
+
+def _score_texts(texts: Sequence[str], neutral_threshold: float,
+                 run_model: Callable[[List[str]], List[Dict]], variant: str = "") -> List[Dict]:
+    """Cache lookup, dedupe and result mapping around run_model, which scores the cache misses."""
+    texts = [(t or "").strip() for t in texts]
+    cache = get_cache()
+
+    raw_by_key: Dict[str, Dict] = {}
+    pending: Dict[str, str] = {}  # key -> representative text still to be scored
+    for t in texts:
+        if not t:
+            continue
+        key = _cache_key(t, variant)
+        if key in raw_by_key or key in pending:
+            continue
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None:
+            raw_by_key[key] = hit
+        else:
+            pending[key] = t
+    if cache is not None:
+        metrics.record_cache("statement", len(raw_by_key), len(pending))
+
+    if pending:
+        keys = list(pending)
+        for key, raw in zip(keys, run_model([pending[k] for k in keys])):
+            raw_by_key[key] = raw
+            if cache is not None:
+                cache.put(key, raw)
+
+    results = []
+    for t in texts:
+        if not t:
+            results.append({"text": t, "label": "Neutral", "score": 0.0})
+        else:
+            results.append(_result_from_logits(t, raw_by_key[_cache_key(t, variant)], neutral_threshold))
+    return results
@@ -0,0 +1,158 @@
+# sentiment_tracker.py
+"""
+Online conversation-sentiment tracker: O(1) time and memory per statement result.
+
+Fed one Tier 2 result per user turn (in turn order), it maintains:
+- running mean and variance of the scores (Welford)
+- an exponentially weighted moving average (EWMA) of recent mood
+- the least-squares slope of the last `window` scores, from running sums
+  that are updated in place as the window slides
+- label counts and a confidence estimate
+
+so a live mood / trend indicator can be shown after every turn, and summary()
+returns the Tier 1 fallback dict at /end without re-reading the conversation.
+
+Trend here is "where the recent window is heading" (fitted change across the
+window), unlike _aggregate_statement_results, which compares first and last halves
+and therefore needs every score.
+"""
+
+from collections import deque
+from typing import Any, Dict, Optional
+import math
+import threading
+
+TREND_THRESHOLD = 0.05  # same dead band as the label / trend rules in sentiment_conversation
+
+class SentimentTracker:
+    def __init__(self, alpha: float = 0.3, window: int = 6):
+        """
+        alpha: EWMA smoothing factor (higher = follows the latest turns more closely).
+        window: number of most recent scores the trend slope is fitted over.
+        """
+        self.alpha = alpha
+        self.window = max(2, int(window))
+        self._lock = threading.Lock()
+
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations (Welford)
+        self.ewma: Optional[float] = None
+        self.last_score: Optional[float] = None
+        self.label_counts: Dict[str, int] = {}
+
+        # Sliding window, positions x = 0..m-1 oldest to newest.
+        self._recent: deque = deque(maxlen=self.window)
+        self._sum_y = 0.0
+        self._sum_xy = 0.0
+
+    def update(self, result: Dict[str, Any]) -> None:
+        """Fold in one statement result ({"label", "score", ...})."""
+        score = float(result.get("score", 0.0))
+        label = result.get("label", "Neutral")
+        with self._lock:
+            self.count += 1
+            delta = score - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (score - self.mean)
+            self.ewma = score if self.ewma is None else self.alpha * score + (1.0 - self.alpha) * self.ewma
+            self.last_score = score
+            self.label_counts[label] = self.label_counts.get(label, 0) + 1
+
+            m = len(self._recent)
+            if m == self.window:
+                oldest = self._recent[0]
+                # Dropping x=0 shifts every remaining x down by one.
+                self._sum_xy -= self._sum_y - oldest
+                self._sum_y -= oldest
+                m -= 1
+            self._recent.append(score)
+            self._sum_xy += m * score
+            self._sum_y += score
+
+    # ----------------------------
+    # Derived values
+    # ----------------------------
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def slope(self) -> float:
+        """Least-squares score change per turn over the recent window."""
+        m = len(self._recent)
+        if m < 2:
+            return 0.0
+        sum_x = m * (m - 1) / 2.0
+        sum_x2 = (m - 1) * m * (2 * m - 1) / 6.0
+        return (m * self._sum_xy - sum_x * self._sum_y) / (m * sum_x2 - sum_x * sum_x)
+
+    @property
+    def trend(self) -> str:
+        change = self.slope * (len(self._recent) - 1)  # fitted change across the window
+        if change >= TREND_THRESHOLD:
+            return "Improving"
+        if change <= -TREND_THRESHOLD:
+            return "Worsening"
+        return "Stable"
+
+    @property
+    def label(self) -> str:
+        if self.mean >= 0.05:
+            return "Positive"
+        if self.mean <= -0.05:
+            return "Negative"
+        return "Neutral"
+
+    @property
+    def confidence(self) -> float:
+        """
+        The fallback's magnitude heuristic, shrunk when the scores disagree or are
+        few (by the standard error of the mean).
+        """
+        if not self.count:
+            return 0.25
+        base = min(0.8, 0.4 + abs(self.mean) * 0.6)
+        stderr = math.sqrt(self.variance / self.count) if self.count > 1 else 0.5
+        return base * (1.0 - min(0.5, stderr))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current state for a live indicator."""
+        with self._lock:
+            return {
+                "count": self.count,
+                "mean": self.mean,
+                "ewma": self.ewma if self.ewma is not None else 0.0,
+                "slope": self.slope,
+                "trend": self.trend,
+                "label": self.label,
+                "confidence": self.confidence,
+            }
+
+    def summary(self) -> Dict[str, Any]:
+        """The Tier 1 fallback dict (same keys as sentiment_conversation's aggregator)."""
+        with self._lock:
+            if not self.count:
+                return {
+                    "overall_label": "Neutral",
+                    "average_score": 0.0,
+                    "trend": "Stable",
+                    "reason": "No user messages found in conversation.",
+                    "confidence": 0.25,
+                }
+            reason = (f"Tracked {self.count} user messages; avg score {self.mean:.3f}, "
+                      f"recent mood {self.ewma:.3f}.")
+            return {
+                "overall_label": self.label,
+                "average_score": float(self.mean),
+                "trend": self.trend,
+                "reason": reason,
+                "confidence": float(self.confidence),
+            }
+
+TREND_ARROWS = {"Improving": "↗", "Worsening": "↘", "Stable": "→"}
+
+def mood_line(snapshot: Dict[str, Any]) -> str:
+    """One-line live indicator, e.g. "mood +0.42 ↗ Improving (5 turns)"."""
+    return (f"mood {snapshot['ewma']:+.2f} {TREND_ARROWS[snapshot['trend']]} {snapshot['trend']} "
+            f"({snapshot['count']} turns)")
@@ -0,0 +1,385 @@
+# server.py
+"""
+Multi-session chat service (plain ASGI, no web framework needed).
+
+- Many SimpleChatbot sessions, keyed by session id, with idle-session eviction.
+- Statement sentiment for every session goes through one MicroBatcher, which
+  coalesces concurrent requests into a single analyze_statements call
+  (bounded by max_batch_size and max_wait_ms), so N users share one forward pass.
+- /end waits for any scores still in flight for the session, then runs Tier 1
+  (analyze_conversation_with_gemini) on a small dedicated thread pool, reusing the
+  per-turn results, so slow Gemini calls never hold up the batcher's executor.
+- A turn whose scoring failed is reported with its error and left out of the mood
+  tracker and the Tier 1 aggregates rather than counted as a Neutral 0.0.
+
+Routes (JSON in/out):
+  POST /sessions                    -> {"session_id"}
+  POST /sessions/{id}/messages      {"text"} -> {"reply", "sentiment", "mood"} (+ "error" if scoring failed)
+  GET  /sessions/{id}               -> {"turns", "statements"}
+  POST /sessions/{id}/end           -> {"statements", "conversation"} (session is closed)
+  GET  /health                      -> session, batching and Gemini circuit breaker stats
+  GET  /metrics                     -> metrics.py registry, Prometheus text (/metrics.json for JSON)
+
+Run with any ASGI server, e.g.:
+    python server.py --port 8000        (uses uvicorn if installed)
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+import metrics
+from chatbot import SimpleChatbot
+from sentiment_statement import analyze_statements
+from sentiment_conversation import analyze_conversation_with_gemini, get_gemini_breaker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 10.0
+DEFAULT_IDLE_TIMEOUT = 30 * 60.0
+DEFAULT_TIER1_WORKERS = 4
+
+# ----------------------------
+# Cross-session micro-batching
+# ----------------------------
+class MicroBatcher:
+    """
+    Collects submit() calls from any number of coroutines and runs them through
+    batch_fn in batches: a batch is dispatched when it reaches max_batch_size or
+    when its first item has waited max_wait_ms, whichever comes first.
+    batch_fn is blocking (a model forward pass) and runs in the default executor; it
+    must return one result per text, or every future of the batch fails.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[str]], List[Dict[str, Any]]],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def submit(self, text: str) -> Dict[str, Any]:
+        if self._worker is None or self._worker.done():
+            self._start()
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def _start(self) -> None:
+        """(Re)start the worker; items left in a dead worker's queue are carried over, not dropped."""
+        loop = asyncio.get_running_loop()
+        old, self._queue = self._queue, asyncio.Queue()
+        while old is not None and not old.empty():
+            text, fut = old.get_nowait()
+            if fut.done():
+                continue
+            if fut.get_loop() is loop:
+                self._queue.put_nowait((text, fut))
+            elif not fut.get_loop().is_closed():
+                fut.get_loop().call_soon_threadsafe(_fail, fut, RuntimeError("batcher restarted on another loop"))
+        self._worker = loop.create_task(self._run())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [t for t, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.batch_fn, texts)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} texts")
+            except asyncio.CancelledError:
+                for _, fut in batch:
+                    _fail(fut, RuntimeError("batcher closed"))
+                raise
+            except Exception as e:
+                for _, fut in batch:
+                    _fail(fut, e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+def _fail(fut: asyncio.Future, error: BaseException) -> None:
+    if not fut.done():
+        fut.set_exception(error)
+
+# ----------------------------
+# Sessions
+# ----------------------------
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        # Scores are filled in from the shared batcher, not by the bot itself.
+        self.bot = SimpleChatbot()
+        self.last_seen = time.monotonic()
+        self.lock = asyncio.Lock()
+        # user turn index -> task that scores it and records the result on the bot
+        self.pending: Dict[int, asyncio.Task] = {}
+        # user turn index -> scoring error; such turns stay out of the tracker and aggregates
+        self.failed: Dict[int, str] = {}
+
+    def statement_results(self) -> List[Optional[Dict[str, Any]]]:
+        """Per user turn: its result, {"text", "error"} if scoring failed, or None while pending."""
+        store = self.bot.conversation
+        return [{"text": store[i][1], "error": self.failed[i]} if i in self.failed else store.sentiment(i)
+                for i in store.user_turn_indices()]
+
+class SessionManager:
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_sessions: int = 10_000):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()  # least recently used first
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> Session:
+        self.evict_idle()
+        while len(self._sessions) >= self.max_sessions:
+            self._drop(next(iter(self._sessions)))
+        session = Session(uuid.uuid4().hex)
+        self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        self.evict_idle()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_seen = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.bot.close()
+
+    def evict_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        count = 0
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_seen > cutoff:
+                break
+            self._drop(oldest.id)
+            count += 1
+        return count
+
+    def _drop(self, session_id: str) -> None:
+        self.remove(session_id)
+        self.evicted += 1
+
+# ----------------------------
+# ASGI application
+# ----------------------------
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class ChatService:
+    def __init__(self, batch_fn: Optional[Callable[[List[str]], List[Dict[str, Any]]]] = None,
+                 analyze_fn: Optional[Callable[..., Dict[str, Any]]] = None,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, use_gemini: bool = True,
+                 tier1_workers: int = DEFAULT_TIER1_WORKERS):
+        self.batcher = MicroBatcher(batch_fn or analyze_statements, max_batch_size, max_wait_ms)
+        self.analyze_fn = analyze_fn or analyze_conversation_with_gemini
+        # Tier 1 (blocking Gemini calls with retries) gets its own bounded pool, separate
+        # from the default executor that runs the batcher's forward passes.
+        self.tier1_executor = ThreadPoolExecutor(max_workers=max(1, tier1_workers), thread_name_prefix="tier1")
+        self.sessions = SessionManager(idle_timeout)
+        self.use_gemini = use_gemini
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        try:
+            payload = json.loads(body) if body else {}
+            status, result = 200, await self.handle(scope["method"], scope["path"], payload)
+        except HTTPError as e:
+            status, result = e.status, {"error": e.message}
+        except json.JSONDecodeError:
+            status, result = 400, {"error": "invalid JSON body"}
+        except Exception as e:
+            logger.exception("Request failed")
+            status, result = 500, {"error": str(e)}
+
+        if isinstance(result, str):
+            data, content_type = result.encode("utf-8"), b"text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(result).encode("utf-8"), b"application/json"
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(data)).encode())],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.batcher.close()
+                self.tier1_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def handle(self, method: str, path: str, payload: Dict[str, Any]) -> Union[Dict[str, Any], str]:
+        parts = [p for p in path.split("/") if p]
+        if parts == ["metrics"] and method == "GET":
+            return metrics.prometheus_text()
+        if parts == ["metrics.json"] and method == "GET":
+            return metrics.snapshot()
+        if parts == ["health"] and method == "GET":
+            breaker = get_gemini_breaker()
+            return {"sessions": len(self.sessions), "evicted": self.sessions.evicted, "batching": self.batcher.stats(),
+                    "gemini_breaker": breaker.stats() if breaker is not None else None}
+        if parts == ["sessions"] and method == "POST":
+            return {"session_id": self.sessions.create().id}
+        if len(parts) >= 2 and parts[0] == "sessions":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(404, "unknown or expired session")
+            if len(parts) == 2 and method == "GET":
+                return {"turns": [list(t) for t in session.bot.get_conversation_history()],
+                        "statements": session.statement_results()}
+            if parts[2:] == ["messages"] and method == "POST":
+                return await self._message(session, payload)
+            if parts[2:] == ["end"] and method == "POST":
+                return await self._end(session)
+        raise HTTPError(404, "not found")
+
+    async def _message(self, session: Session, payload: Dict[str, Any]) -> Dict[str, Any]:
+        text = payload.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(400, "'text' must be a non-empty string")
+        async with session.lock:
+            reply = session.bot.handle_user(text)
+            index = session.bot.conversation.user_turn_indices()[-1]
+            task = asyncio.get_running_loop().create_task(self._score(session, index, text.strip()))
+            session.pending[index] = task
+        sentiment = await task
+        out = {"reply": reply, "sentiment": sentiment, "mood": session.bot.tracker.snapshot()}
+        if sentiment is None:
+            out["error"] = session.failed.get(index)
+        return out
+
+    async def _score(self, session: Session, index: int, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Score one user turn through the batcher and record it. If scoring fails the
+        turn is marked failed (session.failed) and None is returned; no made-up score
+        reaches the tracker or the Tier 1 aggregates.
+        """
+        try:
+            sentiment = await self.batcher.submit(text)
+        except Exception as e:
+            logger.warning("Statement scoring failed for session %s: %s", session.id, e)
+            session.failed[index] = str(e)
+            sentiment = None
+        else:
+            session.bot.record_sentiment(index, sentiment)
+        finally:
+            session.pending.pop(index, None)
+        return sentiment
+
+    async def _end(self, session: Session) -> Dict[str, Any]:
+        async with session.lock:
+            if session.pending:
+                await asyncio.gather(*session.pending.values())
+            turns = session.bot.get_conversation_history()
+            per_results = session.statement_results()
+            scored = [r for r in per_results if r is not None and "error" not in r]
+            loop = asyncio.get_running_loop()
+            conversation = await loop.run_in_executor(
+                self.tier1_executor, lambda: self.analyze_fn(turns, use_gemini=self.use_gemini, per_results=scored,
+                                              tracker=session.bot.tracker)
+            )
+            self.sessions.remove(session.id)
+        return {"statements": per_results, "conversation": conversation}
+
+def create_app(**kwargs) -> ChatService:
+    return ChatService(**kwargs)
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Multi-session chat service with batched sentiment.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    ap.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    ap.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="seconds")
+    ap.add_argument("--tier1-workers", type=int, default=DEFAULT_TIER1_WORKERS, help="concurrent /end analyses")
+    ap.add_argument("--local", action="store_true", help="skip Gemini, use the local aggregator only")
+    args = ap.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to serve over HTTP: pip install uvicorn")
+    app = create_app(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                     idle_timeout=args.idle_timeout, use_gemini=not args.local,
+                     tier1_workers=args.tier1_workers)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# tests/test_batch_analyze.py
+import json
+
+import pytest
+
+import batch_analyze
+
+def fake_statements(texts, batch_size=32, neutral_threshold=0.55):
+    return [{"text": t, "label": "Negative" if "bad" in t else "Positive", "score": -0.9 if "bad" in t else 0.9}
+            for t in texts]
+
+def fake_conversation(turns, model="", use_gemini=True, per_results=None):
+    avg = sum(r["score"] for r in per_results) / max(1, len(per_results))
+    return {"overall_label": "Positive" if avg > 0 else "Negative", "average_score": avg,
+            "trend": "Stable", "reason": "fake", "confidence": 0.5, "cached": False}
+
+def _write_input(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"c{i}", "turns": [["User", f"msg {i} bad"], ["Bot", "ok"], ["User", "fine now"]]}) + "\n")
+        f.write("not json\n")
+
+def test_batch_run_and_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_analyze, "analyze_statements", fake_statements)
+    monkeypatch.setattr(batch_analyze, "analyze_conversation_with_gemini", fake_conversation)
+    src, dst = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(src, 5)
+
+    stats = batch_analyze.run_batch(str(src), str(dst), chunk_size=2, concurrency=2, progress=None)
+    assert stats["conversations"] == 6
+    assert stats["messages"] == 10
+
+    lines = [json.loads(l) for l in dst.read_text(encoding="utf-8").splitlines()]
+    assert [l["id"] for l in lines[:5]] == ["c0", "c1", "c2", "c3", "c4"]
+    assert lines[0]["statements"][0]["label"] == "Negative"
+    assert "error" in lines[5]
+
+    # Re-running resumes after the checkpoint: nothing is duplicated.
+    stats = batch_analyze.run_batch(str(src), str(dst), chunk_size=2, progress=None)
+    assert stats["conversations"] == 0
+    assert len(dst.read_text(encoding="utf-8").splitlines()) == 6
+
+def test_resume_drops_partial_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_analyze, "analyze_statements", fake_statements)
+    monkeypatch.setattr(batch_analyze, "analyze_conversation_with_gemini", fake_conversation)
+    src, dst = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(src, 4)
+
+    batch_analyze.run_batch(str(src), str(dst), chunk_size=2, progress=None)
+    full = dst.read_text(encoding="utf-8")
+    first_chunk = "".join(full.splitlines(keepends=True)[:2])
+
+    # Simulate a crash after chunk 1 with a half-written chunk 2.
+    dst.write_text(first_chunk + '{"id": "c2", "stat', encoding="utf-8")
+    batch_analyze._write_checkpoint(str(dst) + ".ckpt", 2, len(first_chunk.encode("utf-8")))
+
+    batch_analyze.run_batch(str(src), str(dst), chunk_size=2, progress=None)
+    assert dst.read_text(encoding="utf-8") == full
+
+def test_results_written_to_store(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    from results_store import ResultsStore
+
+    from results_store import SOURCES
+
+    monkeypatch.setattr(batch_analyze, "analyze_statements", fake_statements)  # the real local Tier 1 runs
+    src, dst, store_dir = tmp_path / "in.jsonl", tmp_path / "out.jsonl", str(tmp_path / "store")
+    _write_input(src, 4)
+
+    batch_analyze.run_batch(str(src), str(dst), chunk_size=2, progress=None, store_path=store_dir,
+                            use_gemini=False)
+    # A crash between the store commit and the checkpoint: the last chunk is redone.
+    batch_analyze._write_checkpoint(str(dst) + ".ckpt", 2, len("".join(
+        dst.read_text(encoding="utf-8").splitlines(keepends=True)[:2]).encode("utf-8")))
+    batch_analyze.run_batch(str(src), str(dst), chunk_size=2, progress=None, store_path=store_dir,
+                            use_gemini=False)
+
+    store = ResultsStore(store_dir, mode="r")
+    assert store.n_conversations == 4 and store.n_messages == 8  # the error line is skipped, nothing duplicated
+    assert store.label_histogram().tolist() == [4, 0, 4]
+    assert store.conversation_means().tolist() == pytest.approx([0.0] * 4)
+    assert store.column("conv_source").tolist() == [SOURCES.index("fallback")] * 4
+
+def test_only_user_turns_are_user_messages(caplog):
+    record = {"id": "c9", "turns": [["System", "You are a support agent."], ["User", "it broke"],
+                                    {"speaker": "Agent", "text": "Sorry about that"}, ["Bot", "ok"],
+                                    {"speaker": "User", "text": "thanks"}]}
+    with caplog.at_level("WARNING", logger="batch_analyze"):
+        bot = batch_analyze.load_conversation(record)
+    assert list(bot.get_user_messages()) == ["it broke", "thanks"]
+    assert [s for s, _ in bot.get_conversation_history()] == ["User", "Bot", "User"]
+    assert "System x1" in caplog.text and "Agent x1" in caplog.text
@@ -0,0 +1,53 @@
+# tests/test_bench_suite.py
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import bench_suite
+from synthetic import make_messages, make_turns
+
+def tiny_config(**overrides):
+    cfg = dict(messages=20, turns=4, conversations=2, min_words=3, max_words=8, batch_size=4,
+               gemini_latency_ms=0.0, seed=0, repeat=1, no_model=True)
+    cfg.update(overrides)
+    return SimpleNamespace(**cfg)
+
+def test_synthetic_data_is_deterministic():
+    assert make_messages(10, seed=3) == make_messages(10, seed=3)
+    msgs = make_messages(50, min_words=4, max_words=6, mix={"negative": 1.0})
+    assert all(4 <= len(m.split()) <= 6 for m in msgs)
+    turns = make_turns(5, seed=1)
+    assert [s for s, _ in turns] == ["User", "Bot"] * 5
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert bench_suite.percentile(values, 50) == 50.0
+    assert bench_suite.percentile(values, 95) == 95.0
+    assert bench_suite.percentile(values, 99) == 99.0
+    assert bench_suite.percentile([], 50) == 0.0
+
+def test_suite_report_and_skips():
+    caches = (bench_suite.sentiment_statement.get_cache(), bench_suite.sentiment_conversation.get_conversation_cache())
+    report = bench_suite.run_suite(tiny_config())
+    # The caller's caches are back in place afterwards.
+    assert (bench_suite.sentiment_statement.get_cache(),
+            bench_suite.sentiment_conversation.get_conversation_cache()) == caches
+    results = report["results"]
+    assert results["statement_single"] == {"skipped": "disabled with --no-model"}
+    for name in ("simple_response", "append_as_text", "fallback_aggregate", "tier1_stub"):
+        r = results[name]
+        assert r["calls"] > 0
+        assert r["p50_us"] <= r["p95_us"] <= r["p99_us"]
+        assert r["throughput_per_sec"] > 0
+    assert report["meta"]["config"]["messages"] == 20
+
+def test_compare_flags_regressions():
+    def report(p50, p95):
+        return {"results": {"x": {"p50_us": p50, "p95_us": p95}, "s": {"skipped": "no model"}}}
+
+    rows = bench_suite.compare(report(130.0, 100.0), report(100.0, 100.0), tolerance=0.25)
+    assert [r["name"] for r in rows] == ["x"]
+    assert rows[0]["regression"] is True
+    assert bench_suite.compare(report(110.0, 120.0), report(100.0, 100.0), tolerance=0.25)[0]["regression"] is False
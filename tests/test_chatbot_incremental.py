@@ -0,0 +1,27 @@
+# tests/test_chatbot_incremental.py
+from chatbot import SimpleChatbot
+
+def fake_scorer(text):
+    return {"text": text, "label": "Positive" if "good" in text else "Neutral", "score": 0.9 if "good" in text else 0.0}
+
+def test_turns_scored_on_arrival():
+    bot = SimpleChatbot(scorer=fake_scorer)
+    bot.handle_user("  today was good  ")
+    bot.handle_user("nothing much")
+    res = bot.get_statement_results()
+    assert [r["text"] for r in res] == ["today was good", "nothing much"]
+    assert [r["label"] for r in res] == ["Positive", "Neutral"]
+
+def test_background_scoring_keeps_order():
+    bot = SimpleChatbot(scorer=fake_scorer, background=True)
+    msgs = [f"message {i} good" if i % 2 else f"message {i}" for i in range(20)]
+    for m in msgs:
+        bot.handle_user(m)
+    res = bot.get_statement_results(timeout=5)
+    bot.close()
+    assert [r["text"] for r in res] == msgs
+
+def test_no_scorer_returns_none():
+    bot = SimpleChatbot()
+    bot.handle_user("hello")
+    assert bot.get_statement_results() is None
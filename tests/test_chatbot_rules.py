@@ -0,0 +1,51 @@
+# tests/test_chatbot_rules.py
+import random
+import re
+
+from chatbot import Rule, RuleMatcher, SimpleChatbot
+
+def reference_response(bot, user_text):
+    """The original if/elif chain, kept as an oracle for the compiled matcher."""
+    txt = user_text.strip()
+    l = txt.lower()
+    if re.search(r"\b(hi|hello|hey|good morning|good evening)\b", l):
+        return random.choice(bot.greeting_responses)
+    if re.search(r"\b(thank(s| you)?|thx|ty)\b", l):
+        return "You're welcome! I’m glad I could help."
+    if re.search(r"\b(bye|goodbye|see you|farewell)\b", l):
+        return "Goodbye! If you'd like to talk again, I’ll be here."
+    if re.search(r"\b(happy|excited|great|awesome|good|glad|amazing)\b", l):
+        return random.choice(bot.positive_responses)
+    if re.search(r"\b(sad|upset|angry|hurt|frustrat|bad|terrible|depress)\b", l):
+        return random.choice(bot.negative_responses)
+    if "?" in txt or re.search(r"\b(how|what|why|when|where|can you|could you|should I)\b", l):
+        return ("That's an interesting question. "
+                "Could you tell me more so I can understand the situation better?")
+    if len(txt.split()) <= 2:
+        return f"I hear you: '{txt}'. Could you explain a bit more?"
+    return random.choice(bot.neutral_responses) + " " + random.choice(bot.followup_questions)
+
+WORDS = ["hi", "Hello", "good", "morning", "evening", "thanks", "thank", "you", "ty", "bye", "see",
+         "happy", "sad", "frustrated", "frustrat", "bad", "what", "why", "can", "could", "should", "I",
+         "this", "thing", "today", "work", "was", "?", "ok", "farewell", "amazing", "terrible"]
+
+def test_matches_original_rule_chain():
+    bot = SimpleChatbot()
+    gen = random.Random(42)
+    for _ in range(2000):
+        msg = " ".join(gen.choice(WORDS) for _ in range(gen.randint(1, 7)))
+        random.seed(7)
+        expected = reference_response(bot, msg)
+        random.seed(7)
+        assert bot.simple_response(msg) == expected, msg
+
+def test_priority_beats_position():
+    m = RuleMatcher([Rule("low", (r"\bfoo\b",), "x", 5), Rule("high", (r"\bbar baz\b",), "y", 1)])
+    assert m.match("foo then bar baz").intent == "high"
+    assert m.match("foo only").intent == "low"
+    assert m.match("nothing") is None
+
+def test_custom_rules():
+    bot = SimpleChatbot(rules=[Rule("refund", (r"\brefund\b",), "refund_responses", 0)])
+    bot.refund_responses = ["Let me check your refund."]
+    assert bot.simple_response("Where is my refund") == "Let me check your refund."
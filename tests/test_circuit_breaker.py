@@ -0,0 +1,144 @@
+# tests/test_circuit_breaker.py
+import pytest
+
+import sentiment_conversation
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+GEMINI = {"overall_label": "Positive", "average_score": 0.8, "trend": "Stable",
+          "reason": "From Gemini.", "confidence": 0.9}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class FakeGemini:
+    """Injects failures and slow responses; "slow" advances the fake clock."""
+    def __init__(self, clock):
+        self.clock = clock
+        self.mode = "ok"
+        self.calls = 0
+
+    def __call__(self, conversation_text, model=None):
+        self.calls += 1
+        if self.mode == "fail":
+            raise RuntimeError("503 service unavailable")
+        if self.mode == "slow":
+            self.clock.advance(12.0)
+        return dict(GEMINI)
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def make_breaker(clock, **kw):
+    opts = dict(failure_rate=0.5, min_calls=4, window=10, slow_call_seconds=5.0, open_seconds=30.0, clock=clock)
+    opts.update(kw)
+    return CircuitBreaker(**opts)
+
+def test_opens_on_failure_rate_and_rejects(clock):
+    breaker, gemini = make_breaker(clock), FakeGemini(clock)
+    breaker.call(gemini, "t")
+    breaker.call(gemini, "t")
+    gemini.mode = "fail"
+    with pytest.raises(RuntimeError):
+        breaker.call(gemini, "t")
+    assert breaker.state == CLOSED  # below min_calls
+    with pytest.raises(RuntimeError):
+        breaker.call(gemini, "t")
+    assert breaker.state == OPEN  # 2/4 bad
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(gemini, "t")
+    assert gemini.calls == 4
+    stats = breaker.stats()
+    assert stats["rejected"] == 1 and stats["trips"] == 1 and stats["retry_in"] == pytest.approx(30.0)
+
+def test_slow_calls_count_as_failures(clock):
+    breaker, gemini = make_breaker(clock, min_calls=2), FakeGemini(clock)
+    gemini.mode = "slow"
+    assert breaker.call(gemini, "t") == GEMINI  # result still returned
+    breaker.call(gemini, "t")
+    assert breaker.state == OPEN
+    assert "slow" in breaker.stats()["transitions"][-1]["reason"]
+
+def test_probe_after_cool_down(clock):
+    breaker, gemini = make_breaker(clock, min_calls=1), FakeGemini(clock)
+    gemini.mode = "fail"
+    with pytest.raises(RuntimeError):
+        breaker.call(gemini, "t")
+    assert breaker.state == OPEN
+
+    clock.advance(29.0)
+    assert not breaker.allow()
+    clock.advance(1.0)
+    assert breaker.state == HALF_OPEN
+    probe = breaker.allow()         # the probe slot
+    assert probe and probe.probe
+    assert not breaker.allow()      # one probe at a time
+    breaker.record(probe, False)
+    assert breaker.state == OPEN    # failed probe: another full cool-down
+
+    clock.advance(30.0)
+    gemini.mode = "ok"
+    assert breaker.call(gemini, "t") == GEMINI
+    assert breaker.state == CLOSED
+    assert [t["to"] for t in breaker.stats()["transitions"]] == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+def test_call_spanning_the_trip_cannot_decide_the_probe(clock):
+    breaker = make_breaker(clock, min_calls=1)
+    stale = breaker.allow()         # slow call that started while closed
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == OPEN
+
+    clock.advance(30.0)
+    probe = breaker.allow()
+    breaker.record(stale, True)     # finishes first, but is not the probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()      # the probe slot is still taken
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
+
+    breaker.record(stale, False)    # late outcomes from before the trip are dropped
+    assert breaker.state == CLOSED and breaker.stats()["failure_rate"] == 0.0
+
+def test_old_outcomes_slide_out_of_window(clock):
+    breaker, gemini = make_breaker(clock, window=4, min_calls=4), FakeGemini(clock)
+    gemini.mode = "fail"
+    with pytest.raises(RuntimeError):
+        breaker.call(gemini, "t")
+    gemini.mode = "ok"
+    for _ in range(6):
+        breaker.call(gemini, "t")
+    assert breaker.stats()["failure_rate"] == 0.0
+    assert breaker.state == CLOSED
+
+def test_open_circuit_skips_gemini_in_tier1(monkeypatch, clock):
+    gemini = FakeGemini(clock)
+    gemini.mode = "fail"
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", gemini)
+    sentiment_conversation.configure_conversation_cache(max_entries=0)
+    previous = sentiment_conversation.get_gemini_breaker()
+    breaker = sentiment_conversation.configure_gemini_breaker(make_breaker(clock, min_calls=2))
+    try:
+        turns = [("User", "this is broken"), ("Bot", "sorry"), ("User", "still broken")]
+        for _ in range(5):
+            res = sentiment_conversation.analyze_conversation_with_gemini(turns, per_results=[
+                {"text": "this is broken", "label": "Negative", "score": -0.8},
+                {"text": "still broken", "label": "Negative", "score": -0.7},
+            ])
+            assert res["overall_label"] == "Negative" and res["cached"] is False
+        assert gemini.calls == 2 and breaker.stats()["rejected"] == 3
+
+        clock.advance(30.0)
+        gemini.mode = "ok"
+        res = sentiment_conversation.analyze_conversation_with_gemini(turns)
+        assert res["reason"] == "From Gemini." and breaker.state == CLOSED
+    finally:
+        sentiment_conversation.configure_gemini_breaker(previous)
+        sentiment_conversation.configure_conversation_cache()
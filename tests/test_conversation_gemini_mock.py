@@ -31,3 +31,24 @@ def test_conversation_with_mock(monkeypatch):
     assert res["overall_label"] == "Negative"
     assert res["trend"] == "Improving"
     assert res["confidence"] == 0.91
+
+def test_conversation_results_are_cached(monkeypatch):
+    calls = []
+
+    def counting_gen_json(conv_text, model=""):
+        calls.append(conv_text)
+        return fake_gen_json(conv_text, model)
+
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", counting_gen_json)
+    sentiment_conversation.configure_conversation_cache(max_entries=8, ttl=60)
+
+    turns = [("User", "I'm upset."), ("Bot", "I'm sorry to hear."), ("User", "It got better later.")]
+    first = sentiment_conversation.analyze_conversation_with_gemini(turns, use_gemini=True)
+    second = sentiment_conversation.analyze_conversation_with_gemini(turns, use_gemini=True)
+    other = sentiment_conversation.analyze_conversation_with_gemini(turns, model="other-model", use_gemini=True)
+
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert other["cached"] is False
+    assert second["overall_label"] == first["overall_label"]
+    assert len(calls) == 2
@@ -0,0 +1,103 @@
+# tests/test_conversation_store.py
+import tracemalloc
+
+import pytest
+
+from chatbot import SimpleChatbot
+from conversation_store import ConversationStore
+from utils import render_turns
+
+def test_incremental_text_matches_full_render():
+    store = ConversationStore()
+    turns = [("User", "hi"), ("Bot", "Hello!"), ("User", "two\nlines"), ("Bot", "ok")]
+    for i, (s, t) in enumerate(turns, 1):
+        store.append(s, t)
+        assert store.as_text() == render_turns(turns[:i])
+        assert store.as_text(include_bot=False) == render_turns(turns[:i], include_bot=False)
+    assert store.last_user_message() == "two\nlines"
+    assert list(store.user_messages()) == ["hi", "two\nlines"]
+
+def test_view_is_a_snapshot_without_copy():
+    store = ConversationStore()
+    store.append("User", "a")
+    view = store.view()
+    store.append("Bot", "b")
+    assert len(view) == 1
+    assert list(view) == [("User", "a")]
+    assert list(store.view()[1:]) == [("Bot", "b")]
+
+def test_spill_keeps_history_and_stats(tmp_path):
+    store = ConversationStore(max_in_memory=4, spill_path=str(tmp_path / "segment.jsonl"))
+    turns = []
+    for i in range(25):
+        speaker = "User" if i % 2 == 0 else "Bot"
+        idx = store.append(speaker, f"turn {i}")
+        turns.append((speaker, f"turn {i}"))
+        if speaker == "User":
+            store.set_sentiment(idx, {"text": f"turn {i}", "label": "Positive", "score": 0.5})
+
+    st = store.stats()
+    assert st["in_memory"] <= 4
+    assert st["spilled"] + st["in_memory"] == 25
+    assert st["scored"] == 13
+    assert abs(st["average_score"] - 0.5) < 1e-9
+    assert list(store) == turns
+    assert store[3] == ("Bot", "turn 3")
+    assert store.as_text() == render_turns(turns)
+    assert store.sentiment(0)["label"] == "Positive"
+    assert store.last_user_message() == "turn 24"
+
+def test_chatbot_on_capped_store():
+    bot = SimpleChatbot(scorer=lambda t: {"text": t, "label": "Neutral", "score": 0.0}, max_turns_in_memory=6)
+    for i in range(10):
+        bot.handle_user(f"message number {i}")
+    assert len(bot.get_conversation_history()) == 20
+    assert [r["text"] for r in bot.get_statement_results()] == [f"message number {i}" for i in range(10)]
+    assert bot.last_user_message() == "message number 9"
+
+def test_as_text_after_spill_does_not_reread_segment(tmp_path, monkeypatch):
+    store = ConversationStore(max_in_memory=4, spill_path=str(tmp_path / "segment.jsonl"))
+    turns = [("User" if i % 2 == 0 else "Bot", f"turn {i}") for i in range(11)]
+    for s, t in turns:
+        store.append(s, t)
+    assert store.stats()["spilled"] > 0
+    monkeypatch.setattr(store, "_iter_spilled", lambda start, stop: pytest.fail("segment re-read"))
+    assert store.as_text() == render_turns(turns)
+    assert store.as_text(include_bot=False) == render_turns(turns, include_bot=False)
+
+def test_memory_stays_flat_as_turns_spill():
+    store = ConversationStore(max_in_memory=8)
+    def add(n):
+        for i in range(n):
+            store.append("User" if i % 2 == 0 else "Bot", f"{i:06d} " + "x" * 2000)
+    add(100)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        add(1000)  # ~2 MB of text, all of it spilled
+        grown = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert grown < 100_000
+    assert store.as_text().count("\n") == 1099
+    store.close()
+
+def test_second_sentiment_for_a_turn_is_ignored():
+    bot = SimpleChatbot(max_turns_in_memory=4)
+    first = {"text": "a", "label": "Positive", "score": 0.9}
+    index = bot.conversation.append("User", "a")
+    bot.record_sentiment(index, first)
+    for _ in range(3):
+        bot.conversation.append("Bot", "ok")  # spills turn `index`
+    late = bot.conversation.append("User", "b")
+    for _ in range(3):
+        bot.conversation.append("Bot", "ok")
+    bot.record_sentiment(late, {"text": "b", "label": "Negative", "score": -0.9})  # scored after spilling
+
+    for i, result in ((index, {"text": "a", "label": "Negative", "score": -0.9}),
+                      (late, {"text": "b", "label": "Positive", "score": 0.9})):
+        bot.record_sentiment(i, result)
+    st = bot.conversation.stats()
+    assert st["scored"] == 2 and st["label_counts"] == {"Positive": 1, "Negative": 1}
+    assert bot.conversation.sentiment(index) == first
+    assert bot.tracker.count == 2
@@ -0,0 +1,106 @@
+# tests/test_end_pipeline.py
+import threading
+import time
+
+import pytest
+
+import metrics
+import sentiment_conversation
+from chatbot import SimpleChatbot
+from end_pipeline import run_end_pipeline
+
+GEMINI = {"overall_label": "Positive", "average_score": 0.9, "trend": "Improving",
+          "reason": "From Gemini.", "confidence": 0.9}
+
+def result(score):
+    label = "Positive" if score >= 0.55 else "Negative" if score <= -0.55 else "Neutral"
+    return {"text": "", "label": label, "score": score}
+
+@pytest.fixture
+def bot():
+    sentiment_conversation.configure_conversation_cache(max_entries=0)
+    scores = {"this is broken": -0.9, "ok": 0.0, "fixed, thanks!": 0.9}
+    b = SimpleChatbot(scorer=lambda t: dict(result(scores[t]), text=t))
+    for text in scores:
+        b.handle_user(text)
+    yield b
+    b.close()
+    sentiment_conversation.configure_conversation_cache()
+
+def fake_gemini(monkeypatch, delay=0.0, error=None):
+    calls = []
+    def _generate(text, model=None):
+        calls.append(text)
+        time.sleep(delay)
+        if error:
+            raise error
+        return dict(GEMINI)
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", _generate)
+    return calls
+
+def test_gemini_result_used_when_in_time(monkeypatch, bot):
+    calls = fake_gemini(monkeypatch, delay=0.05)
+    res = run_end_pipeline(bot, deadline=2.0)
+    assert res["source"] == "gemini" and res["fallback_reason"] is None
+    assert res["conversation"]["reason"] == "From Gemini."
+    assert [r["text"] for r in res["statements"]] == ["this is broken", "ok", "fixed, thanks!"]
+    assert len(calls) == 1
+
+def test_deadline_returns_fallback_without_waiting(monkeypatch, bot):
+    fake_gemini(monkeypatch, delay=1.0)
+    t0 = time.perf_counter()
+    res = run_end_pipeline(bot, deadline=0.1)
+    assert time.perf_counter() - t0 < 0.8
+    assert res["source"] == "fallback" and res["fallback_reason"] == "deadline"
+    assert res["conversation"]["reason"].startswith("Tracked 3 user messages")
+    assert res["timings"]["gemini"] is None
+
+def test_gemini_error_falls_back(monkeypatch, bot):
+    fake_gemini(monkeypatch, error=RuntimeError("quota"))
+    res = run_end_pipeline(bot, deadline=2.0)
+    assert res["source"] == "fallback" and res["fallback_reason"] == "error"
+
+def test_disabled_never_calls_gemini(monkeypatch, bot):
+    calls = fake_gemini(monkeypatch)
+    res = run_end_pipeline(bot, use_gemini=False)
+    assert res["source"] == "fallback" and res["fallback_reason"] == "disabled"
+    assert calls == []
+
+def test_gemini_and_tier2_overlap(monkeypatch, bot):
+    started = threading.Event()
+    def _generate(text, model=None):
+        started.set()
+        return dict(GEMINI)
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", _generate)
+
+    original = bot.get_statement_results
+    def slow_statements():
+        assert started.wait(1.0)  # Gemini is already in flight while Tier 2 is collected
+        return original()
+    monkeypatch.setattr(bot, "get_statement_results", slow_statements)
+    assert run_end_pipeline(bot, deadline=2.0)["source"] == "gemini"
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable(True)
+    yield
+    metrics.enable(False)
+    metrics.reset()
+
+def tier1_counts():
+    counters = metrics.snapshot()["counters"]
+    return {s["labels"]["source"]: s["value"] for s in counters.get("liabot_tier1_total", [])}
+
+def test_each_end_counted_once_by_the_source_used(monkeypatch, bot, recording):
+    fake_gemini(monkeypatch, delay=0.3)
+    assert run_end_pipeline(bot, deadline=0.05)["source"] == "fallback"
+    time.sleep(0.4)  # the discarded Gemini call finishes in the background
+    assert tier1_counts() == {"fallback": 1}
+
+    metrics.reset()
+    fake_gemini(monkeypatch)
+    assert run_end_pipeline(bot, deadline=2.0)["source"] == "gemini"
+    assert tier1_counts() == {"gemini": 1}
+    stages = {h["labels"]["stage"] for h in metrics.snapshot()["histograms"].get("liabot_stage_seconds", [])}
+    assert "fallback" not in stages
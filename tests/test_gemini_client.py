@@ -0,0 +1,142 @@
+# tests/test_gemini_client.py
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+import gemini_client
+
+GOOD_JSON = json.dumps({
+    "overall_label": "Positive",
+    "average_score": 0.5,
+    "trend": "Stable",
+    "reason": "ok",
+    "confidence": 0.8,
+})
+
+class TransientError(Exception):
+    code = 503
+
+class FakeClient:
+    """Quacks like google.genai.Client: .models.generate_content and .aio.models.generate_content."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+
+    def _generate(self, model, contents, config):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TransientError("unavailable")
+        return SimpleNamespace(text="```json\n" + GOOD_JSON + "\n```")
+
+    async def _agenerate(self, model, contents, config):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self._generate(model, contents, config)
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def fake(monkeypatch):
+    client = FakeClient()
+    gemini_client.set_client(client)
+    monkeypatch.setattr(gemini_client, "_backoff_delay", lambda attempt: 0.0)
+    yield client
+    gemini_client.reset_client()
+    gemini_client.set_max_concurrency(gemini_client.DEFAULT_MAX_CONCURRENCY)
+
+def test_client_is_reused(fake):
+    gemini_client.generate_json_from_conversation("User: hi")
+    gemini_client.generate_json_from_conversation("User: hi again")
+    assert gemini_client.get_client() is fake
+    assert fake.calls == 2
+
+def test_sync_retries_transient_errors(fake):
+    fake.failures = 2
+    res = gemini_client.generate_json_from_conversation("User: hi", max_retries=3)
+    assert res["overall_label"] == "Positive"
+    assert fake.calls == 3
+
+def test_non_transient_error_is_not_retried(fake):
+    def boom(**kwargs):
+        fake.calls += 1
+        raise ValueError("bad request")
+    fake.models.generate_content = boom
+    with pytest.raises(ValueError):
+        gemini_client.generate_json_from_conversation("User: hi")
+    assert fake.calls == 1
+
+def test_async_respects_concurrency_limit(fake):
+    fake.delay = 0.01
+    gemini_client.set_max_concurrency(3)
+
+    async def run():
+        return await asyncio.gather(*[
+            gemini_client.agenerate_json_from_conversation(f"User: msg {i}") for i in range(10)
+        ])
+
+    results = asyncio.run(run())
+    assert len(results) == 10
+    assert fake.max_in_flight == 3
+
+def test_async_timeout(fake):
+    fake.delay = 1.0
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(gemini_client.agenerate_json_from_conversation("User: hi", timeout=0.01, max_retries=0))
+
+class SegmentClient(FakeClient):
+    """Scores each segment by its index: early segments negative, late ones positive."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def _generate(self, model, contents, config):
+        with self.lock:  # segments are analyzed from several threads
+            self.calls += 1
+            self.prompts.append(contents)
+        marker = contents.split("This is segment ", 1)
+        if len(marker) == 1:
+            return SimpleNamespace(text=GOOD_JSON)
+        index, total = (int(x) for x in marker[1].split(" of a longer")[0].split(" of "))
+        score = -0.8 + 1.6 * (index - 1) / max(1, total - 1)
+        return SimpleNamespace(text=json.dumps({
+            "overall_label": "Neutral", "average_score": score, "trend": "Stable",
+            "reason": f"segment {index}", "confidence": 0.9,
+        }))
+
+def test_long_conversation_is_chunked_not_truncated(monkeypatch):
+    client = SegmentClient()
+    gemini_client.set_client(client)
+    try:
+        lines = [f"User: message {i} " + "x" * 80 for i in range(600)]
+        text = "\n".join(lines)
+        assert len(text) > gemini_client.MAX_PROMPT_CHARS
+
+        res = gemini_client.generate_json_from_conversation(text)
+        assert res["segments"] == client.calls > 1
+        assert res["trend"] == "Improving"
+        assert "[truncated]" not in "".join(client.prompts)
+        assert any("message 599" in p for p in client.prompts)
+
+        async_res = asyncio.run(gemini_client.agenerate_json_from_conversation(text))
+        assert async_res["segments"] == res["segments"]
+        assert abs(async_res["average_score"] - res["average_score"]) < 1e-9
+    finally:
+        gemini_client.reset_client()
+
+def test_split_transcript_respects_budget():
+    text = "\n".join(f"User: {i} " + "y" * 50 for i in range(100))
+    chunks = gemini_client.split_transcript(text, max_tokens=100)
+    assert "\n".join(chunks) == text
+    assert all(len(c) <= 100 * gemini_client.CHARS_PER_TOKEN for c in chunks)
@@ -0,0 +1,102 @@
+# tests/test_long_text.py
+import pytest
+
+import sentiment_statement
+from sentiment_statement import aggregate_windows, window_spans
+
+class WordBackend:
+    """
+    Backend-shaped stand-in: one token per word, "good"/"bad" push the logits.
+    Records tokenize/forward calls so the windowing can be checked.
+    """
+    labels = ["NEGATIVE", "POSITIVE"]
+    num_special_tokens = 2
+    VOCAB = {"good": 1, "bad": 2}
+
+    def __init__(self):
+        self.tokenize_calls = []
+        self.forward_batches = []
+
+    def encode(self, texts, max_length):
+        return [self.with_special_tokens(ids[:max_length - 2]) for ids in self.tokenize(texts)]
+
+    def tokenize(self, texts):
+        self.tokenize_calls.append(list(texts))
+        return [[self.VOCAB.get(w, 3) for w in t.split()] for t in texts]
+
+    def with_special_tokens(self, ids):
+        return [0] + list(ids) + [0]
+
+    def forward(self, batch_ids):
+        self.forward_batches.append(len(batch_ids))
+        rows = []
+        for ids in batch_ids:
+            pos = sum(1 for i in ids if i == 1) - sum(1 for i in ids if i == 2)
+            rows.append([-0.5 * pos, 0.5 * pos])
+        return rows
+
+@pytest.fixture
+def backend(monkeypatch):
+    b = WordBackend()
+    monkeypatch.setattr(sentiment_statement, "_BACKEND", b)
+    monkeypatch.setattr(sentiment_statement, "MAX_LENGTH", 10)  # 8 tokens per window body
+    sentiment_statement.configure_cache(max_entries=0)
+    yield b
+    sentiment_statement.configure_cache()
+
+def test_window_spans_cover_everything_with_overlap():
+    assert window_spans(5, 8, 2) == [(0, 5)]
+    assert window_spans(20, 8, 2) == [(0, 8), (6, 14), (12, 20)]
+    assert window_spans(0, 8, 2) == [(0, 0)]
+    spans = window_spans(1000, 254, 64)
+    assert spans[0][0] == 0 and spans[-1][1] == 1000
+    assert all(b[0] == a[1] - 64 for a, b in zip(spans, spans[1:]))
+
+def test_overlap_must_leave_a_step(backend):
+    for overlap in (8, 9, -1):
+        with pytest.raises(ValueError):
+            window_spans(100, 8, overlap)
+        with pytest.raises(ValueError):
+            sentiment_statement.analyze_statements(["good day"], long_policy="mean", overlap=overlap)
+    assert window_spans(10, 8, 7) == [(0, 8), (1, 9), (2, 10)]
+
+def test_aggregate_policies():
+    probs = [[0.9, 0.1], [0.3, 0.7], [0.2, 0.8]]
+    sizes = [8, 8, 4]
+    mean = aggregate_windows(probs, sizes, "mean")
+    assert mean == pytest.approx([(0.9 * 8 + 0.3 * 8 + 0.2 * 4) / 20, (0.1 * 8 + 0.7 * 8 + 0.8 * 4) / 20])
+    assert aggregate_windows(probs, sizes, "max") == [0.9, 0.1]
+    last = aggregate_windows(probs, sizes, "last", last_bias=3.0)
+    assert last[1] > mean[1]  # the later, positive windows weigh more
+    assert aggregate_windows([[0.4, 0.6]], [5], "last") == [0.4, 0.6]
+    with pytest.raises(ValueError):
+        aggregate_windows(probs, sizes, "median")
+
+def test_long_text_is_not_truncated(backend):
+    # Negative start, then a long positive ending past the first window.
+    text = "bad bad bad " + "ok " * 10 + "good " * 12
+    truncated = sentiment_statement.analyze_statement(text)
+    assert truncated["label"] == "Negative"
+
+    windowed = sentiment_statement.analyze_statement(text, long_policy="last", overlap=2)
+    assert windowed["label"] == "Positive"
+
+def test_tokenized_once_and_windows_batched_together(backend):
+    texts = ["good " * 30, "bad " * 3, "good bad " * 20]
+    results = sentiment_statement.analyze_statements(texts, batch_size=64, long_policy="mean", overlap=2)
+    assert [r["label"] for r in results] == ["Positive", "Negative", "Neutral"]
+    assert backend.tokenize_calls == [[t.strip() for t in texts]]
+    n_windows = sum(len(window_spans(len(t.split()), 8, 2)) for t in texts)
+    assert backend.forward_batches == [n_windows]
+
+def test_short_text_matches_plain_path(backend):
+    plain = sentiment_statement.analyze_statements(["good day", "bad day", "a day"])
+    windowed = sentiment_statement.analyze_statements(["good day", "bad day", "a day"], long_policy="mean",
+                                                       overlap=2)
+    for p, w in zip(plain, windowed):
+        assert p["label"] == w["label"]
+        assert p["score"] == pytest.approx(w["score"])
+
+def test_unknown_policy_rejected(backend):
+    with pytest.raises(ValueError):
+        sentiment_statement.analyze_statement("good", long_policy="median")
@@ -11,3 +11,19 @@ def test_fallback_aggregation_simple():
     assert "overall_label" in res
     assert "average_score" in res
     assert "trend" in res
+
+def test_fallback_uses_turns_and_precomputed_results(monkeypatch):
+    import sentiment_conversation
+
+    def fail(*args, **kwargs):
+        raise AssertionError("statement model should not run when per_results are given")
+    monkeypatch.setattr(sentiment_conversation, "analyze_statements", fail)
+
+    turns = [("User", "line one\nline two"), ("Bot", "I see."), ("User", "great now")]
+    per_results = [
+        {"text": "line one\nline two", "label": "Negative", "score": -0.9},
+        {"text": "great now", "label": "Positive", "score": 0.95},
+    ]
+    res = sentiment_conversation.analyze_conversation_with_gemini(turns, use_gemini=False, per_results=per_results)
+    assert res["trend"] == "Improving"
+    assert "2 user messages" in res["reason"]
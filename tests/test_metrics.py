@@ -0,0 +1,92 @@
+# tests/test_metrics.py
+import pytest
+
+import metrics
+import sentiment_conversation
+
+TURNS = [("User", "I'm upset."), ("Bot", "I'm sorry to hear."), ("User", "It got better later.")]
+PER_RESULTS = [
+    {"text": "I'm upset.", "label": "Negative", "score": -0.8},
+    {"text": "It got better later.", "label": "Positive", "score": 0.7},
+]
+
+def fake_gen_json(conv_text, model=""):
+    return {"overall_label": "Positive", "average_score": 0.2, "trend": "Improving",
+            "reason": "fake", "confidence": 0.9}
+
+def failing_gen_json(conv_text, model=""):
+    raise RuntimeError("gemini down")
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable(True)
+    yield
+    metrics.enable(False)
+    metrics.reset()
+
+def counter(snap, name, **labels):
+    return sum(s["value"] for s in snap["counters"].get(name, []) if all(s["labels"].get(k) == v for k, v in labels.items()))
+
+def test_disabled_records_nothing():
+    metrics.reset()
+    metrics.enable(False)
+    metrics.inc("liabot_tier1_total", source="gemini")
+    metrics.observe("liabot_stage_seconds", 0.1, stage="forward")
+    with metrics.timer("forward") as t:
+        pass
+    assert t is metrics._NOOP_TIMER
+    snap = metrics.snapshot()
+    assert snap["counters"] == {} and snap["histograms"] == {}
+
+def test_tier1_sources_cache_and_failures(monkeypatch, enabled_metrics):
+    sentiment_conversation.configure_conversation_cache(max_entries=8, ttl=60)
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", fake_gen_json)
+    sentiment_conversation.analyze_conversation_with_gemini(TURNS, per_results=PER_RESULTS)
+    sentiment_conversation.analyze_conversation_with_gemini(TURNS, per_results=PER_RESULTS)
+
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", failing_gen_json)
+    sentiment_conversation.analyze_conversation_with_gemini(TURNS + [("User", "new")], per_results=PER_RESULTS)
+
+    snap = metrics.snapshot()
+    assert counter(snap, "liabot_tier1_total", source="gemini") == 1
+    assert counter(snap, "liabot_tier1_total", source="cache") == 1
+    assert counter(snap, "liabot_tier1_total", source="fallback") == 1
+    assert counter(snap, "liabot_gemini_failures_total") == 1
+    assert counter(snap, "liabot_cache_requests_total", cache="conversation", result="hit") == 1
+    assert counter(snap, "liabot_cache_requests_total", cache="conversation", result="miss") == 2
+    stages = {h["labels"]["stage"]: h for h in snap["histograms"]["liabot_stage_seconds"]}
+    assert stages["tier1"]["count"] == 2  # one success, one failure
+    assert stages["fallback"]["count"] == 1
+
+def test_prometheus_text_format(enabled_metrics):
+    metrics.inc("liabot_tier1_total", source="gemini")
+    metrics.observe("liabot_statement_batch_size", 3)
+    metrics.observe("liabot_statement_batch_size", 40)
+    text = metrics.prometheus_text()
+    assert "# TYPE liabot_tier1_total counter" in text
+    assert 'liabot_tier1_total{source="gemini"} 1' in text
+    assert "# TYPE liabot_statement_batch_size histogram" in text
+    assert 'liabot_statement_batch_size_bucket{le="4"} 1' in text
+    assert 'liabot_statement_batch_size_bucket{le="64"} 2' in text
+    assert 'liabot_statement_batch_size_bucket{le="+Inf"} 2' in text
+    assert "liabot_statement_batch_size_sum 43" in text
+    assert "liabot_statement_batch_size_count 2" in text
+
+def test_trace_works_without_global_metrics(monkeypatch):
+    metrics.reset()
+    metrics.enable(False)
+    sentiment_conversation.configure_conversation_cache(max_entries=0)
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", failing_gen_json)
+
+    with metrics.trace("/end") as t:
+        sentiment_conversation.analyze_conversation_with_gemini(TURNS, per_results=PER_RESULTS)
+    assert metrics.current_trace() is None
+
+    assert [s["stage"] for s in t.spans] == ["tier1", "fallback"]
+    assert t.spans[0]["error"] is True
+    assert t.counters == {"liabot_gemini_failures_total": 1, "liabot_tier1_total{source=fallback}": 1}
+    text = t.format()
+    assert text.startswith("trace /end:")
+    assert "fallback" in text and "(error)" in text
+    assert metrics.snapshot()["counters"] == {}
@@ -0,0 +1,49 @@
+# tests/test_model_snapshot.py
+import json
+
+import pytest
+
+import model_snapshot
+import sentiment_statement
+
+def test_get_pipeline_loads_configured_snapshot(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setenv("SENTIMENT_SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(model_snapshot, "load_pipeline", lambda path, expected_model=None: calls.append(
+        (path, expected_model)) or "snapshot-pipeline")
+    monkeypatch.setattr(sentiment_statement, "_PIPELINE", None)
+    assert sentiment_statement.get_pipeline() == "snapshot-pipeline"
+    assert calls == [(str(tmp_path), sentiment_statement.MODEL_NAME)]
+
+def test_missing_or_foreign_snapshot_rejected(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        model_snapshot.read_manifest(str(tmp_path))
+    (tmp_path / model_snapshot.MANIFEST).write_text(json.dumps({"format": 1, "model_name": "other-model"}))
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    with pytest.raises(ValueError):
+        model_snapshot.load_snapshot(str(tmp_path), expected_model=sentiment_statement.MODEL_NAME)
+
+def test_snapshot_round_trip_is_memory_mapped(tmp_path):
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "good", "bad", "day"]))
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab))
+    config = transformers.DistilBertConfig(vocab_size=8, dim=16, n_layers=1, n_heads=2, hidden_dim=32,
+                                           max_position_embeddings=32, num_labels=2,
+                                           id2label={0: "NEGATIVE", 1: "POSITIVE"},
+                                           label2id={"NEGATIVE": 0, "POSITIVE": 1})
+    torch.manual_seed(0)
+    model = transformers.DistilBertForSequenceClassification(config).eval()
+
+    path = str(tmp_path / "snapshot")
+    model_snapshot.save_snapshot(tokenizer, model, path, "tiny-test-model")
+    tok2, model2 = model_snapshot.load_snapshot(path, expected_model="tiny-test-model")
+
+    assert not any(t.is_meta for t in list(model2.parameters()) + list(model2.buffers()))
+    batch = tok2(["good day", "bad bad day"], padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        assert torch.allclose(model(**batch).logits, model2(**batch).logits)
+    assert model_snapshot.read_manifest(path)["model_name"] == "tiny-test-model"
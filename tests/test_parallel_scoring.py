@@ -0,0 +1,48 @@
+# tests/test_parallel_scoring.py
+import os
+
+import pytest
+
+import parallel_scoring
+import sentiment_statement
+
+def fake_run_model(texts, batch_size):
+    """Deterministic stand-in for the model, tagged with the scoring process id."""
+    out = []
+    for t in texts:
+        pos = sum(map(ord, t)) % 7 - 3.0
+        out.append({"labels": ["NEGATIVE", "POSITIVE"], "logits": [-pos, pos], "pid": os.getpid()})
+    return out
+
+TEXTS = [f"message number {i} " + "x" * (i % 11) for i in range(40)] + ["", "  ", "message number 3 xxx"]
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    sentiment_statement.configure_cache(max_entries=0)
+    yield
+    sentiment_statement.configure_cache()
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(sentiment_statement, "_run_model", fake_run_model)
+    serial = sentiment_statement.analyze_statements(TEXTS)
+
+    with parallel_scoring.ParallelScorer(workers=2, chunk_size=4, run_model=fake_run_model) as scorer:
+        parallel = scorer.score(TEXTS)
+    assert parallel == serial
+
+def test_chunks_run_in_workers_and_come_back_in_order():
+    scorer = parallel_scoring.ParallelScorer(workers=2, chunk_size=2, run_model=fake_run_model)
+    try:
+        raws = scorer._run_parallel([f"t{i}" for i in range(40)])
+    finally:
+        scorer.close()
+    pids = {r["pid"] for r in raws}
+    assert pids and os.getpid() not in pids
+    # ordered reassembly: row i belongs to text i
+    assert [r["logits"] for r in raws] == [r["logits"] for r in fake_run_model([f"t{i}" for i in range(40)], 1)]
+
+def test_threads_per_worker_split(monkeypatch):
+    monkeypatch.setattr(parallel_scoring.os, "cpu_count", lambda: 16)
+    assert parallel_scoring.ParallelScorer(workers=4).threads_per_worker == 4
+    assert parallel_scoring.ParallelScorer(workers=32).threads_per_worker == 1
+    assert parallel_scoring.ParallelScorer(workers=4, threads_per_worker=2).threads_per_worker == 2
@@ -0,0 +1,70 @@
+# tests/test_prompt_compaction.py
+import re
+
+import sentiment_conversation
+from chatbot import SimpleChatbot
+from prompt_compaction import compact_conversation
+
+POSITIVE = {"good", "great", "happy", "better", "thanks", "love", "glad"}
+NEGATIVE = {"bad", "sad", "upset", "terrible", "angry", "hate", "worse"}
+
+def lexicon_statements(texts, **kwargs):
+    """Word-lexicon stand-in for analyze_statements; knows nothing about the compact format."""
+    out = []
+    for text in texts:
+        words = set(re.findall(r"[a-z']+", text.lower()))
+        score = 0.8 * (len(words & POSITIVE) > 0) - 0.8 * (len(words & NEGATIVE) > 0)
+        label = "Positive" if score > 0 else "Negative" if score < 0 else "Neutral"
+        out.append({"text": text, "label": label, "score": score})
+    return out
+
+def text_fallback_gemini(conv_text, model=""):
+    """Stand-in for Gemini: the local fallback over whatever transcript it is sent."""
+    return sentiment_conversation._fallback_aggregate_from_text(conv_text)
+
+FIXTURES = [
+    ["hello", "I had a bad day", "my boss was angry", "but dinner was great", "thanks"],
+    ["ok", "ok", "ok", "I'm fine", "thanks", "bye"],
+    ["hi", "I feel sad", "I feel sad", "still sad today", "nothing helps"],
+    ["good morning", "I'm so happy today", "what should I do next?", "ok", "the weather was terrible though"],
+    ["The delivery was late again and the box was damaged", "ok", "ok", "I guess it's fine now, thanks"],
+]
+
+def _bot_for(messages):
+    bot = SimpleChatbot()
+    for m in messages:
+        bot.handle_user(m)
+    return bot
+
+def test_compaction_preserves_labels_on_fixtures(monkeypatch):
+    # The scorer reads "User:" lines as plain text, so a collapsed "(xN)" run counts once:
+    # the verdict has to survive compaction without the scorer decoding the marks.
+    monkeypatch.setattr(sentiment_conversation, "analyze_statements", lexicon_statements)
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", text_fallback_gemini)
+    sentiment_conversation.configure_conversation_cache(max_entries=0)
+    try:
+        for messages in FIXTURES:
+            turns = _bot_for(messages).get_conversation_history()
+            full = sentiment_conversation.analyze_conversation_with_gemini(turns, use_gemini=True)
+            small = sentiment_conversation.analyze_conversation_with_gemini(turns, use_gemini=True, compact=True)
+            assert small["overall_label"] == full["overall_label"], messages
+            assert small["trend"] == full["trend"], messages
+            assert small["prompt_stats"]["saved_chars"] > 0
+    finally:
+        sentiment_conversation.configure_conversation_cache()
+
+def test_bot_replies_become_tags_and_repeats_collapse():
+    turns = _bot_for(["ok", "ok", "ok", "hello"]).get_conversation_history()
+    text, stats = compact_conversation(turns)
+    assert "User: ok (x3)" in text
+    assert "Bot: [clarify]" in text
+    assert "Bot: [greeting]" in text
+    assert stats["compact_chars"] < stats["original_chars"]
+
+def test_drop_neutral_turns():
+    turns = [("User", "ok"), ("Bot", "Okay."), ("User", "I'm upset"), ("Bot", "Sorry.")]
+    per = [{"label": "Neutral", "score": 0.0}, {"label": "Negative", "score": -0.9}]
+    text, stats = compact_conversation(turns, per, drop_neutral=True)
+    assert "User: ok" not in text
+    assert "User: I'm upset" in text
+    assert stats["dropped_exchanges"] == 1
@@ -0,0 +1,48 @@
+# tests/test_result_cache.py
+from result_cache import ResultCache
+
+def test_lru_eviction_and_counters():
+    c = ResultCache(max_entries=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1          # "a" becomes most recent
+    c.put("c", 3)                   # evicts "b"
+    assert c.get("b") is None
+    assert c.get("c") == 3
+    s = c.stats()
+    assert s["hits"] == 2
+    assert s["misses"] == 1
+    assert s["evictions"] == 1
+    assert s["size"] == 2
+
+def test_persistent_store_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    c = ResultCache(max_entries=8, path=path)
+    c.put("ok", {"labels": ["NEGATIVE", "POSITIVE"], "logits": [-1.0, 2.0]})
+    c.close()
+
+    c2 = ResultCache(max_entries=8, path=path)
+    assert c2.get("ok") == {"labels": ["NEGATIVE", "POSITIVE"], "logits": [-1.0, 2.0]}
+    assert c2.stats()["disk_hits"] == 1
+
+def test_disk_size_cap(tmp_path):
+    c = ResultCache(max_entries=1, path=str(tmp_path / "cache.sqlite"), max_disk_entries=3)
+    for i in range(5):
+        c.put(f"k{i}", i)
+    s = c.stats()
+    assert s["disk_size"] == 3
+    assert s["disk_evictions"] == 2
+    assert c.get("k0") is None
+    assert c.get("k4") == 4
+
+def test_ttl_expiry(monkeypatch):
+    import result_cache
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    c = ResultCache(max_entries=4, ttl=10)
+    c.put("conv", {"overall_label": "Neutral"})
+    now[0] += 5
+    assert c.get("conv") == {"overall_label": "Neutral"}
+    now[0] += 6
+    assert c.get("conv") is None
+    assert c.stats()["expirations"] == 1
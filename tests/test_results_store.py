@@ -0,0 +1,93 @@
+# tests/test_results_store.py
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from results_store import LABELS, NONE, ResultsStore
+
+def stmt(text, score):
+    label = "Positive" if score >= 0.55 else "Negative" if score <= -0.55 else "Neutral"
+    return {"text": text, "label": label, "score": score}
+
+def fill(store):
+    store.add_conversation([stmt("hi", 0.0), stmt("great", 0.9), stmt("great", 0.9)],
+                           {"overall_label": "Positive", "average_score": 0.6, "trend": "Improving",
+                            "confidence": 0.8, "source": "gemini"}, conv_id="c1", timestamp=86400 * 10 + 5)
+    store.add_conversation([stmt("awful", -0.8), stmt("hi", 0.0)], conv_id="c2", timestamp=86400 * 11 + 5)
+    store.add_conversation([], conv_id="empty", timestamp=86400 * 11 + 6)
+
+def test_round_trip_and_interning(tmp_path):
+    path = str(tmp_path / "store")
+    with ResultsStore(path) as store:
+        fill(store)
+        assert store.n_messages == 0  # buffered until flushed
+
+    store = ResultsStore(path, mode="r")
+    assert (store.n_conversations, store.n_messages) == (3, 5)
+    assert store.meta["texts"] == 6  # hi, great, awful + three conversation ids
+    assert isinstance(store.column("msg_score"), np.memmap)
+    assert store.column("msg_score").dtype == np.float32 and store.column("msg_label").dtype == np.uint8
+    assert store.statements(1) == [{"text": "awful", "label": "Negative", "score": pytest.approx(-0.8)},
+                                   {"text": "hi", "label": "Neutral", "score": 0.0}]
+    assert store.statements(2) == []
+    assert store.column("conv_label").tolist() == [LABELS.index("Positive"), NONE, NONE]
+    assert np.isnan(store.column("conv_score")[1])
+    with pytest.raises(ValueError):
+        store.add_conversation([stmt("x", 0.0)])
+
+def test_vectorized_queries(tmp_path):
+    with ResultsStore(str(tmp_path)) as store:
+        fill(store)
+    store = ResultsStore(str(tmp_path), mode="r")
+
+    means = store.conversation_means()
+    assert means[:2] == pytest.approx([0.6, -0.4])
+    assert np.isnan(means[2])
+    assert store.label_histogram().tolist() == [1, 2, 2]
+    assert store.label_histogram(per_conversation=True).tolist() == [[0, 1, 2], [1, 1, 0], [0, 0, 0]]
+
+    starts, trend, counts = store.trend_over_time(bucket_seconds=86400)
+    assert starts.tolist() == [86400 * 10, 86400 * 11]
+    assert trend == pytest.approx([0.6, -0.4]) and counts.tolist() == [3, 2]
+    by_turn, n = store.mean_by_turn()
+    assert by_turn == pytest.approx([-0.4, 0.45, 0.9]) and n.tolist() == [2, 2, 1]
+
+def test_append_in_chunks_and_resume(tmp_path):
+    path = str(tmp_path)
+    store = ResultsStore(path, chunk_size=2)
+    store.add_conversation([stmt("a", 0.9), stmt("b", -0.9)])
+    assert store.n_messages == 2  # chunk flushed automatically
+    store.add_conversation([stmt("c", 0.1)])
+
+    # A crash mid-flush leaves bytes past the committed counts; reopening drops them.
+    with open(os.path.join(path, "msg_score"), "ab") as f:
+        f.write(b"\x00" * 6)
+    store = ResultsStore(path)
+    assert os.path.getsize(os.path.join(path, "msg_score")) == 2 * 4
+    store.add_conversation([stmt("a", 0.5), stmt("d", 0.2)])
+    store.flush(lines_done=7)
+
+    reader = ResultsStore(path, mode="r")
+    assert reader.n_messages == 4 and reader.meta["user"] == {"lines_done": 7}
+    assert [s["text"] for s in reader.statements(1)] == ["a", "d"]
+    assert reader.meta["texts"] == 3  # "a" reused from the pool written before reopening
+
+def test_hash_index_dedupes_across_reopen(tmp_path):
+    path = str(tmp_path)
+    with ResultsStore(path) as store:
+        store.add_conversation([stmt("same", 0.9), stmt("other", -0.9)])
+    with ResultsStore(path) as store:
+        store.add_conversation([stmt("other", -0.5), stmt("new", 0.0), stmt("new", 0.1)])
+    reader = ResultsStore(path, mode="r")
+    assert reader.meta["texts"] == 3
+    assert reader.column("msg_text").tolist() == [0, 1, 1, 2, 2]
+
+def test_missing_column_fails_loudly(tmp_path):
+    path = str(tmp_path)
+    with ResultsStore(path) as store:
+        store.add_conversation([stmt("a", 0.9)])
+    os.remove(os.path.join(path, "text_hash"))
+    with pytest.raises(ValueError, match="text_hash"):
+        ResultsStore(path)
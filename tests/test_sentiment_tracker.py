@@ -0,0 +1,78 @@
+# tests/test_sentiment_tracker.py
+import random
+
+import pytest
+
+from chatbot import SimpleChatbot
+from sentiment_conversation import analyze_conversation_with_gemini
+from sentiment_tracker import SentimentTracker, mood_line
+
+def ls_slope(ys):
+    n = len(ys)
+    if n < 2:
+        return 0.0
+    mx, my = (n - 1) / 2.0, sum(ys) / n
+    return sum((x - mx) * (y - my) for x, y in enumerate(ys)) / sum((x - mx) ** 2 for x in range(n))
+
+def result(score):
+    label = "Positive" if score >= 0.55 else "Negative" if score <= -0.55 else "Neutral"
+    return {"text": "", "label": label, "score": score}
+
+def test_running_stats_match_brute_force():
+    rng = random.Random(7)
+    tracker = SentimentTracker(alpha=0.4, window=5)
+    scores, ewma = [], None
+    for _ in range(200):
+        s = rng.uniform(-1, 1)
+        scores.append(s)
+        tracker.update(result(s))
+        ewma = s if ewma is None else 0.4 * s + 0.6 * ewma
+
+        n = len(scores)
+        mean = sum(scores) / n
+        assert tracker.mean == pytest.approx(mean)
+        if n > 1:
+            assert tracker.variance == pytest.approx(sum((x - mean) ** 2 for x in scores) / (n - 1))
+        assert tracker.ewma == pytest.approx(ewma)
+        assert tracker.slope == pytest.approx(ls_slope(scores[-5:]), abs=1e-9)
+    assert len(tracker._recent) == 5  # constant memory
+
+def test_trend_follows_recent_window():
+    tracker = SentimentTracker(window=4)
+    for s in (-0.9, -0.8, -0.7, -0.2, 0.3, 0.8):
+        tracker.update(result(s))
+    assert tracker.trend == "Improving"
+    for s in (0.8, 0.8, 0.8, 0.8):
+        tracker.update(result(s))
+    assert tracker.trend == "Stable"
+    for s in (0.5, 0.1, -0.4):
+        tracker.update(result(s))
+    assert tracker.trend == "Worsening"
+
+def test_summary_is_a_fallback_dict():
+    empty = SentimentTracker().summary()
+    assert empty["overall_label"] == "Neutral" and empty["confidence"] == 0.25
+
+    tracker = SentimentTracker()
+    for s in (-0.9, -0.6, 0.7, 0.9, 0.95):
+        tracker.update(result(s))
+    summary = tracker.summary()
+    assert set(summary) == {"overall_label", "average_score", "trend", "reason", "confidence"}
+    assert summary["overall_label"] == "Positive"
+    assert summary["average_score"] == pytest.approx(0.21)
+    assert summary["trend"] == "Improving"
+    assert 0.0 < summary["confidence"] <= 0.8
+    assert "5 user messages" in summary["reason"]
+    assert "Improving" in mood_line(tracker.snapshot())
+
+def test_bot_feeds_tracker_and_fallback_uses_it():
+    scores = {"I hate this": -0.9, "meh": 0.0, "now it works, great": 0.95}
+    bot = SimpleChatbot(scorer=lambda t: result(scores[t]))
+    for text in scores:
+        bot.handle_user(text)
+    assert bot.tracker.count == 3
+
+    res = analyze_conversation_with_gemini(bot.get_conversation_history(), use_gemini=False,
+                                           per_results=bot.get_statement_results(), tracker=bot.tracker)
+    assert res["reason"].startswith("Tracked 3 user messages")
+    assert res["cached"] is False
@@ -0,0 +1,196 @@
+# tests/test_server.py
+import asyncio
+import json
+import threading
+import time
+
+import sentiment_conversation
+import server
+
+class FakeScorer:
+    """Batch scorer standing in for analyze_statements; records the size of every batch."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [{"text": t, "label": "Negative" if "bad" in t else "Positive",
+                 "score": -0.8 if "bad" in t else 0.8, "raw": {}} for t in texts]
+
+def fake_gen_json(conv_text, model=""):
+    return {"overall_label": "Positive", "average_score": 0.4, "trend": "Stable",
+            "reason": "fake gemini", "confidence": 0.9}
+
+async def request(app, method, path, body=None):
+    """Minimal in-process ASGI client: returns (status, parsed JSON body)."""
+    sent = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b""}]
+    out = []
+
+    async def receive():
+        return sent.pop(0) if sent else {"type": "http.disconnect"}
+
+    async def send(message):
+        out.append(message)
+
+    await app({"type": "http", "method": method, "path": path}, receive, send)
+    return out[0]["status"], json.loads(out[1]["body"])
+
+def test_session_lifecycle(monkeypatch):
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", fake_gen_json)
+    sentiment_conversation.configure_conversation_cache(max_entries=0)
+    scorer = FakeScorer()
+    app = server.create_app(batch_fn=scorer, max_wait_ms=1)
+
+    async def scenario():
+        status, created = await request(app, "POST", "/sessions")
+        assert status == 200
+        sid = created["session_id"]
+
+        status, msg = await request(app, "POST", f"/sessions/{sid}/messages", {"text": "hello there"})
+        assert status == 200
+        assert msg["reply"]
+        assert msg["sentiment"]["label"] == "Positive"
+
+        status, state = await request(app, "GET", f"/sessions/{sid}")
+        assert [t[0] for t in state["turns"]] == ["User", "Bot"]
+        assert state["statements"][0]["label"] == "Positive"
+
+        status, end = await request(app, "POST", f"/sessions/{sid}/end")
+        assert status == 200
+        assert end["conversation"]["reason"] == "fake gemini"
+        assert len(end["statements"]) == 1
+
+        status, _ = await request(app, "GET", f"/sessions/{sid}")
+        assert status == 404
+        await app.batcher.close()
+
+    asyncio.run(scenario())
+
+def test_messages_from_many_sessions_share_batches():
+    scorer = FakeScorer(delay=0.01)
+    app = server.create_app(batch_fn=scorer, max_batch_size=8, max_wait_ms=50)
+
+    async def scenario():
+        ids = [(await request(app, "POST", "/sessions"))[1]["session_id"] for _ in range(16)]
+        replies = await asyncio.gather(*[
+            request(app, "POST", f"/sessions/{sid}/messages", {"text": f"user {i} is bad" if i % 2 else f"user {i}"})
+            for i, sid in enumerate(ids)
+        ])
+        await app.batcher.close()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert all(status == 200 for status, _ in replies)
+    # Each caller gets the result for its own text.
+    for i, (_, body) in enumerate(replies):
+        assert body["sentiment"]["text"].startswith(f"user {i}")
+        assert body["sentiment"]["label"] == ("Negative" if i % 2 else "Positive")
+    assert sum(len(b) for b in scorer.batches) == 16
+    assert len(scorer.batches) == 2
+    assert max(len(b) for b in scorer.batches) <= 8
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: clock[0])
+    app = server.create_app(batch_fn=FakeScorer(), idle_timeout=60)
+
+    async def scenario():
+        old = (await request(app, "POST", "/sessions"))[1]["session_id"]
+        clock[0] += 30
+        fresh = (await request(app, "POST", "/sessions"))[1]["session_id"]
+        clock[0] += 45  # old is now 75s idle, fresh 45s
+        assert (await request(app, "GET", f"/sessions/{old}"))[0] == 404
+        assert (await request(app, "GET", f"/sessions/{fresh}"))[0] == 200
+        status, health = await request(app, "GET", "/health")
+        assert health["sessions"] == 1 and health["evicted"] == 1
+
+    asyncio.run(scenario())
+
+def test_bad_requests():
+    app = server.create_app(batch_fn=FakeScorer())
+
+    async def scenario():
+        sid = (await request(app, "POST", "/sessions"))[1]["session_id"]
+        assert (await request(app, "POST", f"/sessions/{sid}/messages", {"text": "  "}))[0] == 400
+        assert (await request(app, "POST", "/nowhere"))[0] == 404
+
+    asyncio.run(scenario())
+
+def test_end_waits_for_scores_in_flight(monkeypatch):
+    monkeypatch.setattr(sentiment_conversation, "generate_json_from_conversation", fake_gen_json)
+    sentiment_conversation.configure_conversation_cache(max_entries=0)
+    app = server.create_app(batch_fn=FakeScorer(delay=0.2), max_wait_ms=1)
+
+    async def scenario():
+        sid = (await request(app, "POST", "/sessions"))[1]["session_id"]
+        message = asyncio.ensure_future(request(app, "POST", f"/sessions/{sid}/messages", {"text": "this is bad"}))
+        await asyncio.sleep(0.05)  # the score is still being computed
+        status, end = await request(app, "POST", f"/sessions/{sid}/end")
+        assert status == 200
+        assert end["statements"] == [{"text": "this is bad", "label": "Negative", "score": -0.8, "raw": {}}]
+        assert (await message)[0] == 200
+        await app.batcher.close()
+
+    asyncio.run(scenario())
+
+def test_failed_score_is_reported_and_left_out_of_aggregates():
+    calls = []
+    def flaky(texts):
+        if any("crash" in t for t in texts):
+            raise RuntimeError("model crashed")
+        return FakeScorer()(texts)
+    def analyze(turns, per_results=None, tracker=None, **kw):
+        calls.append(per_results)
+        return {"overall_label": "Positive"}
+    app = server.create_app(batch_fn=flaky, analyze_fn=analyze, max_wait_ms=0)
+
+    async def scenario():
+        sid = (await request(app, "POST", "/sessions"))[1]["session_id"]
+        status, msg = await request(app, "POST", f"/sessions/{sid}/messages", {"text": "all good"})
+        assert status == 200 and msg["sentiment"]["label"] == "Positive"
+        status, msg = await request(app, "POST", f"/sessions/{sid}/messages", {"text": "crash now"})
+        assert status == 200 and msg["sentiment"] is None and msg["error"] == "model crashed"
+        assert msg["mood"]["count"] == 1 and msg["mood"]["mean"] == 0.8  # the failed turn is not a 0.0
+        status, end = await request(app, "POST", f"/sessions/{sid}/end")
+        assert status == 200
+        assert end["statements"][1] == {"text": "crash now", "error": "model crashed"}
+        assert [r["text"] for r in calls[0]] == ["all good"]
+        await app.batcher.close()
+
+    asyncio.run(scenario())
+
+def test_short_batch_result_fails_instead_of_hanging():
+    app = server.create_app(batch_fn=lambda texts: FakeScorer()(texts)[:-1],
+                            analyze_fn=lambda turns, **kw: {"overall_label": "Neutral"}, max_wait_ms=50)
+
+    async def scenario():
+        sids = [(await request(app, "POST", "/sessions"))[1]["session_id"] for _ in range(2)]
+        replies = await asyncio.wait_for(asyncio.gather(
+            *[request(app, "POST", f"/sessions/{sid}/messages", {"text": "hi"}) for sid in sids]), 2.0)
+        assert [body["error"] for _, body in replies] == ["batch_fn returned 1 results for 2 texts"] * 2
+        status, _ = await asyncio.wait_for(request(app, "POST", f"/sessions/{sids[0]}/end"), 2.0)
+        assert status == 200
+        await app.batcher.close()
+
+    asyncio.run(scenario())
+
+def test_restarted_batcher_keeps_queued_items():
+    batcher = server.MicroBatcher(FakeScorer(), max_wait_ms=1)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        batcher._queue = asyncio.Queue()
+        left = loop.create_future()
+        batcher._queue.put_nowait(("left behind", left))
+        batcher._worker = loop.create_task(asyncio.sleep(0))  # a worker that already exited
+        await batcher._worker
+        assert (await batcher.submit("new"))["text"] == "new"
+        assert (await asyncio.wait_for(left, 1.0))["text"] == "left behind"
+        await batcher.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+# tests/test_startup.py
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY = ["torch", "transformers", "google.genai"]
+
+def test_import_main_is_light():
+    code = (
+        "import json, sys, time\n"
+        "t0 = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - t0\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {HEAVY!r} if m in sys.modules]}}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    assert res["loaded"] == []
+    # Generous bound: without the heavy imports this is tens of milliseconds.
+    assert res["elapsed"] < 1.0
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from sentiment_statement import analyze_statement
 
@@ -12,3 +14,48 @@ def test_statement_neutral_empty():
     r = analyze_statement("", neutral_threshold=0.5)
     assert r["label"] == "Neutral"
     assert r["score"] == 0.0
+
+def test_statements_batched_matches_single():
+    from sentiment_statement import analyze_statements
+    texts = ["I love this product!", "", "This is the worst day ever.", "ok"]
+    batched = analyze_statements(texts, batch_size=2, neutral_threshold=0.5)
+    assert [r["text"] for r in batched] == ["I love this product!", "", "This is the worst day ever.", "ok"]
+    for text, r in zip(texts, batched):
+        single = analyze_statement(text, neutral_threshold=0.5)
+        assert r["label"] == single["label"]
+        assert abs(r["score"] - single["score"]) < 1e-4
+
+def test_statement_cache_reuses_logits_across_thresholds():
+    import sentiment_statement
+    sentiment_statement.configure_cache(max_entries=16)
+    sentiment_statement.analyze_statement("Thanks, that helped a lot", neutral_threshold=0.5)
+    before = sentiment_statement.cache_stats()["hits"]
+    r = sentiment_statement.analyze_statement("  thanks,   THAT helped a lot ", neutral_threshold=0.99)
+    assert sentiment_statement.cache_stats()["hits"] == before + 1
+    assert r["label"] in ("Positive", "Neutral")
+
+def test_int8_backend_label_parity():
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    import sentiment_statement
+    from sentiment_backends import parity_report
+    texts = ["I love this product!", "This is the worst day ever.", "Thank you so much, that was wonderful."]
+    sentiment_statement.configure_cache(max_entries=0)
+    try:
+        sentiment_statement.set_backend("torch")
+        ref = [r["logits"] for r in sentiment_statement._run_model(texts, 8)]
+        sentiment_statement.set_backend("int8")
+        cand = [r["logits"] for r in sentiment_statement._run_model(texts, 8)]
+    finally:
+        sentiment_statement.set_backend("torch")
+        sentiment_statement.configure_cache()
+    assert parity_report(ref, cand)["label_agreement"] == 1.0
+
+def test_onnx_export_keyed_by_model_name(monkeypatch):
+    from sentiment_backends import ONNX_DIR, onnx_path
+    monkeypatch.delenv("SENTIMENT_ONNX_PATH", raising=False)
+    a = onnx_path("distilbert-base-uncased-finetuned-sst-2-english")
+    b = onnx_path("org/other-model")
+    assert a != b and os.path.dirname(a) == ONNX_DIR and os.path.basename(b) == "org--other-model.onnx"
+    monkeypatch.setenv("SENTIMENT_ONNX_PATH", "/tmp/pinned.onnx")
+    assert onnx_path("org/other-model") == "/tmp/pinned.onnx"
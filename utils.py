@@ -1,5 +1,9 @@
 # utils.py
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 
-def extract_user_messages(conversation: List[Tuple[str, str]]) -> List[str]:
+def extract_user_messages(conversation: Sequence[Tuple[str, str]]) -> List[str]:
     return [text for speaker, text in conversation if speaker == "User"]
+
+def render_turns(conversation: Sequence[Tuple[str, str]], include_bot: bool = True) -> str:
+    return "\n".join(f"{speaker}: {text}" for speaker, text in conversation
+                     if include_bot or speaker != "Bot")